@@ -2,19 +2,23 @@
 import re
 import json
 import logging
-from google import genai
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 try:
-    from backend.utils.env import GEMINI_API_KEY
+    from backend.agents import local_ocr
+    from backend.utils import cpu_pool, llm_budget, metrics
+    from backend.utils.env import CHECK_WORKERS, LOCAL_OCR_TIMEOUT
+    from backend.scrapper.structured_data import extract_structured, wants_offer_field
 except ImportError:
-    from utils.env import GEMINI_API_KEY
+    from agents import local_ocr
+    from utils import cpu_pool, llm_budget, metrics
+    from utils.env import CHECK_WORKERS, LOCAL_OCR_TIMEOUT
+    from scrapper.structured_data import extract_structured, wants_offer_field
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# instantiate Gemini client (adapt if your SDK differs)
-genai_client = genai.Client(api_key=GEMINI_API_KEY)
-
-
 def _resp_to_text(resp):
     """
     Robust extraction of textual content from genai response objects.
@@ -60,13 +64,23 @@ def _normalize_number(text: str):
         return None
 
 
-def extract_from_text(html_snippet: str, description: str):
+def extract_from_text(html_snippet: str, description: str, user_id=None):
     """
     Ask Gemini to extract the target described by `description`
-    from the given HTML/text snippet.
+    from the given HTML/text snippet. Without LLM budget for `user_id`
+    only the structured data and regex extractors run.
 
     Returns a dict: { "value": str, "normalized": number|None, "confidence": float }
     """
+    # schema.org/OpenGraph product data answers price/stock questions without a model call
+    structured = None
+    if wants_offer_field(description):
+        # large pages are parsed in the CPU pool
+        structured = cpu_pool.run(extract_structured, html_snippet, description)
+    if structured:
+        metrics.inc("autoscout_structured_hits_total", source=structured["source"])
+        return structured
+
     safe_html = (html_snippet or "")[:100000]  # truncate to be safe for token limits
 
     prompt = (
@@ -82,7 +96,7 @@ def extract_from_text(html_snippet: str, description: str):
     )
 
     try:
-        resp = genai_client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
+        resp = llm_budget.generate("extract_text", prompt, user_id=user_id)
         text = _resp_to_text(resp).strip()
 
         # try to find JSON in the output
@@ -104,13 +118,19 @@ def extract_from_text(html_snippet: str, description: str):
                 logger.warning("Failed to parse JSON from Gemini response")
 
         # fallback heuristics: try to extract currency/number from text or html
+        metrics.inc("autoscout_fallbacks_total", component="extract_from_text", reason="unparsed_response")
         candidate = _find_currency_in_text(text) or _find_currency_in_text(safe_html)
         normalized = _normalize_number(candidate) if candidate else None
         confidence = 0.6 if candidate else 0.2
         value = candidate or (text.splitlines()[0].strip() if text else None)
         return {"value": value, "normalized": normalized, "confidence": confidence}
     except Exception as e:
-        logger.exception("Gemini extraction failed: %s", e)
+        if isinstance(e, llm_budget.BudgetExceeded):
+            logger.info("Gemini extraction skipped: %s", e)
+        else:
+            logger.exception("Gemini extraction failed: %s", e)
+        reason = "llm_budget" if isinstance(e, llm_budget.BudgetExceeded) else "llm_error"
+        metrics.inc("autoscout_fallbacks_total", component="extract_from_text", reason=reason)
         # final fallback: heuristics on HTML
         candidate = _find_currency_in_text(safe_html)
         if candidate:
@@ -118,7 +138,73 @@ def extract_from_text(html_snippet: str, description: str):
         return {"value": None, "normalized": None, "confidence": 0.0}
 
 
-def extract_from_image(image_bytes: bytes, description: str):
+def extract_from_image(image_bytes: bytes, description: str, user_id=None):
+    """
+    Read the value `description` asks for off a screenshot. With local OCR
+    installed it reads the image first and Gemini is asked only when OCR is
+    unsure or slower than usual; whichever confident answer comes first wins.
+    Without budget for vision, OCR is all there is.
+    """
+    if not local_ocr.available():
+        return _gemini_image(image_bytes, description, user_id)
+    if not llm_budget.allows("extract_image", user_id):
+        llm_budget.degraded("ocr_only", llm_budget.mode(user_id))
+        return local_ocr.extract(image_bytes, description)
+    return _hedged(image_bytes, description, user_id)
+
+
+_hedge_lock = threading.Lock()
+_hedge_pool = None
+
+
+def _pool():
+    global _hedge_pool
+    with _hedge_lock:
+        if _hedge_pool is None:
+            # a losing Gemini call runs to completion here, off the check worker
+            _hedge_pool = ThreadPoolExecutor(max_workers=CHECK_WORKERS * 2, thread_name_prefix="extract-hedge")
+        return _hedge_pool
+
+
+def _hedged(image_bytes, description, user_id):
+    pool = _pool()
+    start = time.monotonic()
+    local = pool.submit(local_ocr.extract, image_bytes, description)
+    remote = None
+    pending = {local}
+    fallback = {"value": None}
+    head_start = local_ocr.hedge_delay()
+    while pending:
+        now = time.monotonic()
+        timeout = start + head_start - now if remote is None else start + head_start + LOCAL_OCR_TIMEOUT - now
+        done, pending = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception:
+                logger.exception("screenshot extraction failed")
+                continue
+            if future is local and local_ocr.confident(result):
+                metrics.inc("autoscout_extract_hedge_total", winner="ocr", hedged=str(remote is not None).lower())
+                return result
+            if future is remote and result.get("value"):
+                metrics.inc("autoscout_extract_hedge_total", winner="gemini", hedged="true")
+                return result
+            if result.get("value") and not fallback.get("value"):
+                fallback = result
+        if remote is None:
+            # OCR is unsure, or slower than it usually is: ask Gemini as well
+            remote = pool.submit(_gemini_image, image_bytes, description, user_id)
+            pending.add(remote)
+        elif not done:
+            logger.warning("no screenshot answer for %r within %.0fs", description, LOCAL_OCR_TIMEOUT)
+            break
+    # neither was sure: OCR's best guess carries its low confidence onwards
+    metrics.inc("autoscout_extract_hedge_total", winner="none", hedged=str(remote is not None).lower())
+    return fallback
+
+
+def _gemini_image(image_bytes, description, user_id=None):
     """
     If you have a screenshot, send that to Gemini OR (if SDK doesn't support images directly),
     send an OCRed text + prompt. Here we attempt an image-based prompt if SDK supports it.
@@ -131,15 +217,17 @@ def extract_from_image(image_bytes: bytes, description: str):
         #saving image
         # with open("image.png", "wb") as f:
         #     f.write(image_bytes)
-        image_part = genai.types.Part.from_bytes(
+        from google.genai import types
+        image_part = types.Part.from_bytes(
             data=image_bytes,
             # The output is PNG, so use the corresponding MIME type
             mime_type='image/png' 
         )
         # example approach (SDKs vary) — adapt to your client:
-        resp = genai_client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[f"Extract the following: {description}.Return value and nothing else.", image_part]
+        resp = llm_budget.generate(
+            "extract_image",
+            [f"Extract the following: {description}.Return value and nothing else.", image_part],
+            user_id=user_id,
         )
         text = _resp_to_text(resp).strip()
         # m = re.search(r"\{.*\}", text, re.S)
@@ -149,8 +237,17 @@ def extract_from_image(image_bytes: bytes, description: str):
         #     parsed["confidence"] = float(parsed.get("confidence", 0.8))
         #     return {"value": parsed.get("value"), "normalized": parsed.get("normalized"), "confidence": parsed.get("confidence")}
         # # fallback
-        print("Extracted text: %s", text)
+        logger.info("Extracted text: %s", text)
         return {"value": text}
+    except llm_budget.BudgetExceeded as e:
+        logger.info("Gemini image extraction skipped: %s", e)
+        metrics.inc("autoscout_fallbacks_total", component="extract_from_image", reason="llm_budget")
+        return {"value": None}
     except Exception:
-        # If image path is unsupported by SDK, you'd use OCR here (e.g., pytesseract) then call extract_from_text()
+        # with pytesseract installed, extract_from_image has raced local OCR against this call
+        logger.exception("Gemini image extraction failed")
+        metrics.inc("autoscout_fallbacks_total", component="extract_from_image", reason="llm_error")
         return {"value": None}
+
+
+metrics.describe("autoscout_extract_hedge_total", "counter", "Screenshot reads by which engine answered first (ocr, gemini, none).")
@@ -0,0 +1,248 @@
+# backend/agents/local_ocr.py
+import io
+import logging
+import re
+import statistics
+import threading
+import time
+from collections import deque
+
+try:
+    from backend.utils import cpu_pool, metrics
+    from backend.utils.env import LOCAL_OCR, LOCAL_OCR_HEDGE_MAX_MS, LOCAL_OCR_LANG, LOCAL_OCR_MIN_CONFIDENCE
+    from backend.scrapper.structured_data import parse_price
+except ImportError:
+    from utils import cpu_pool, metrics
+    from utils.env import LOCAL_OCR, LOCAL_OCR_HEDGE_MAX_MS, LOCAL_OCR_LANG, LOCAL_OCR_MIN_CONFIDENCE
+    from scrapper.structured_data import parse_price
+
+logger = logging.getLogger(__name__)
+
+# Reads a value off a screenshot on the CPU, without a network call: tesseract
+# OCR (through pytesseract, optional) gives words with boxes and confidences,
+# and every number on the page is scored as the answer to the monitor's
+# description. Scoring prefers, for prices, amounts with a currency; then text
+# set larger than the rest, numbers next to a word from the description, and
+# clean OCR. It penalizes old prices ("was", "RRP"), discounts, instalments,
+# years and long ids.
+#
+# The confidence reported combines the OCR confidence, how far the winner is
+# ahead of the runner-up, and whether it has the expected shape. Only answers
+# at LOCAL_OCR_MIN_CONFIDENCE or above are taken without asking Gemini (see
+# data_extractor.extract_from_image).
+#
+# A word is (text, conf 0-100, left, top, width, height, line id), the shape
+# of tesseract's image_to_data rows.
+
+CURRENCY = "$€£¥₹"
+CURRENCY_CODES = {"USD": "$", "EUR": "€", "GBP": "£", "JPY": "¥", "INR": "₹"}
+PRICE_RE = re.compile(r"\b(price|prices|cost|costs|deal|discount|sale|msrp|pay|paid)\b|[$€£¥₹]", re.I)
+AMOUNT_RE = re.compile(
+    r"(?P<pre>[$€£¥₹]|\b(?:USD|EUR|GBP)\b)?\s?(?P<num>\d[\d,.]*\d|\d)(?P<post>\s?(?:[$€£¥₹]|(?:USD|EUR|GBP)\b))?(?P<pct>\s?%)?"
+)
+# tesseract splits "$1,149.99" into "$1,149" ".99" on some fonts
+SPLIT_DECIMAL_RE = re.compile(r"[.,]\d{2}")
+# OCR confusions inside numbers: "S" or "§" for "$", "O" for 0, "l" for 1, ...
+DOLLAR_MISREAD_RE = re.compile(r"^[S§](?=[\dOo][\d.,OoIl|]*$)")
+DIGIT_LOOKALIKES = str.maketrans({"O": "0", "o": "0", "D": "0", "l": "1", "I": "1", "|": "1", "Z": "2", "B": "8"})
+OLD_PRICE_RE = re.compile(r"\b(was|were|list|rrp|msrp|reg|regular|compare|before|orig\w*|save|off)\b", re.I)
+INSTALMENT_RE = re.compile(r"\b(x|per|/\s?mo|mo|month\w*|weekly|instal\w*|payments?)\b", re.I)
+STOPWORDS = frozenset((
+    "a", "an", "the", "of", "on", "in", "at", "for", "to", "and", "or", "is", "it", "this", "that",
+    "item", "value", "current", "what", "how", "much", "many", "number", "page",
+))
+
+LATENCY_SAMPLES = 64
+MIN_HEDGE_MS = 50
+
+_lock = threading.Lock()
+_available = None
+_latencies = deque(maxlen=LATENCY_SAMPLES)
+
+
+def available():
+    """True when pytesseract and the tesseract binary are installed (and LOCAL_OCR isn't "off")."""
+    global _available
+    if _available is None:
+        if LOCAL_OCR == "off":
+            _available = False
+        else:
+            try:
+                import pytesseract
+                from PIL import Image  # noqa: F401
+
+                pytesseract.get_tesseract_version()
+                _available = True
+            except Exception as e:  # not installed, or no binary on PATH
+                logger.info("local OCR unavailable: %s", e)
+                _available = False
+    return _available
+
+
+def _prepare(image_bytes):
+    from PIL import Image, ImageOps, ImageStat
+
+    img = ImageOps.grayscale(Image.open(io.BytesIO(image_bytes)))
+    if img.height < 120:
+        # element crops: tesseract wants ~30px letters
+        img = img.resize((img.width * 3, img.height * 3), Image.LANCZOS)
+    img = ImageOps.autocontrast(img)
+    if ImageStat.Stat(img).mean[0] < 110:
+        # light text on a dark background
+        img = ImageOps.invert(img)
+    return img
+
+
+def ocr_words(image_bytes):
+    """Words on a PNG/JPEG screenshot, as tesseract sees them."""
+    import pytesseract
+
+    img = _prepare(image_bytes)
+    # a crop is a block of text; a viewport is text scattered over a layout
+    config = "--psm 6" if img.height <= 400 else "--psm 11"
+    data = pytesseract.image_to_data(img, lang=LOCAL_OCR_LANG, config=config, output_type=pytesseract.Output.DICT)
+    words = []
+    for i, text in enumerate(data["text"]):
+        text = (text or "").strip()
+        conf = float(data["conf"][i])
+        if not text or conf < 0:
+            continue
+        line = f"{data['block_num'][i]}.{data['par_num'][i]}.{data['line_num'][i]}"
+        words.append((text, conf, data["left"][i], data["top"][i], data["width"][i], data["height"][i], line))
+    return words
+
+
+def _fix(token):
+    token = DOLLAR_MISREAD_RE.sub("$", token)
+    body = token.lstrip(CURRENCY)
+    digits = sum(c.isdigit() for c in body)
+    if digits and digits * 2 >= len(body.rstrip("%")):
+        token = token[:len(token) - len(body)] + body.translate(DIGIT_LOOKALIKES)
+    return token
+
+
+def _lines(words):
+    """Lines top to bottom, each a (text, spans) with spans = [(start, end, words)]."""
+    grouped = {}
+    for w in words:
+        grouped.setdefault(w[6], []).append(w)
+    out = []
+    for ws in sorted(grouped.values(), key=lambda ws: (min(w[3] for w in ws), min(w[2] for w in ws))):
+        ws.sort(key=lambda w: w[2])
+        text = ""
+        spans = []
+        for w in ws:
+            token = _fix(w[0])
+            if spans and SPLIT_DECIMAL_RE.fullmatch(token) and text[-1].isdigit():
+                start, _, members = spans[-1]
+                text += token
+                spans[-1] = (start, len(text), members + [w])
+                continue
+            if text:
+                text += " "
+            spans.append((len(text), len(text) + len(token), [w]))
+            text += token
+        out.append((text, spans))
+    return out
+
+
+def _keywords(description):
+    return {w for w in re.findall(r"[a-z]+", (description or "").lower()) if w not in STOPWORDS and len(w) > 2}
+
+
+def candidates(words, description):
+    """Every number on the page as (score, candidate dict), best first."""
+    wants_price = bool(PRICE_RE.search(description or ""))
+    keywords = _keywords(description)
+    heights = [w[5] for w in words if any(c.isalnum() for c in w[0])]
+    median_height = statistics.median(heights) if heights else 1
+    lines = _lines(words)
+    out = []
+    for n, (text, spans) in enumerate(lines):
+        previous = lines[n - 1][0].lower() if n else ""
+        for m in AMOUNT_RE.finditer(text):
+            num = m.group("num")
+            value = parse_price(num)
+            if value is None:
+                continue
+            currency = m.group("pre") or (m.group("post") or "").strip()
+            currency = CURRENCY_CODES.get(currency, currency)
+            covered = [w for start, end, ws in spans if start < m.end() and end > m.start() for w in ws]
+            if not covered:
+                continue
+            height = max(w[5] for w in covered)
+            conf = min(w[1] for w in covered) / 100.0
+            before = text[:m.start()].lower()
+            after = text[m.end():].lower()
+            score = 0.0
+            if currency:
+                score += 3.0 if wants_price else 1.0
+            elif wants_price:
+                score -= 2.0 if "." not in num and "," not in num else 1.0
+            # prominence: the current price is usually the biggest number
+            score += max(-1.0, min(2.0, 1.5 * (height / median_height - 1)))
+            context = set(re.findall(r"[a-z]+", before[-40:])) | set(re.findall(r"[a-z]+", previous))
+            if keywords & context:
+                score += 1.0
+            if OLD_PRICE_RE.search(before[-20:]) or OLD_PRICE_RE.match(after.strip()):
+                score -= 3.0
+            if m.group("pct"):
+                score -= 3.0
+            if INSTALMENT_RE.search(before[-8:]) or INSTALMENT_RE.match(after.strip()):
+                score -= 2.0
+            digits = sum(c.isdigit() for c in num)
+            if not currency and ((digits == 4 and 1900 <= value <= 2099) or (digits > 7 and "," not in num)):
+                score -= 2.0
+            score += (conf - 0.7) * 2
+            shown = f"{currency}{num}" if m.group("pre") or not m.group("post") else f"{num} {currency}"
+            out.append((score, {"value": shown, "normalized": value, "currency": currency or None, "ocr": conf}))
+    out.sort(key=lambda c: -c[0])
+    return out
+
+
+def best(words, description):
+    """The extract_from_image result for these OCR words: value, normalized, confidence."""
+    ranked = candidates(words, description)
+    if not ranked:
+        return {"value": None, "normalized": None, "confidence": 0.0, "source": "ocr"}
+    score, top = ranked[0]
+    margin = 1.0 if len(ranked) == 1 else min(1.0, max(0.0, score - ranked[1][0]) / 3.0)
+    typed = 1.0 if top["currency"] or not PRICE_RE.search(description or "") else 0.4
+    confidence = round(0.35 * top["ocr"] + 0.35 * margin + 0.3 * typed, 2)
+    return {"value": top["value"], "normalized": top["normalized"], "confidence": confidence, "source": "ocr"}
+
+
+def confident(result):
+    return bool(result and result.get("value")) and result.get("confidence", 0.0) >= LOCAL_OCR_MIN_CONFIDENCE
+
+
+def extract(image_bytes, description):
+    """Read the value `description` asks for off a screenshot, locally."""
+    start = time.perf_counter()
+    try:
+        words = cpu_pool.run(ocr_words, image_bytes)
+    except Exception as e:
+        logger.warning("local OCR failed: %s", e)
+        metrics.inc("autoscout_ocr_total", outcome="error")
+        return {"value": None, "normalized": None, "confidence": 0.0, "source": "ocr"}
+    result = best(words, description)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        _latencies.append(elapsed)
+    metrics.observe("autoscout_ocr_seconds", elapsed)
+    metrics.inc("autoscout_ocr_total", outcome="confident" if confident(result) else ("unsure" if result["value"] else "empty"))
+    return result
+
+
+def hedge_delay():
+    """Seconds local OCR gets before Gemini is asked as well: its recent p90 latency, capped."""
+    with _lock:
+        samples = sorted(_latencies)
+    cap = LOCAL_OCR_HEDGE_MAX_MS / 1000.0
+    if len(samples) < 8:
+        return cap
+    return max(MIN_HEDGE_MS / 1000.0, min(cap, samples[int(len(samples) * 0.9) - 1]))
+
+
+metrics.describe("autoscout_ocr_total", "counter", "Local OCR reads by outcome (confident, unsure, empty, error).")
+metrics.describe("autoscout_ocr_seconds", "histogram", "Local OCR latency per screenshot, decode to answer.")
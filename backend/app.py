@@ -86,22 +86,61 @@
 # def health():
 #     return {"status": "ok"}
 # backend/app.py
-from fastapi import FastAPI, Request
-from apscheduler.schedulers.background import BackgroundScheduler
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 
 from backend.lambda_fns.create_monitor import parse_interval
 from backend.lambda_fns.check_price import lambda_handler as check_price
 from backend.lambda_fns.notify import lambda_handler as notify
-from backend.db.dynamo_client import create_monitor_item
+from backend.db.dynamo_client import (
+    EDITABLE_FIELDS,
+    create_monitor_item,
+    delete_monitor,
+    get_monitor_by_id,
+    list_monitors,
+    project,
+    set_monitor_status,
+    update_monitor,
+)
 from backend.utils.extract_fields import extract_fields
+from backend.utils import metrics
+from backend.utils.scheduler import remove_check, schedule_check, shutdown_scheduler, start_scheduler
+from backend.utils.check_queue import get_check_queue, shutdown_check_queue
+from backend.utils.cpu_pool import shutdown_cpu_pool
+from backend.utils import llm_budget, streams
+from backend.utils.broker import start_broker, stop_broker
+from backend.utils.env import STREAM_HEARTBEAT_SECONDS
+from backend.db.change_feed import start_change_feed, stop_change_feed
+from backend.scrapper import circuit_breaker, http_client
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import time
 import uuid
 
-app = FastAPI()
-scheduler = BackgroundScheduler()
-scheduler.start()
 
-monitors = {}  # optional: in-memory mirror; DynamoDB is the source of truth
+@asynccontextmanager
+async def lifespan(app):
+    # startup: one scheduler per worker process, started here and not on import
+    metrics.configure_logging()
+    start_scheduler()
+    # no-op unless MONITOR_STREAM_ARN is set
+    start_change_feed()
+    # check events for /stream and /ws; shared across processes when PUBSUB_BROKER_URL is set
+    streams.get_hub().start()
+    start_broker()
+    yield
+    # shutdown: stop scheduler threads so workers exit cleanly
+    shutdown_scheduler()
+    shutdown_check_queue()
+    stop_change_feed()
+    stop_broker()
+    streams.get_hub().stop()
+    shutdown_cpu_pool()
+    http_client.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -112,6 +151,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # label by route template, not raw path, to keep cardinality bounded
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    metrics.observe(
+        "autoscout_http_request_seconds",
+        time.perf_counter() - start,
+        method=request.method,
+        path=path,
+        status=response.status_code,
+    )
+    return response
+
 @app.post("/create_monitor")
 async def api_create_monitor(request: Request):
     body = await request.json()
@@ -119,10 +174,11 @@ async def api_create_monitor(request: Request):
     url = body.get("url")
 
     # Use Gemini to extract fields
-    parsed = extract_fields(original_description)
+    parsed = extract_fields(original_description, user_id=body.get("user_id"))
     extracted_description = parsed.get("description", original_description)
-    condition = parsed.get("condition", body.get("condition", ""))  # body overrides if provided
-    interval_seconds = parse_interval(parsed.get("interval") or original_description)
+    # without Gemini (an error or no budget) the parsed condition comes back empty
+    condition = parsed.get("condition") or body.get("condition", "")
+    interval_seconds = parse_interval(parsed.get("interval") or original_description, user_id=body.get("user_id"))
     url = parsed.get("url") if parsed.get("url") and parsed.get("url") != "none" else body.get("url")
 
     # Generate monitor_id and persist to DynamoDB
@@ -133,31 +189,14 @@ async def api_create_monitor(request: Request):
         interval_seconds=interval_seconds,
         condition=condition,
         monitor_id=monitor_id,  # pass through so check_price can read it later
+        render_profile=body.get("render_profile"),
+        target_selector=body.get("target_selector"),
+        user_id=body.get("user_id"),
+        user_tier=body.get("tier"),
     )
 
-    # (Optional) keep in-memory mirror for quick debugging
-    monitors[monitor_id] = {
-        "url": url,
-        "description": extracted_description,
-        "condition": condition,
-        "interval_seconds": interval_seconds,
-    }
-
     # Schedule periodic check
-    input_payload = {
-        "url": url,
-        "monitor_id": monitor_id,
-        "description": extracted_description,
-        "condition": condition,
-    }
-    scheduler.add_job(
-        check_price,
-        "interval",
-        seconds=interval_seconds,
-        args=[input_payload, None],
-        id=monitor_id,
-        replace_existing=True,
-    )
+    schedule_check(_check_payload(item), interval_seconds)
 
     return {
         "message": "Monitor created",
@@ -166,16 +205,186 @@ async def api_create_monitor(request: Request):
         "parsed": parsed,
     }
 
+def _check_payload(item):
+    return {
+        "url": item["url"],
+        "monitor_id": item["monitor_id"],
+        "description": item["description"],
+        "condition": item.get("condition"),
+        "user_id": item.get("user_id"),
+        "user_tier": item.get("user_tier"),
+    }
+
+@app.get("/monitors")
+def api_list_monitors(user_id: str = None, status: str = None, limit: int = 50, cursor: str = None):
+    # one Query per page whatever the total; pass next_cursor back for the next page
+    try:
+        items, next_cursor = list_monitors(user_id=user_id, status=status, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/monitors/{monitor_id}")
+def api_get_monitor(monitor_id: str):
+    item = get_monitor_by_id(monitor_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="monitor not found")
+    return project(item)
+
+@app.patch("/monitors/{monitor_id}")
+async def api_update_monitor(monitor_id: str, request: Request):
+    body = await request.json()
+    fields = {k: body[k] for k in EDITABLE_FIELDS if k in body}
+    if not fields:
+        raise HTTPException(status_code=400, detail=f"nothing to update; editable fields: {', '.join(EDITABLE_FIELDS)}")
+    if "interval_seconds" in fields:
+        try:
+            fields["interval_seconds"] = int(fields["interval_seconds"])
+        except (TypeError, ValueError):
+            fields["interval_seconds"] = 0
+        if fields["interval_seconds"] <= 0:
+            raise HTTPException(status_code=400, detail="interval_seconds must be a positive integer")
+    item = update_monitor(monitor_id, fields)
+    if not item:
+        raise HTTPException(status_code=404, detail="monitor not found")
+    if item.get("status", "active") == "active":
+        # the job carries the payload and interval, so replace it
+        schedule_check(_check_payload(item), int(item["interval_seconds"]))
+    return project(item)
+
+@app.post("/monitors/{monitor_id}/pause")
+def api_pause_monitor(monitor_id: str):
+    item = set_monitor_status(monitor_id, "paused")
+    if not item:
+        raise HTTPException(status_code=404, detail="monitor not found")
+    remove_check(monitor_id)
+    return project(item)
+
+@app.post("/monitors/{monitor_id}/resume")
+def api_resume_monitor(monitor_id: str):
+    item = set_monitor_status(monitor_id, "active")
+    if not item:
+        raise HTTPException(status_code=404, detail="monitor not found")
+    schedule_check(_check_payload(item), int(item["interval_seconds"]))
+    return project(item)
+
+@app.delete("/monitors/{monitor_id}")
+def api_delete_monitor(monitor_id: str):
+    if not delete_monitor(monitor_id):
+        raise HTTPException(status_code=404, detail="monitor not found")
+    remove_check(monitor_id)
+    return {"message": "Monitor deleted", "monitor_id": monitor_id}
+
 @app.post("/check_price")
 async def api_check_price(request: Request):
     body = await request.json()
+    if body.pop("wait", True) is False:
+        if not body.get("monitor_id"):
+            raise HTTPException(status_code=400, detail="monitor_id is required")
+        # queue it and follow along on the event stream instead of holding the request
+        queued = get_check_queue().submit(body)
+        return {"queued": queued, "monitor_id": body.get("monitor_id"), "stream": f"/stream?monitor_id={body.get('monitor_id')}"}
     return check_price(body, None)
 
+MAX_STREAM_KEYS = 100
+
+def _stream_keys(monitor_id, user_id):
+    # comma-separated ids; at least one, and few enough to stay a cheap lookup
+    monitors = [m for m in (monitor_id or "").split(",") if m]
+    users = [u for u in (user_id or "").split(",") if u]
+    if not monitors and not users:
+        return None, None, "pass monitor_id and/or user_id"
+    if len(monitors) + len(users) > MAX_STREAM_KEYS:
+        return None, None, f"at most {MAX_STREAM_KEYS} ids per stream"
+    return monitors, users, None
+
+async def _snapshots(monitor_ids):
+    # current value of each watched monitor, read through the monitor cache
+    frames = []
+    for monitor_id in monitor_ids:
+        item = await asyncio.to_thread(get_monitor_by_id, monitor_id)
+        if item:
+            frames.append({"type": "snapshot", "monitor_id": monitor_id, "user_id": item.get("user_id"),
+                           "status": item.get("status", "active"), "value": item.get("last_price"),
+                           "last_checked": item.get("last_checked")})
+    return frames
+
+@app.get("/stream")
+async def api_stream(request: Request, monitor_id: str = None, user_id: str = None):
+    # Server-Sent Events: a snapshot per monitor, then queued/started/fetched/extracted/triggered/checked
+    monitors, users, error = _stream_keys(monitor_id, user_id)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    last = request.headers.get("last-event-id")
+    last = int(last) if last and last.isdigit() else None
+    hub = streams.get_hub()
+
+    async def frames():
+        # subscribed before the snapshot is read, so nothing falls in between
+        sub = hub.open(monitors, users, last)
+        try:
+            yield b"retry: 3000\n\n"
+            if last is None:
+                for event in await _snapshots(monitors):
+                    yield streams.encode(None, event)[3]
+            while True:
+                frame = await sub.next(STREAM_HEARTBEAT_SECONDS)
+                yield frame[3] if frame else b": keepalive\n\n"
+        finally:
+            hub.close(sub)
+
+    return StreamingResponse(frames(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws")
+async def api_ws(websocket: WebSocket, monitor_id: str = None, user_id: str = None):
+    # same events as /stream, one JSON text message each
+    monitors, users, error = _stream_keys(monitor_id, user_id)
+    if error:
+        await websocket.close(code=1008, reason=error)
+        return
+    await websocket.accept()
+    hub = streams.get_hub()
+    sub = hub.open(monitors, users)
+    try:
+        for event in await _snapshots(monitors):
+            await websocket.send_text(streams.to_json(event))
+        while True:
+            frame = await sub.next(STREAM_HEARTBEAT_SECONDS)
+            await websocket.send_text(frame[2] if frame else '{"type":"ping"}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.close(sub)
+
 @app.post("/notify")
 async def api_notify(request: Request):
     body = await request.json()
     return notify(body, None)
 
+@app.get("/breakers")
+def api_breakers(state: str = None):
+    # state: "open", "half_open" or "closed" (closed = failing but under threshold)
+    return {"breakers": circuit_breaker.snapshot(state)}
+
+@app.delete("/breakers")
+def api_reset_breakers(domain: str = None, url: str = None):
+    return {"reset": circuit_breaker.reset(domain=domain, url=url)}
+
+@app.get("/llm_budget")
+def api_llm_budget(user_id: str = None):
+    # Gemini usage over the sliding windows, current mode and projected spend
+    return llm_budget.snapshot(user_id)
+
+@app.delete("/llm_budget/cooldown")
+def api_reset_llm_cooldown():
+    # after raising the API quota: resume Gemini calls without waiting out the backoff
+    return {"reset": llm_budget.reset()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def api_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def health():
     return {"status": "ok"}
\ No newline at end of file
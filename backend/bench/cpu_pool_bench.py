@@ -0,0 +1,131 @@
+# backend/bench/cpu_pool_bench.py
+"""
+Throughput of parsing and image work inline (check-worker threads sharing the
+GIL) against the CPU process pool, and the cost of moving a buffer to a
+worker through shared memory versus pickling it.
+
+    python -m backend.bench.cpu_pool_bench --threads 8 --tasks 64
+
+Workloads, all the size of a heavy real page or capture:
+  dom_fingerprint   dom_diff.fingerprint on a ~400KB listing page
+  structured        extract_structured on a ~140KB page with microdata
+  screenshot_hash   visual_diff.fingerprint on a 1366x1024 PNG (needs Pillow)
+
+Each runs --tasks times from --threads threads, inline and then through the
+pool at 1, 2, 4... workers up to the core count. Gains need more than one
+core; on a single core the pool rows show only the hop overhead.
+"""
+import argparse
+import os
+import pickle
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.bench.dom_diff_bench import page as listing_page
+from backend.scrapper import dom_diff, structured_data, visual_diff
+from backend.utils import cpu_pool
+
+
+def microdata_page(items=1500):
+    rows = "".join(
+        f'<div class="row"><p>Accessory {i} with a longer description of what is in the box.</p></div>'
+        for i in range(items)
+    )
+    return (f"<html><head><title>Kettle</title></head><body>{rows}"
+            '<div itemscope itemtype="https://schema.org/Product"><h1 itemprop="name">Kettle</h1>'
+            '<div itemprop="offers" itemscope itemtype="https://schema.org/Offer">'
+            '<meta itemprop="priceCurrency" content="GBP"><span itemprop="price" content="34.99">£34.99</span>'
+            '<link itemprop="availability" href="https://schema.org/InStock"></div></div></body></html>')
+
+
+def _len(data):
+    return len(data)
+
+
+def workloads():
+    out = [
+        ("dom_fingerprint", dom_diff.fingerprint, listing_page(3000), ()),
+        ("structured", structured_data.extract_structured, microdata_page(), ("price of the kettle",)),
+    ]
+    try:
+        from backend.bench.visual_diff_bench import viewport
+
+        out.append(("screenshot_hash", visual_diff.fingerprint, viewport("$255.00"), ()))
+    except ImportError:
+        print("Pillow not installed; skipping screenshot_hash")
+    return out
+
+
+def run_batch(fn, data, args, threads, tasks, pooled):
+    call = (lambda: cpu_pool.run(fn, data, *args, min_bytes=0)) if pooled else (lambda: fn(data, *args))
+    latencies = []
+
+    def one(_):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        list(ex.map(one, range(tasks)))
+    wall = time.perf_counter() - start
+    return tasks / wall, statistics.median(latencies) * 1000
+
+
+def transport(size, repeat):
+    """Round trip of a trivial task carrying `size` bytes: pickled vs shared memory."""
+    data = os.urandom(size)
+    threshold, cpu_pool.SHARED_MEMORY_MIN_BYTES = cpu_pool.SHARED_MEMORY_MIN_BYTES, 0
+    pool = cpu_pool.get_cpu_pool()
+    pool.submit(_len, b"").result()
+    samples = {"pickle": [], "shared": []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pool.submit(_len, data).result()
+        samples["pickle"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        cpu_pool.run(_len, data, min_bytes=0)
+        samples["shared"].append(time.perf_counter() - start)
+    cpu_pool.SHARED_MEMORY_MIN_BYTES = threshold
+    return {k: statistics.median(v) * 1000 for k, v in samples.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    cores = os.cpu_count() or 1
+    counts = sorted({1, args.max_workers} | {w for w in (2, 4, 8, 16, 32) if w < args.max_workers})
+    print(f"cores={cores} threads={args.threads} tasks={args.tasks}")
+    print(f"{'workload':<16} {'KB':>6} {'mode':<10} {'tasks/s':>9} {'p50 ms':>8} {'speedup':>8}")
+    for name, fn, data, fn_args in workloads():
+        size = len(data) / 1024
+        base, p50 = run_batch(fn, data, fn_args, args.threads, args.tasks, pooled=False)
+        print(f"{name:<16} {size:>6.0f} {'inline':<10} {base:>9.1f} {p50:>8.2f} {1.0:>7.2f}x")
+        for workers in counts:
+            cpu_pool.CPU_WORKERS = workers
+            cpu_pool.shutdown_cpu_pool()
+            run_batch(fn, data, fn_args, workers, workers, pooled=True)  # start and warm the workers
+            rate, p50 = run_batch(fn, data, fn_args, args.threads, args.tasks, pooled=True)
+            print(f"{'':<16} {'':>6} {f'pool x{workers}':<10} {rate:>9.1f} {p50:>8.2f} {rate / base:>7.2f}x")
+    cpu_pool.CPU_WORKERS = 1
+    cpu_pool.shutdown_cpu_pool()
+    print("buffer transport, round trip of a no-op task (ms):")
+    for size in (64 * 1024, 256 * 1024, 1024 * 1024, 8 * 1024 * 1024):
+        t = transport(size, 20)
+        print(f"  {size // 1024:>6} KB  pickled={t['pickle']:.2f}  shared memory={t['shared']:.2f}")
+    cpu_pool.shutdown_cpu_pool()
+    # results must match whichever way they ran
+    for name, fn, data, fn_args in workloads()[:2]:
+        cpu_pool.CPU_WORKERS = 1
+        same = pickle.dumps(fn(data, *fn_args)) == pickle.dumps(cpu_pool.run(fn, data, *fn_args, min_bytes=0))
+        print(f"{name}: pool result {'matches' if same else 'DIFFERS from'} inline")
+    cpu_pool.shutdown_cpu_pool()
+
+
+if __name__ == "__main__":
+    main()
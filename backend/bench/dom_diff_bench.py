@@ -0,0 +1,84 @@
+# backend/bench/dom_diff_bench.py
+"""
+Cost and decisions of the DOM diff behind "any change" monitors.
+
+    python -m backend.bench.dom_diff_bench --repeat 20
+
+Builds a synthetic listing page (nav, cookie banner, ad slot, scripts with
+fresh tokens, a "last updated" clock, and N listing rows), mutates it the
+way real pages churn, and runs dom_diff.fingerprint() + compare() against
+the original. Each case reports whether a change was reported and how long
+the fingerprint and diff took, at a few page sizes to show the cost stays
+linear.
+"""
+import argparse
+import statistics
+import time
+
+from backend.scrapper import dom_diff
+
+
+def page(rows=200, token="a1b2c3d4e5f60718", clock="10:42:07", ad=0, price_of=None, extra=0, order=1):
+    items = []
+    for i in range(rows)[::order]:
+        price = "$19.99" if i != price_of else "$17.49"
+        items.append(f"<li class='result'><h3>Listing {i}</h3><p>Condition: used, ships in 2 days. "
+                     f"Seller {i % 17} has {90 + i % 10}% positive feedback.</p><span>{price}</span></li>")
+    for i in range(extra):
+        items.append(f"<li class='result'><h3>New listing {i}</h3><p>Just posted.</p><span>$9.00</span></li>")
+    return f"""<!doctype html><html><head><title>Results</title>
+<script>window.__state = {{"session": "{token}"}};</script><style>.result {{ margin: 0 }}</style></head>
+<body><nav><a href="/">Home</a> <a href="/deals">Deals</a></nav>
+<div id="cookie-consent">We use cookies. <button>Accept</button></div>
+<div class="ad-slot">Sponsored: offer #{ad}</div>
+<main><h1>Search results</h1><p>Last updated {clock} ({ad + 3} minutes ago)</p>
+<ul>{''.join(items)}</ul></main>
+<footer>&copy; 2025 Example <span>build {token}</span></footer>
+<script>track("{token}");</script></body></html>"""
+
+
+CASES = (
+    # name, kwargs for the new page, expected change
+    ("identical", {}, False),
+    ("tokens, clock, ad", {"token": "ffee99887766aabb", "clock": "10:47:55", "ad": 4}, False),
+    ("rows re-sorted", {"order": -1}, False),
+    ("one price changed", {"price_of": 7}, True),
+    ("listing added", {"extra": 1}, True),
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    ok = 0
+    print(f"{'case':<20} {'rows':>6} {'page KB':>8} {'blocks':>7} {'p50 ms':>7} {'max ms':>7}  decision")
+    for rows in (50, 500, 1500):
+        base_fp = dom_diff.fingerprint(page(rows))
+        stored = dom_diff.pack(base_fp[0])
+        for name, kwargs, expect_change in CASES:
+            new = page(rows, **kwargs)
+            samples = []
+            for _ in range(args.repeat):
+                dom_diff.forget("bench")
+                dom_diff.compare("bench", None, base_fp)
+                start = time.perf_counter()
+                result = dom_diff.compare("bench", stored, dom_diff.fingerprint(new))
+                samples.append((time.perf_counter() - start) * 1000)
+            good = result["changed"] == expect_change
+            ok += good
+            if result["changed"]:
+                decision = "changed: " + dom_diff.describe(result, limit=1)[:60]
+            else:
+                decision = "unchanged"
+            print(f"{name:<20} {rows:>6} {len(new) / 1024:>8.1f} {result['blocks']:>7} "
+                  f"{statistics.median(samples):>7.2f} {max(samples):>7.2f}  {'ok ' if good else 'BAD'} {decision}")
+    dom_diff.forget()
+    total = 3 * len(CASES)
+    print(f"decisions: {ok}/{total} as expected")
+    return ok == total
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
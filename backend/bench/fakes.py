@@ -0,0 +1,298 @@
+# backend/bench/fakes.py
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+
+TITLE_RE = re.compile(rb"<title>(.*?)</title>", re.S | re.I)
+TAG_RE = re.compile(r"<[^>]+>")
+CURRENCY_RE = re.compile(r"[\$€£]\s*[0-9,]+(?:\.[0-9]+)?")
+NUMBER_RE = re.compile(r"-?[0-9][0-9,]*(?:\.[0-9]+)?")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeLLM:
+    """
+    Deterministic stand-in for genai.Client. Only `models.generate_content`
+    is implemented; it recognises the prompts this repo sends and answers
+    them without a network call, after an optional simulated latency.
+
+    `answers` maps a page <title> to the value a vision model would read off
+    the screenshot (see FixtureScreenshotter, which hands page HTML through
+    as the "image").
+    """
+
+    def __init__(self, answers=None, latency_ms=0, jitter_ms=0, seed=0):
+        self.answers = answers or {}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.models = self
+
+    def _sleep(self):
+        if not self.latency_ms and not self.jitter_ms:
+            return
+        with self._lock:
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0
+        time.sleep((self.latency_ms + jitter) / 1000.0)
+
+    def generate_content(self, model=None, contents=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        self._sleep()
+        if isinstance(contents, (list, tuple)):
+            return FakeResponse(self._answer_image(contents))
+        return FakeResponse(self._answer_text(contents or ""))
+
+    def _answer_image(self, parts):
+        data = b""
+        for part in parts:
+            if isinstance(part, (bytes, bytearray)):
+                data = bytes(part)
+            inline = getattr(part, "inline_data", None)
+            if inline is not None and getattr(inline, "data", None):
+                data = inline.data
+        m = TITLE_RE.search(data)
+        if m:
+            title = m.group(1).decode("utf-8", "replace").strip()
+            if title in self.answers:
+                return str(self.answers[title])
+        text = TAG_RE.sub(" ", data.decode("utf-8", "replace"))
+        m = CURRENCY_RE.search(text) or NUMBER_RE.search(text)
+        return m.group(0) if m else "not found"
+
+    def _answer_text(self, prompt):
+        if "Evaluate the following statement" in prompt:
+            found = re.findall(r"\*\*(.*?)\*\*", prompt, re.S)
+            value, condition = (found + ["", ""])[:2]
+            return "true" if evaluate_condition(value, condition) else "false"
+        if "monitoring interval in seconds" in prompt:
+            m = re.search(r'Description: "(.*?)"', prompt, re.S)
+            return str(interval_seconds(m.group(1) if m else ""))
+        if "structured data extractor" in prompt:
+            request = prompt.rsplit("Request:", 1)[-1]
+            return json.dumps(parse_request(request))
+        if "monitored web page changed" in prompt:
+            added = re.search(r"^\s*\+ (.*)$", prompt, re.M)
+            return f"Added: {added.group(1)}" if added else "Content was removed."
+        if "information extraction assistant" in prompt:
+            html = prompt.split("HTML/TEXT:", 1)[-1]
+            m = CURRENCY_RE.search(TAG_RE.sub(" ", html))
+            value = m.group(0) if m else None
+            return json.dumps({"value": value, "normalized": None, "confidence": 0.7 if value else 0.1})
+        return ""
+
+
+def _to_number(text):
+    m = NUMBER_RE.search(str(text or ""))
+    if not m:
+        return None
+    try:
+        return float(m.group(0).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def evaluate_condition(value, condition):
+    cond = (condition or "").lower()
+    if "any change" in cond or not cond:
+        return True
+    v = _to_number(value)
+    t = _to_number(cond)
+    if v is None or t is None:
+        return str(value).lower() in cond
+    if re.search(r"less than|below|under|drops|<", cond):
+        return v < t
+    if re.search(r"greater than|above|over|more than|>", cond):
+        return v > t
+    return v == t
+
+
+def interval_seconds(text):
+    m = re.search(r"(\d+)\s*(second|minute|hour|day)", text.lower())
+    if not m:
+        return 3600
+    scale = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}[m.group(2)]
+    return int(m.group(1)) * scale
+
+
+def parse_request(request):
+    url = re.search(r"https?://\S+", request)
+    interval = re.search(r"every\s+(\d+\s*\w+)", request, re.I)
+    condition = re.search(r"(?:when|if)\s+(?:it\s+is\s+|it's\s+)?(.+)$", request.strip(), re.I)
+    what = re.search(r"(?:track|monitor|watch)\s+(?:the\s+)?(.+?)\s+(?:on|at|from)\s", request, re.I)
+    return {
+        "description": what.group(1) if what else "price of the item",
+        "interval": interval.group(1) if interval else "none",
+        "condition": condition.group(1).strip() if condition else "any change",
+        "url": url.group(0).rstrip(".,") if url else "none",
+    }
+
+
+class InMemoryTable:
+    """
+    Thread-safe stand-in for a boto3 DynamoDB Table resource, covering the
+    calls made from backend/db/dynamo_client.py. Items are copied on the way
+    in and out, like a real round trip.
+    """
+
+    # GSI name -> (partition key, sort key), as in backend/db/dynamo_client.py
+    INDEXES = {
+        "user-index": ("user_id", "created_at"),
+        "user-status-index": ("user_id", "status_key"),
+        "status-index": ("status_shard", "next_run_at"),
+    }
+
+    def __init__(self, key="monitor_id", latency_ms=0):
+        self.key = key
+        self.latency = latency_ms / 1000.0
+        self.items = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _tick(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def put_item(self, Item, **kwargs):
+        self._tick()
+        with self._lock:
+            self.items[Item[self.key]] = dict(Item)
+        return {}
+
+    def get_item(self, Key, ProjectionExpression=None, **kwargs):
+        self._tick()
+        with self._lock:
+            item = self.items.get(Key[self.key])
+            if item is None:
+                return {}
+            if ProjectionExpression:
+                fields = [f.strip() for f in ProjectionExpression.split(",")]
+                return {"Item": {f: item[f] for f in fields if f in item}}
+            return {"Item": dict(item)}
+
+    def delete_item(self, Key, ReturnValues=None, **kwargs):
+        self._tick()
+        with self._lock:
+            old = self.items.pop(Key[self.key], None)
+        return {"Attributes": old} if old is not None and ReturnValues == "ALL_OLD" else {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues=None,
+                    ExpressionAttributeNames=None, ConditionExpression=None, ReturnValues=None, **kwargs):
+        self._tick()
+        values = ExpressionAttributeValues or {}
+        names = ExpressionAttributeNames or {}
+        with self._lock:
+            # only the "attribute_exists(<key>)" guard is modelled
+            if ConditionExpression and "attribute_exists" in ConditionExpression and Key[self.key] not in self.items:
+                from botocore.exceptions import ClientError
+                raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+            item = self.items.setdefault(Key[self.key], dict(Key))
+            for action, body in re.findall(r"(SET|REMOVE)\s+(.*?)(?=\s+(?:SET|REMOVE)\s|$)", UpdateExpression.strip()):
+                for clause in body.split(","):
+                    clause = clause.strip()
+                    if action == "SET":
+                        attr, placeholder = [c.strip() for c in clause.split("=", 1)]
+                        item[names.get(attr, attr)] = values.get(placeholder)
+                    else:
+                        item.pop(names.get(clause, clause), None)
+            return {"Attributes": dict(item)} if ReturnValues == "ALL_NEW" else {}
+
+    @staticmethod
+    def _matches(condition, item):
+        expr = condition.get_expression()
+        op, args = expr["operator"], expr["values"]
+        if op == "AND":
+            return all(InMemoryTable._matches(c, item) for c in args)
+        value = item.get(args[0].name)
+        if value is None:
+            return False
+        if op == "=":
+            return value == args[1]
+        if op == "begins_with":
+            return str(value).startswith(args[1])
+        if op == "BETWEEN":
+            return args[1] <= value <= args[2]
+        return {"<": value < args[1], "<=": value <= args[1], ">": value > args[1], ">=": value >= args[1]}[op]
+
+    def query(self, IndexName, KeyConditionExpression, Limit=None, ScanIndexForward=True,
+              ExclusiveStartKey=None, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        self._tick()
+        pk, sk = self.INDEXES[IndexName]
+        with self._lock:
+            # sparse index: items without both key attributes are not in it
+            rows = [dict(i) for i in self.items.values()
+                    if i.get(pk) is not None and i.get(sk) is not None and self._matches(KeyConditionExpression, i)]
+        rows.sort(key=lambda i: (i[sk], i[self.key]), reverse=not ScanIndexForward)
+        if ExclusiveStartKey:
+            start = (ExclusiveStartKey[sk], ExclusiveStartKey[self.key])
+            after = (lambda r: (r[sk], r[self.key]) > start) if ScanIndexForward else (lambda r: (r[sk], r[self.key]) < start)
+            rows = [r for r in rows if after(r)]
+        page = rows[:Limit] if Limit else rows
+        resp = {"Count": len(page)}
+        if Limit and len(rows) > Limit:
+            last = page[-1]
+            resp["LastEvaluatedKey"] = {self.key: last[self.key], pk: last[pk], sk: last[sk]}
+        if ProjectionExpression:
+            names = ExpressionAttributeNames or {}
+            fields = [names.get(f.strip(), f.strip()) for f in ProjectionExpression.split(",")]
+            page = [{f: r[f] for f in fields if f in r} for r in page]
+        resp["Items"] = page
+        return resp
+
+    def scan(self, FilterExpression=None, **kwargs):
+        self._tick()
+        with self._lock:
+            items = [dict(i) for i in self.items.values()]
+        if FilterExpression is not None:
+            expr = FilterExpression.get_expression()
+            if expr.get("operator") == "=":
+                attr, expected = expr["values"]
+                items = [i for i in items if i.get(attr.name) == expected]
+        return {"Items": items, "Count": len(items)}
+
+
+class FakeSNS:
+    def __init__(self, latency_ms=0, keep=1000):
+        self.latency = latency_ms / 1000.0
+        self.published = deque(maxlen=keep)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def publish(self, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.count += 1
+            self.published.append(kwargs)
+        return {"MessageId": uuid.uuid4().hex}
+
+
+class FixtureScreenshotter:
+    """
+    Replaces the Selenium screenshot with a real HTTP GET against the fixture
+    server; the page bytes stand in for PNG bytes so FakeLLM can "read" them.
+    """
+
+    def __init__(self, render_ms=0):
+        self.render = render_ms / 1000.0
+
+    def __call__(self, url, timeout=30000, **kwargs):
+        from urllib.request import urlopen
+
+        with urlopen(url, timeout=timeout / 1000.0) as resp:
+            body = resp.read()
+        if self.render:
+            time.sleep(self.render)
+        return body
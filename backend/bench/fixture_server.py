@@ -0,0 +1,91 @@
+# backend/bench/fixture_server.py
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_pages(fixtures_dir=FIXTURES_DIR):
+    pages = {}
+    for name in sorted(os.listdir(fixtures_dir)):
+        if name.endswith(".html"):
+            with open(os.path.join(fixtures_dir, name), "rb") as f:
+                pages[name] = f.read()
+    return pages
+
+
+class FixtureServer:
+    """
+    Serves recorded product pages from backend/bench/fixtures on 127.0.0.1.
+    URLs look like http://127.0.0.1:<port>/p/<fixture.html>?m=<monitor>; the
+    query string is ignored so every monitor gets its own URL but the same page.
+    """
+
+    def __init__(self, latency_ms=0, fixtures_dir=FIXTURES_DIR):
+        self.pages = load_pages(fixtures_dir)
+        self.latency = latency_ms / 1000.0
+        self.hits = 0
+        self._hits_lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out in separate writes; without TCP_NODELAY a
+            # kept-alive connection stalls ~40ms on Nagle + delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                name = urlparse(self.path).path.rsplit("/", 1)[-1]
+                body = server.pages.get(name)
+                with server._hits_lock:
+                    server.hits += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, name, monitor_index=0):
+        return f"{self.base_url}/p/{name}?m={monitor_index}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,72 @@
+# backend/bench/http_bench.py
+"""
+Connection reuse in the scraper HTTP client.
+
+    python -m backend.bench.http_bench --fetches 500 --workers 8
+    python -m backend.bench.http_bench --url https://example.com/ --fetches 50
+
+Compares a fresh `requests.get` per fetch (the old behaviour) with the shared
+pooled client in backend/scrapper/http_client.py. Without --url it targets the
+local fixture server, so only TCP setup is saved. Point it at a real HTTPS host
+to see the TLS handshake savings.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from backend.bench.fixture_server import FixtureServer
+from backend.bench.run import percentile
+from backend.scrapper import http_client
+
+
+def per_call(url, timeout=15):
+    resp = requests.get(url, headers={"User-Agent": http_client.USER_AGENT}, timeout=timeout)
+    resp.raise_for_status()
+    return resp.text
+
+
+def run(fn, urls, workers):
+    latencies = []
+
+    def one(url):
+        start = time.perf_counter()
+        fn(url)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies.extend(pool.map(one, urls))
+    wall = time.perf_counter() - start
+    return len(urls) / wall, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fetches", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--url", help="fetch this URL instead of the local fixtures")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        urls = [args.url] * args.fetches
+    else:
+        server = FixtureServer().start()
+        names = sorted(server.pages)
+        urls = [server.url_for(names[i % len(names)], i) for i in range(args.fetches)]
+    try:
+        http_client.get_client()  # build outside the timed region
+        for label, fn in (("requests.get per fetch", per_call), ("shared pooled client", http_client.fetch_text)):
+            rate, p50, p99 = run(fn, urls, args.workers)
+            print(f"{label:<24} {rate:8.1f} fetch/s  p50={p50:7.2f}ms  p99={p99:7.2f}ms")
+        print(f"backend={http_client._backend}")
+    finally:
+        http_client.close()
+        if server:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# backend/bench/import_time.py
+"""
+Measure cold import cost of the backend entry points.
+
+    python -m backend.bench.import_time --repeat 5
+
+Each import runs in a fresh interpreter with `-X importtime`. The report shows
+wall time, the slowest top-level imports, and the threads still alive
+afterwards. A non-zero thread count means something started work at import time.
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+TARGETS = (
+    "backend.app",
+    "backend.lambda_fns.check_price",
+    "backend.lambda_fns.create_monitor",
+)
+
+PROBE = (
+    "import time, threading; t = time.perf_counter(); import {module}; "
+    "print('WALL', time.perf_counter() - t); "
+    "print('THREADS', sum(1 for th in threading.enumerate() if th is not threading.main_thread()))"
+)
+LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    wall = float(re.search(r"WALL (\S+)", proc.stdout).group(1))
+    threads = int(re.search(r"THREADS (\d+)", proc.stdout).group(1))
+    top = []
+    for self_us, cumulative_us, indent, name in LINE_RE.findall(proc.stderr):
+        # depth 2 (three spaces) are the packages pulled in by the target itself;
+        # depth 1 is the target plus interpreter startup noise (site, encodings)
+        if len(indent) == 3:
+            top.append((int(cumulative_us), name))
+    top.sort(reverse=True)
+    return wall, threads, top
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("modules", nargs="*", default=list(TARGETS))
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        walls = []
+        threads = 0
+        top = []
+        for _ in range(args.repeat):
+            wall, threads, top = measure(module)
+            walls.append(wall)
+        print(f"{module}: median={statistics.median(walls) * 1000:.1f}ms "
+              f"min={min(walls) * 1000:.1f}ms threads_after_import={threads}")
+        for cumulative_us, name in top[:args.top]:
+            print(f"    {cumulative_us / 1000:8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
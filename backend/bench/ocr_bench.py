@@ -0,0 +1,128 @@
+# backend/bench/ocr_bench.py
+"""
+Accuracy and CPU throughput of the local OCR path for screenshots.
+
+    python -m backend.bench.ocr_bench --repeat 20 --threads 4
+
+Two parts:
+  recorded   candidate scoring on fixtures/ocr_corpus.json: OCR words in the
+             shape tesseract's image_to_data returns, with the misreads
+             (S for $, O for 0, split decimals) and layouts (was/now prices,
+             instalments, ratings, ads) that real captures produce. Runs
+             anywhere; measures the scoring alone.
+  live       tesseract on Pillow-rendered captures (element crops and full
+             viewports) of the fixture prices, single-threaded and from
+             --threads threads. Needs pytesseract and the tesseract binary;
+             skipped otherwise.
+
+"confident" answers are the ones taken without asking Gemini, so their
+precision is the number that matters: a confident wrong answer is never
+checked by the model.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.agents import local_ocr
+from backend.bench.fixture_server import FIXTURES_DIR
+
+
+def load_corpus():
+    with open(os.path.join(FIXTURES_DIR, "ocr_corpus.json")) as f:
+        cases = json.load(f)
+    for case in cases:
+        case["words"] = [tuple(w) for w in case["words"]]
+    return cases
+
+
+def correct(result, expected):
+    if expected is None:
+        return result["value"] is None
+    return result["normalized"] is not None and abs(result["normalized"] - expected) < 0.005
+
+
+def report(name, rows):
+    """rows: (case name, result, expected, seconds)"""
+    right = sum(correct(r, e) for _, r, e, _ in rows)
+    sure = [(r, e) for _, r, e, _ in rows if local_ocr.confident(r)]
+    sure_right = sum(correct(r, e) for r, e in sure)
+    p50 = statistics.median(s for *_, s in rows) * 1000
+    print(f"{name}: accuracy {right}/{len(rows)}, confident {len(sure)}/{len(rows)} "
+          f"(precision {sure_right}/{len(sure)}), p50 {p50:.2f}ms")
+
+
+def recorded(repeat):
+    rows = []
+    for case in load_corpus():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = local_ocr.best(case["words"], case["description"])
+        elapsed = (time.perf_counter() - start) / repeat
+        rows.append((case["name"], result, case["expected"], elapsed))
+        mark = "ok " if correct(result, case["expected"]) else "BAD"
+        sure = "confident" if local_ocr.confident(result) else "ask gemini"
+        print(f"  {mark} {case['name']:<20} {str(result['value']):<12} {result['confidence']:.2f}  {sure}")
+    report("recorded", rows)
+
+
+def captures():
+    from backend.bench.visual_diff_bench import element, viewport
+
+    with open(os.path.join(FIXTURES_DIR, "manifest.json")) as f:
+        manifest = json.load(f)
+    out = []
+    for name, spec in manifest.items():
+        expected = spec["expected"]
+        if "price" not in spec["description"]:
+            continue
+        text = f"${expected:,.2f}"
+        out.append((f"{name}:element", spec["description"], element(text), expected))
+        out.append((f"{name}:viewport", spec["description"], viewport(text, banner=1), expected))
+    return out
+
+
+def live(repeat, threads):
+    try:
+        items = captures()
+    except ImportError:
+        print("live: Pillow/numpy not installed; skipped")
+        return
+    if not local_ocr.available():
+        print("live: pytesseract or the tesseract binary not installed; skipped")
+        return
+    rows = []
+    for name, description, image, expected in items:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = local_ocr.extract(image, description)
+        rows.append((name, result, expected, (time.perf_counter() - start) / repeat))
+        print(f"  {'ok ' if correct(result, expected) else 'BAD'} {name:<32} {str(result['value']):<12} "
+              f"{result['confidence']:.2f} {len(image) // 1024}KB")
+    report("live", rows)
+    jobs = [(image, description) for _, description, image, _ in items] * repeat
+    start = time.perf_counter()
+    for image, description in jobs:
+        local_ocr.extract(image, description)
+    single = len(jobs) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        list(ex.map(lambda job: local_ocr.extract(*job), jobs))
+    parallel = len(jobs) / (time.perf_counter() - start)
+    print(f"live throughput: {single:.1f} images/s on one thread, {parallel:.1f} images/s on {threads} "
+          f"(cores={os.cpu_count()}); next hedge head start {local_ocr.hedge_delay() * 1000:.0f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+    recorded(args.repeat * 50)
+    live(max(1, args.repeat // 10), args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# backend/bench/queue_bench.py
+"""
+Lateness under overload: FIFO vs the priority/fair-share check queue.
+
+    python -m backend.bench.queue_bench --bulk 3000 --workers 4 --cost-ms 2
+
+Replays a saturating burst against backend/utils/check_queue.py with a fake
+check that just sleeps `--cost-ms`:
+
+  * "bulkco" (free tier) has --bulk hourly monitors, all due at once
+  * "acme" (pro tier) has --bulk / 4 hourly monitors due at the same time
+  * "alice" (free tier) has 10 one-minute monitors falling due every 50ms
+
+The same workload is run through a plain FIFO pool (what APScheduler's thread
+pool amounts to) and through CheckQueue. The report gives lateness per
+priority class and how worker time was split between the two bulk users while
+both had work queued.
+"""
+import argparse
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from backend.bench.run import percentile
+from backend.utils.check_queue import CheckQueue, priority_class
+
+
+def workload(bulk):
+    heavy = [{"monitor_id": f"bulkco-{i}", "user_id": "bulkco", "user_tier": "free", "interval_seconds": 3600}
+             for i in range(bulk)]
+    heavy += [{"monitor_id": f"acme-{i}", "user_id": "acme", "user_tier": "pro", "interval_seconds": 3600}
+              for i in range(bulk // 4)]
+    fast = [{"monitor_id": f"alice-{i}", "user_id": "alice", "user_tier": "free", "interval_seconds": 60,
+             "condition": "price below 100"} for i in range(10)]
+    return heavy, fast
+
+
+class Recorder:
+    def __init__(self, cost):
+        self.cost = cost
+        self.lock = threading.Lock()
+        self.lateness = defaultdict(list)
+        self.done = []  # (finish time, user)
+
+    def run(self, payload, due):
+        start = time.monotonic()
+        time.sleep(self.cost)
+        with self.lock:
+            self.lateness[priority_class(payload["interval_seconds"])].append(start - due)
+            self.done.append((time.monotonic(), payload["user_id"]))
+
+
+def drive(submit, heavy, fast, rounds, period):
+    now = time.monotonic()
+    for payload in heavy:
+        submit(payload, now)
+    for _ in range(rounds):
+        time.sleep(period)
+        now = time.monotonic()
+        for payload in fast:
+            submit(payload, now)
+
+
+def run_fifo(heavy, fast, workers, rec, rounds, period):
+    q = queue.Queue()
+
+    def work():
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            rec.run(*item)
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    drive(lambda p, due: q.put((p, due)), heavy, fast, rounds, period)
+    for _ in threads:
+        q.put(None)
+    for t in threads:
+        t.join()
+
+
+def run_priority(heavy, fast, workers, rec, rounds, period):
+    dues = {}
+
+    def runner(payload):
+        rec.run(payload, dues[payload["monitor_id"]])
+
+    cq = CheckQueue(workers=workers, runner=runner).start()
+
+    def submit(payload, due):
+        dues[payload["monitor_id"]] = due
+        cq.submit(payload, due)
+
+    drive(submit, heavy, fast, rounds, period)
+    while len(cq):
+        time.sleep(0.01)
+    cq.stop()
+
+
+def report(label, rec):
+    print(label)
+    for klass in ("realtime", "standard", "bulk"):
+        samples = rec.lateness.get(klass)
+        if samples:
+            print(f"  {klass:<9} n={len(samples):<6} lateness p50={percentile(samples, 50) * 1000:8.1f}ms  "
+                  f"p99={percentile(samples, 99) * 1000:8.1f}ms")
+    # worker share while both bulk users still had work: up to the first one finishing
+    done = sorted(rec.done)
+    last = {u: t for t, u in done}
+    cutoff = min(last.get("bulkco", 0), last.get("acme", 0))
+    counts = defaultdict(int)
+    for t, u in done:
+        if t <= cutoff:
+            counts[u] += 1
+    if counts["bulkco"]:
+        print(f"  share while contended: acme(pro)={counts['acme']} bulkco(free)={counts['bulkco']} "
+              f"ratio={counts['acme'] / counts['bulkco']:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bulk", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--cost-ms", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    heavy, fast = workload(args.bulk)
+    backlog = len(heavy) * args.cost_ms / 1000 / args.workers
+    period = 0.05
+    rounds = max(1, int(backlog / period))
+    for label, fn in (("fifo", run_fifo), ("priority queue", run_priority)):
+        rec = Recorder(args.cost_ms / 1000)
+        fn(heavy, fast, args.workers, rec, rounds, period)
+        report(label, rec)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# backend/bench/run.py
+"""
+Offline benchmark for the create/check hot path.
+
+    python -m backend.bench.run --monitors 200 --rounds 3 --workers 8 --llm-latency 40
+
+Everything external is replaced with a local stand-in: recorded product pages
+are served by FixtureServer, Gemini by FakeLLM, DynamoDB by InMemoryTable and
+SNS by FakeSNS. The real `check_price.lambda_handler` and `api_create_monitor`
+code runs unchanged on top of them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+# clients are built lazily and overridden below, but keep the config harmless
+os.environ.setdefault("GEMINI_API_KEY", "bench-offline")
+os.environ.setdefault("SNS_TOPIC_ARN", "arn:aws:sns:us-east-1:000000000000:bench")
+# a fresh breaker store and LLM ledger per run, so one bad run can't trip breakers in the next
+_state_dir = tempfile.mkdtemp(prefix="autoscout-bench-")
+os.environ.setdefault("BREAKER_DB", os.path.join(_state_dir, "breakers.sqlite3"))
+os.environ.setdefault("LLM_BUDGET_DB", os.path.join(_state_dir, "llm_budget.sqlite3"))
+# the fake model has no quota; usage is still recorded, but never throttles the run
+for _limit in ("LLM_GLOBAL_RPM", "LLM_GLOBAL_TPM", "LLM_DAILY_BUDGET_USD", "LLM_USER_DAILY_REQUESTS", "LLM_USER_DAILY_TOKENS"):
+    os.environ.setdefault(_limit, "0")
+
+from backend.bench.fakes import TITLE_RE, FakeLLM, FakeSNS, FixtureScreenshotter, InMemoryTable
+from backend.bench.fixture_server import FIXTURES_DIR, FixtureServer
+from backend.utils import metrics
+
+
+class StubRequest:
+    """Just enough of starlette's Request for the FastAPI handlers."""
+
+    def __init__(self, body):
+        self._body = body
+
+    async def json(self):
+        return self._body
+
+
+def load_manifest():
+    with open(os.path.join(FIXTURES_DIR, "manifest.json")) as f:
+        return json.load(f)
+
+
+def page_answers(server):
+    """Map each fixture's <title> to the value a vision model should read."""
+    answers = {}
+    for name, spec in load_manifest().items():
+        m = TITLE_RE.search(server.pages[name])
+        answers[m.group(1).decode("utf-8").strip()] = spec["expected"]
+    return answers
+
+
+def install(llm, table, sns, screenshotter):
+    """Point the shared client providers at the fakes. Returns the app module."""
+    from backend import app as app_module
+    from backend.scrapper import fetch_tiers
+    from backend.utils import clients
+
+    clients.override("genai", llm)
+    clients.override("dynamo_table", table)
+    clients.override("sns", sns)
+    # the plain-HTTP tier hits the fixture server for real; the two browser
+    # tiers are simulated by the same GET plus the configured render delay
+    fetch_tiers.fetch_screenshot_playwright = screenshotter
+    fetch_tiers.fetch_rendered_html = lambda url, timeout=30000, profile=None: screenshotter(url, timeout).decode("utf-8")
+    # the scheduler is never started here, so added jobs stay pending and
+    # never fire while we drive checks by hand
+    return app_module
+
+
+def teardown(app_module):
+    from backend.utils import clients, scheduler
+
+    scheduler.get_scheduler().remove_all_jobs()
+    scheduler.shutdown_scheduler()
+    clients.reset()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def summarize(name, latencies, wall):
+    return {
+        "phase": name,
+        "count": len(latencies),
+        "per_second": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "wall_s": wall,
+    }
+
+
+def bench_create(app_module, server, count, concurrency):
+    manifest = load_manifest()
+    names = sorted(manifest)
+    latencies = []
+    created = []
+
+    async def one(i):
+        name = names[i % len(names)]
+        spec = manifest[name]
+        url = server.url_for(name, i)
+        body = {"description": f"Track {spec['description']} on {url} every 1 hour and let me know when it is {spec['condition']}"}
+        start = time.perf_counter()
+        result = await app_module.api_create_monitor(StubRequest(body))
+        latencies.append(time.perf_counter() - start)
+        created.append({
+            "url": url,
+            "monitor_id": result["monitor_id"],
+            "description": result["parsed"].get("description", spec["description"]),
+            "condition": result["parsed"].get("condition", spec["condition"]),
+        })
+
+    async def run_all():
+        sem = asyncio.Semaphore(concurrency)
+
+        async def guarded(i):
+            async with sem:
+                await one(i)
+
+        await asyncio.gather(*(guarded(i) for i in range(count)))
+
+    start = time.perf_counter()
+    asyncio.run(run_all())
+    return created, summarize("create_monitor", latencies, time.perf_counter() - start)
+
+
+def bench_check(payloads, rounds, workers):
+    from backend.lambda_fns.check_price import lambda_handler
+
+    latencies = []
+    statuses = {}
+
+    def one(payload):
+        start = time.perf_counter()
+        result = lambda_handler(payload, None)
+        return time.perf_counter() - start, result.get("status")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(rounds):
+            for elapsed, status in pool.map(one, payloads):
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+    summary = summarize("check_price", latencies, time.perf_counter() - start)
+    summary["statuses"] = statuses
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--monitors", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3, help="check passes over every monitor")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent check threads")
+    parser.add_argument("--llm-latency", type=float, default=0, help="fake Gemini latency (ms)")
+    parser.add_argument("--llm-jitter", type=float, default=0, help="extra uniform fake Gemini latency (ms)")
+    parser.add_argument("--page-latency", type=float, default=0, help="fixture server latency (ms)")
+    parser.add_argument("--render-latency", type=float, default=0, help="simulated browser render time (ms)")
+    parser.add_argument("--db-latency", type=float, default=0, help="fake DynamoDB latency (ms)")
+    parser.add_argument("--trace-memory", action="store_true", help="track Python allocations (slower)")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    metrics.reset()
+
+    with FixtureServer(latency_ms=args.page_latency) as server:
+        llm = FakeLLM(answers=page_answers(server), latency_ms=args.llm_latency, jitter_ms=args.llm_jitter)
+        table = InMemoryTable(latency_ms=args.db_latency)
+        sns = FakeSNS()
+        app_module = install(llm, table, sns, FixtureScreenshotter(render_ms=args.render_latency))
+        try:
+            payloads, create_summary = bench_create(app_module, server, args.monitors, args.workers)
+            check_summary = bench_check(payloads, args.rounds, args.workers)
+        finally:
+            teardown(app_module)
+
+        report = {
+            "config": vars(args),
+            "results": [create_summary, check_summary],
+            "llm_calls": llm.calls,
+            "db_calls": table.calls,
+            "notifications": sns.count,
+            "page_fetches": server.hits,
+            # ru_maxrss is KiB on Linux, bytes on macOS
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+        }
+        stages = {}
+        for labels, (count, total) in sorted(metrics.histogram_totals("autoscout_check_stage_seconds").items()):
+            label = dict(labels)
+            key = label.get("stage", "") + ("" if label.get("status") == "ok" else f"[{label.get('status')}]")
+            stages[key] = (count, total / count * 1000 if count else 0.0)
+        report["stages"] = stages
+        if args.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            report["py_alloc_peak_mb"] = peak / (1024 * 1024)
+
+    for r in report["results"]:
+        print(
+            f"{r['phase']:<16} n={r['count']:<6} {r['per_second']:8.1f}/s  "
+            f"p50={r['p50_ms']:7.2f}ms  p99={r['p99_ms']:7.2f}ms  mean={r['mean_ms']:7.2f}ms"
+        )
+    print(
+        f"llm_calls={report['llm_calls']} db_calls={report['db_calls']} "
+        f"page_fetches={report['page_fetches']} notifications={report['notifications']} "
+        f"max_rss={report['max_rss_mb']:.1f}MB"
+        + (f" py_alloc_peak={report['py_alloc_peak_mb']:.1f}MB" if "py_alloc_peak_mb" in report else "")
+    )
+    print(f"check statuses: {check_summary['statuses']}")
+    for stage, (count, mean_ms) in report["stages"].items():
+        print(f"  stage {stage:<20} n={count:<6} mean={mean_ms:8.3f}ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
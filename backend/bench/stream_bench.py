@@ -0,0 +1,84 @@
+# backend/bench/stream_bench.py
+"""
+Fan-out cost of the check event hub behind /stream and /ws.
+
+    python -m backend.bench.stream_bench --clients 5000 --monitors 1000 --events 20000
+
+Opens --clients subscriptions on one event loop, each watching one random
+monitor (and every tenth one also watching its user), then publishes
+--events check events from a worker thread the way check workers do. Reports
+events and frames delivered per second and the loop time spent per event.
+Each client drains its queue, as a connected dashboard would.
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+
+from backend.utils import streams
+
+
+async def run(clients, monitors, events, users):
+    hub = streams.Hub(queue_size=1024, replay=1000).start()
+    rng = random.Random(0)
+    owner = {f"m{i}": f"u{i % users}" for i in range(monitors)}
+    subs = []
+    watchers = {}  # monitor_id or user_id -> client indexes, to know how many frames to expect
+    for i in range(clients):
+        monitor_id = f"m{rng.randrange(monitors)}"
+        user_ids = [owner[monitor_id]] if i % 10 == 0 else []
+        subs.append(hub.open([monitor_id], user_ids))
+        for key in [monitor_id] + user_ids:
+            watchers.setdefault(key, set()).add(i)
+    received = [0]
+
+    async def drain(sub):
+        while True:
+            await sub.queue.get()
+            received[0] += 1
+
+    drainers = [asyncio.create_task(drain(sub)) for sub in subs]
+    expected = 0
+    for i in range(events):
+        monitor_id = f"m{i % monitors}"
+        expected += len(watchers.get(monitor_id, set()) | watchers.get(owner[monitor_id], set()))
+    done = threading.Event()
+
+    def publish():
+        for i in range(events):
+            monitor_id = f"m{i % monitors}"
+            streams.emit(streams.EVENTS[i % len(streams.EVENTS)], monitor_id, owner[monitor_id], value=i)
+        done.set()
+
+    start = time.perf_counter()
+    loop_start = time.process_time()
+    threading.Thread(target=publish, daemon=True).start()
+    while received[0] < expected:
+        await asyncio.sleep(0.005)
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - loop_start
+    for task in drainers:
+        task.cancel()
+    for sub in subs:
+        hub.close(sub)
+    hub.stop()
+    return wall, cpu, expected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--monitors", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    wall, cpu, frames = asyncio.run(run(args.clients, args.monitors, args.events, args.users))
+    print(f"clients={args.clients} monitors={args.monitors} events={args.events} frames={frames}")
+    print(f"wall={wall:.2f}s  events/s={args.events / wall:,.0f}  frames/s={frames / wall:,.0f}  "
+          f"cpu per event={cpu / args.events * 1e6:.1f}us (publish + dispatch + drain)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# backend/bench/structured_data_bench.py
+"""
+Accuracy and speed of backend/scrapper/structured_data.py over a corpus.
+
+    python -m backend.bench.structured_data_bench --repeat 2000
+
+The corpus is fixtures/structured_corpus.json (small targeted cases) plus every
+recorded page in fixtures/manifest.json. Each case is parsed `--repeat` times;
+the report gives median/p99 microseconds per parse, and a padded ~500KB copy of
+a real page is included to show that cost does not grow with body size.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from lxml import html
+
+from backend.bench.fixture_server import FIXTURES_DIR, load_pages
+from backend.scrapper.structured_data import extract_structured
+
+
+def load_corpus():
+    with open(os.path.join(FIXTURES_DIR, "structured_corpus.json")) as f:
+        cases = json.load(f)
+    with open(os.path.join(FIXTURES_DIR, "manifest.json")) as f:
+        manifest = json.load(f)
+    pages = load_pages()
+    for name, spec in sorted(manifest.items()):
+        page = pages[name].decode("utf-8")
+        # pages whose description is not about an offer must yield nothing
+        expected = spec["expected"] if "price" in spec["description"] else None
+        cases.append({"name": name, "description": spec["description"], "expected": expected, "html": page})
+    sneaker = pages["sneaker_jsonld.html"].decode("utf-8")
+    filler = "<div class='card'><p>Recommended for you: another product at $19.99</p></div>\n" * 6000
+    cases.append({
+        "name": "sneaker_padded_500k",
+        "description": "price of the item",
+        "expected": 255.0,
+        "html": sneaker.replace("</main>", filler + "</main>"),
+    })
+    return cases
+
+
+def correct(result, expected):
+    if expected is None:
+        return result is None
+    if result is None:
+        return False
+    if isinstance(expected, str):
+        return result["value"] == expected
+    return result["normalized"] is not None and abs(result["normalized"] - expected) < 0.005
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return statistics.median(samples) / 1000, samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--baseline", action="store_true", help="also time a full lxml DOM build per page")
+    args = parser.parse_args(argv)
+
+    cases = load_corpus()
+    ok = 0
+    print(f"{'case':<36} {'size':>8} {'p50 us':>9} {'p99 us':>9}  result")
+    for case in cases:
+        text, description = case["html"], case["description"]
+        result = extract_structured(text, description)
+        good = correct(result, case["expected"])
+        ok += good
+        p50, p99 = timed(lambda: extract_structured(text, description), args.repeat)
+        shown = "none" if result is None else f"{result['value']} ({result['source']})"
+        line = f"{case['name']:<36} {len(text):>8} {p50:>9.1f} {p99:>9.1f}  {'ok ' if good else 'BAD'} {shown}"
+        if args.baseline:
+            dom_p50, _ = timed(lambda: html.fromstring(text), max(1, args.repeat // 10))
+            line += f"  [lxml DOM build {dom_p50:.1f}us]"
+        print(line)
+    print(f"accuracy: {ok}/{len(cases)}")
+    return ok == len(cases)
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
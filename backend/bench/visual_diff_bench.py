@@ -0,0 +1,103 @@
+# backend/bench/visual_diff_bench.py
+"""
+Cost and decisions of the screenshot visual diff gate.
+
+    python -m backend.bench.visual_diff_bench --repeat 50
+
+Renders synthetic captures with Pillow (an element-sized price crop and a
+full viewport), encodes them as PNG the way Chrome returns them, and runs
+visual_diff.lookup() against a stored baseline. Each case reports whether the
+gate would reuse the previous answer and how many milliseconds the decode,
+hash and pixel diff took.
+"""
+import argparse
+import io
+import statistics
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from backend.scrapper import visual_diff
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has a single bitmap font
+        return ImageFont.load_default()
+
+
+def _png(img):
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def element(price, noise=0, seed=0):
+    img = Image.new("RGB", (320, 64), "white")
+    ImageDraw.Draw(img).text((12, 12), price, fill=(17, 17, 17), font=_font(32))
+    if noise:
+        arr = np.asarray(img).astype(np.int16)
+        arr += np.random.default_rng(seed).integers(-noise, noise + 1, arr.shape, dtype=np.int16)
+        img = Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8))
+    return _png(img)
+
+
+def viewport(price, banner=0):
+    img = Image.new("RGB", (1366, 1024), (245, 245, 245))
+    draw = ImageDraw.Draw(img)
+    small = _font(16)
+    for row in range(40):
+        draw.text((40, 200 + row * 20), f"Product detail line {row} - material, fit and care", fill=(60, 60, 60), font=small)
+    draw.text((900, 220), price, fill=(17, 17, 17), font=_font(36))
+    # rotating ad slot
+    draw.rectangle((40, 40, 1326, 160), fill=(30 + banner * 40, 90, 160))
+    draw.text((60, 80), f"Sponsored offer #{banner}", fill="white", font=_font(28))
+    return _png(img)
+
+
+CASES = (
+    # name, baseline capture, new capture, expected reuse
+    ("element unchanged", lambda: element("$255.00"), lambda: element("$255.00"), True),
+    ("element render noise", lambda: element("$255.00"), lambda: element("$255.00", noise=6, seed=1), True),
+    ("element price change", lambda: element("$255.00"), lambda: element("$256.00"), False),
+    ("viewport unchanged", lambda: viewport("$255.00"), lambda: viewport("$255.00"), True),
+    ("viewport price change", lambda: viewport("$255.00"), lambda: viewport("$256.00"), False),
+    ("viewport ad rotated", lambda: viewport("$255.00"), lambda: viewport("$255.00", banner=2), False),
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    ok = 0
+    answer = {"value": "$255.00", "normalized": 255.0}
+    print(f"{'case':<24} {'size':>10} {'png KB':>7} {'p50 ms':>7} {'max ms':>7}  decision")
+    for name, make_base, make_new, expect_reuse in CASES:
+        base, new = make_base(), make_new()
+        visual_diff.forget()
+        _, fp = visual_diff.lookup("bench", "price", base)
+        visual_diff.remember("bench", "price", fp, answer)
+        samples = []
+        for _ in range(args.repeat):
+            visual_diff.forget("bench")
+            visual_diff.remember("bench", "price", fp, answer)
+            start = time.perf_counter()
+            reused, _ = visual_diff.lookup("bench", "price", new)
+            samples.append((time.perf_counter() - start) * 1000)
+        good = (reused is not None) == expect_reuse
+        ok += good
+        shape = "x".join(str(d) for d in fp[0].shape[::-1])
+        decision = "reuse" if reused is not None else "call Gemini"
+        print(f"{name:<24} {shape:>10} {len(new) / 1024:>7.1f} {statistics.median(samples):>7.2f} "
+              f"{max(samples):>7.2f}  {'ok ' if good else 'BAD'} {decision}")
+    visual_diff.forget()
+    print(f"decisions: {ok}/{len(CASES)} as expected")
+    return ok == len(CASES)
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,27 @@
+# backend/db/backfill.py
+"""
+Bring monitors written before the list indexes existed into them.
+
+    python -m backend.db.backfill [--dry-run]
+
+Safe to run more than once and while the API is serving: only items missing
+a key (or whose status shard changed with MONITOR_STATUS_SHARDS) are updated,
+and a monitor deleted meanwhile is skipped rather than recreated.
+"""
+import argparse
+import logging
+
+from backend.db.dynamo_client import backfill_index_keys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count the items without updating them")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    count = backfill_index_keys(dry_run=args.dry_run)
+    print(f"{'would update' if args.dry_run else 'updated'} {count} monitors")
+
+
+if __name__ == "__main__":
+    main()
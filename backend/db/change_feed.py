@@ -0,0 +1,115 @@
+# backend/db/change_feed.py
+import logging
+import threading
+import time
+
+try:
+    from backend.utils import metrics, pubsub
+    from backend.utils.env import AWS_REGION, MONITOR_STREAM_ARN, MONITOR_STREAM_POLL_SECONDS
+except ImportError:
+    from utils import metrics, pubsub
+    from utils.env import AWS_REGION, MONITOR_STREAM_ARN, MONITOR_STREAM_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Replays writes to the monitors table, made by any process, onto the local
+# pubsub.MONITORS topic by polling its DynamoDB Stream. With NEW_IMAGE (or
+# NEW_AND_OLD_IMAGES) streams the cache gets the new item directly; with
+# KEYS_ONLY it just drops the entry and reloads on next use.
+#
+# Only changes from "now" on are read: a fresh process starts with an empty
+# cache, so older history has nothing to invalidate.
+
+DESCRIBE_EVERY = 60  # seconds between shard list refreshes
+
+_lock = threading.Lock()
+_thread = None
+_stop = threading.Event()
+
+
+def _to_event(record, deserializer):
+    change = record.get("dynamodb", {})
+    keys = change.get("Keys", {})
+    monitor_id = deserializer.deserialize(keys["monitor_id"]) if "monitor_id" in keys else None
+    if monitor_id is None:
+        return None
+    if record.get("eventName") == "REMOVE":
+        return {"type": "delete", "monitor_id": monitor_id, "source": "stream"}
+    image = change.get("NewImage")
+    if image:
+        item = {k: deserializer.deserialize(v) for k, v in image.items()}
+        return {"type": "put", "monitor_id": monitor_id, "item": item, "source": "stream"}
+    return {"type": "invalidate", "monitor_id": monitor_id, "source": "stream"}
+
+
+def _poll(stream_arn):
+    import boto3
+    from boto3.dynamodb.types import TypeDeserializer
+
+    client = boto3.client("dynamodbstreams", region_name=AWS_REGION)
+    deserializer = TypeDeserializer()
+    iterators = {}  # shard id -> iterator, None once the shard is exhausted
+    described = 0.0
+    while not _stop.is_set():
+        try:
+            if time.monotonic() - described > DESCRIBE_EVERY:
+                described = time.monotonic()
+                shards = client.describe_stream(StreamArn=stream_arn)["StreamDescription"]["Shards"]
+                initial = not iterators
+                for shard in shards:
+                    shard_id = shard["ShardId"]
+                    if shard_id in iterators:
+                        continue
+                    if not initial or "EndingSequenceNumber" not in shard.get("SequenceNumberRange", {}):
+                        # shards that appear after start are read from their beginning
+                        kind = "LATEST" if initial else "TRIM_HORIZON"
+                        iterators[shard_id] = client.get_shard_iterator(
+                            StreamArn=stream_arn, ShardId=shard_id, ShardIteratorType=kind
+                        )["ShardIterator"]
+                    else:
+                        iterators[shard_id] = None
+            for shard_id, iterator in list(iterators.items()):
+                if iterator is None:
+                    continue
+                resp = client.get_records(ShardIterator=iterator, Limit=1000)
+                for record in resp.get("Records", []):
+                    event = _to_event(record, deserializer)
+                    if event:
+                        pubsub.publish(pubsub.MONITORS, event)
+                        metrics.inc("autoscout_change_feed_records_total", event=event["type"])
+                iterators[shard_id] = resp.get("NextShardIterator")
+        except Exception:
+            logger.exception("change feed poll failed; retrying")
+            # iterators may have expired; start over from the current position
+            # and drop everything cached, since changes in the gap are lost
+            iterators.clear()
+            described = 0.0
+            pubsub.publish(pubsub.MONITORS, {"type": "invalidate", "monitor_id": None, "source": "stream"})
+        _stop.wait(MONITOR_STREAM_POLL_SECONDS)
+
+
+def start_change_feed(stream_arn=None):
+    """Start the stream poller thread if a stream is configured. Idempotent."""
+    global _thread
+    stream_arn = stream_arn or MONITOR_STREAM_ARN
+    if not stream_arn:
+        return None
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _stop.clear()
+            _thread = threading.Thread(target=_poll, args=(stream_arn,), name="monitor-change-feed", daemon=True)
+            _thread.start()
+            logger.info("monitor change feed started on %s", stream_arn)
+    return _thread
+
+
+def stop_change_feed(timeout=5):
+    global _thread
+    with _lock:
+        thread, _thread = _thread, None
+    _stop.set()
+    if thread is not None:
+        thread.join(timeout)
+
+
+metrics.describe("autoscout_change_feed_records_total", "counter", "Monitor table stream records replayed onto the bus.")
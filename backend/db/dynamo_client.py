@@ -52,20 +52,80 @@
 #         ExpressionAttributeValues=values,
 #     )
 # backend/db/dynamo_client.py
-import boto3
+import base64
+import heapq
+import itertools
+import json
+import logging
 import time
 import uuid
+import zlib
+from decimal import Decimal
 
-from boto3.dynamodb.conditions import Key
 try:
-    from backend.utils.env import DYNAMO_TABLE, AWS_REGION
+    from backend.utils.clients import get_dynamo_table
+    from backend.utils import pubsub
+    from backend.utils.env import MONITOR_STATUS_SHARDS
+    from backend.db import monitor_cache
 except ImportError:
-    from utils.env import DYNAMO_TABLE, AWS_REGION
+    from utils.clients import get_dynamo_table
+    from utils import pubsub
+    from utils.env import MONITOR_STATUS_SHARDS
+    from db import monitor_cache
 
-dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
-table = dynamodb.Table(DYNAMO_TABLE)
+logger = logging.getLogger(__name__)
 
-def create_monitor_item(url, description, interval_seconds, condition, monitor_id=None):
+# GSIs behind the monitor management API; every list is a Query, never a Scan:
+#   user-index         user_id / created_at    a user's monitors, newest first
+#   user-status-index  user_id / status_key    a user's monitors in one status ("active#<created_at>")
+#   status-index       status_shard / next_run_at   all monitors in a status, soonest due first
+#
+# Nearly every monitor is "active", so status-index is keyed on a shard of the
+# status ("active#<n>", n from a hash of the monitor id, MONITOR_STATUS_SHARDS
+# of them) rather than on the status itself, and a status listing queries
+# every shard and merges them. Monitors without an owner are left out of the
+# user indexes instead of sharing one "anonymous" partition. Items written
+# before these keys existed are brought into the indexes by
+# backfill_index_keys() (python -m backend.db.backfill).
+USER_INDEX = "user-index"
+USER_STATUS_INDEX = "user-status-index"
+STATUS_INDEX = "status-index"
+
+# what list/get responses carry, and what the indexes need to project
+LIST_FIELDS = ("monitor_id", "url", "description", "condition", "status", "interval_seconds",
+               "last_price", "last_checked", "next_run_at", "created_at")
+# index name -> (partition key, sort key); a cursor is a start key on one of these
+INDEX_KEYS = {
+    USER_INDEX: ("user_id", "created_at"),
+    USER_STATUS_INDEX: ("user_id", "status_key"),
+    STATUS_INDEX: ("status_shard", "next_run_at"),
+}
+# user_tier is the owner's account tier (fair-share weight in the check queue), set at creation, not a monitor setting
+EDITABLE_FIELDS = ("description", "condition", "interval_seconds", "render_profile", "target_selector")
+MAX_PAGE_SIZE = 200
+
+def _status_key(status, created_at):
+    return f"{status}#{int(created_at or 0):012d}"
+
+def _status_shard(status, monitor_id, shard=None):
+    # crc32, not hash(): every process must put a monitor in the same shard
+    if shard is None:
+        shard = zlib.crc32(monitor_id.encode("utf-8")) % MONITOR_STATUS_SHARDS
+    return f"{status}#{shard}"
+
+def _status_fields(status, item, now=None):
+    """The index keys that go with `status`; resuming also restarts next_run_at."""
+    fields = {
+        "status": status,
+        "status_key": _status_key(status, item.get("created_at")),
+        "status_shard": _status_shard(status, item["monitor_id"]),
+    }
+    if now is not None:
+        fields["next_run_at"] = now + int(item.get("interval_seconds") or 0)
+    return fields
+
+def create_monitor_item(url, description, interval_seconds, condition, monitor_id=None,
+                        render_profile=None, target_selector=None, user_id=None, user_tier=None):
     item_id = monitor_id or str(uuid.uuid4())
     now = int(time.time())
     item = {
@@ -78,24 +138,252 @@ def create_monitor_item(url, description, interval_seconds, condition, monitor_i
         "created_at": now,
         "condition": condition,
     }
-    table.put_item(Item=item)
+    item.update(_status_fields("active", item, now))
+    if user_id:
+        # owner: the user-index partition, and fair sharing in the check queue
+        item["user_id"] = user_id
+    # optional headless render settings (see scrapper/render_profiles.py)
+    if render_profile:
+        item["render_profile"] = render_profile
+    if target_selector:
+        item["target_selector"] = target_selector
+    if user_tier:
+        item["user_tier"] = user_tier
+    get_dynamo_table().put_item(Item=item)
+    pubsub.publish(pubsub.MONITORS, {"type": "put", "monitor_id": item_id, "item": item})
     return item
 
 def get_monitor_by_url(url):
-    resp = table.scan(FilterExpression=Key('url').eq(url))
+    from boto3.dynamodb.conditions import Key
+    resp = get_dynamo_table().scan(FilterExpression=Key('url').eq(url))
     items = resp.get("Items", [])
     return items[0] if items else None
 
-def get_monitor_by_id(monitor_id):
-    resp = table.get_item(Key={"monitor_id": monitor_id})
+def _load_monitor(monitor_id):
+    resp = get_dynamo_table().get_item(Key={"monitor_id": monitor_id})
     return resp.get("Item")
 
-def update_monitor_price(monitor_id, price, confidence=None):
+def get_monitor_by_id(monitor_id):
+    # read-through; kept fresh by pubsub.MONITORS events (see db/monitor_cache.py)
+    return monitor_cache.get(monitor_id, _load_monitor)
+
+def get_dom_fingerprint(monitor_id):
+    """Stored block hashes of an "any change" monitor's page, or None. Not kept in the monitor cache."""
+    resp = get_dynamo_table().get_item(
+        Key={"monitor_id": monitor_id},
+        ProjectionExpression="dom_fingerprint",
+    )
+    return resp.get("Item", {}).get("dom_fingerprint")
+
+def update_monitor_price(monitor_id, price, confidence=None, fetch_tier=None, interval_seconds=None, dom_fingerprint=None):
+    """Record a check's result. False when the monitor was deleted meanwhile (nothing is written)."""
+    from botocore.exceptions import ClientError
     now = int(time.time())
     expr = "SET last_price = :p, last_checked = :t"
     values = {":p": price, ":t": now}
-    table.update_item(
-        Key={"monitor_id": monitor_id},
-        UpdateExpression=expr,
-        ExpressionAttributeValues=values
-    )
\ No newline at end of file
+    fields = {"last_price": price, "last_checked": now}
+    if fetch_tier:
+        # cheapest fetch tier that worked, so a cold worker starts there
+        expr += ", fetch_tier = :f"
+        values[":f"] = fetch_tier
+        fields["fetch_tier"] = fetch_tier
+    if interval_seconds:
+        # sort key of status-index
+        expr += ", next_run_at = :n"
+        values[":n"] = fields["next_run_at"] = now + int(interval_seconds)
+    if dom_fingerprint is not None:
+        # block hashes of the page, for "any change" monitors; up to ~50KB, so
+        # left out of the update event (the monitor cache doesn't hold it)
+        expr += ", dom_fingerprint = :d"
+        values[":d"] = dom_fingerprint
+    try:
+        get_dynamo_table().update_item(
+            Key={"monitor_id": monitor_id},
+            UpdateExpression=expr,
+            # an update on a missing key would create a ghost item with only these attributes
+            ConditionExpression="attribute_exists(monitor_id)",
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            logger.info("monitor %s was deleted during its check; result dropped", monitor_id)
+            pubsub.publish(pubsub.MONITORS, {"type": "delete", "monitor_id": monitor_id})
+            return False
+        raise
+    pubsub.publish(pubsub.MONITORS, {"type": "update", "monitor_id": monitor_id, "fields": fields})
+    return True
+
+def _json_number(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"not JSON serializable: {type(value).__name__}")
+
+def encode_cursor(last_key):
+    """Opaque page cursor for a LastEvaluatedKey (None when there is no next page)."""
+    if not last_key:
+        return None
+    raw = json.dumps(last_key, default=_json_number, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """The value encode_cursor was given. Raises ValueError when malformed."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(key, dict):
+        raise ValueError("invalid cursor")
+    return key
+
+def _start_key(key, index, partition):
+    """`key` as an ExclusiveStartKey for `index`, provided it is one for this partition."""
+    pk, sk = INDEX_KEYS[index]
+    if (not isinstance(key, dict) or set(key) != {"monitor_id", pk, sk} or key[pk] != partition
+            or not isinstance(key["monitor_id"], str)):
+        # not from this listing: another user's, another status's, or edited
+        raise ValueError("invalid cursor")
+    return key
+
+def project(item):
+    """The LIST_FIELDS of an item; monitors created before statuses existed are active."""
+    out = {f: item[f] for f in LIST_FIELDS if f in item}
+    if out.get("status") is None:
+        out["status"] = "active"
+    return out
+
+def _query(index, condition, forward, limit, start_key=None, extra_fields=()):
+    names = {f"#p{i}": name for i, name in enumerate(LIST_FIELDS + tuple(extra_fields))}
+    kwargs = {
+        "IndexName": index,
+        "KeyConditionExpression": condition,
+        "ScanIndexForward": forward,
+        "Limit": limit,
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+    return get_dynamo_table().query(**kwargs)
+
+def list_monitors(user_id=None, status=None, limit=50, cursor=None):
+    """
+    One page of monitors as (items, next_cursor). By user (newest first,
+    optionally one status), or without a user by status (soonest due first).
+    Items are projected to LIST_FIELDS. Raises ValueError for a cursor that
+    did not come from the same listing.
+    """
+    from boto3.dynamodb.conditions import Key
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    if not user_id:
+        return _list_by_status(status or "active", limit, cursor)
+    if status:
+        index = USER_STATUS_INDEX
+        condition = Key("user_id").eq(user_id) & Key("status_key").begins_with(f"{status}#")
+    else:
+        index = USER_INDEX
+        condition = Key("user_id").eq(user_id)
+    start_key = _start_key(decode_cursor(cursor), index, user_id) if cursor else None
+    if start_key and status and not start_key["status_key"].startswith(f"{status}#"):
+        raise ValueError("invalid cursor")
+    resp = _query(index, condition, False, limit, start_key)
+    return [project(i) for i in resp.get("Items", [])], encode_cursor(resp.get("LastEvaluatedKey"))
+
+def _list_by_status(status, limit, cursor):
+    # one Query per shard, merged on next_run_at. The cursor holds each
+    # shard's position (the index key of the last item taken from it, null
+    # before its first page); shards with nothing left are dropped from it.
+    from boto3.dynamodb.conditions import Key
+    positions = {str(n): None for n in range(MONITOR_STATUS_SHARDS)}
+    if cursor:
+        positions = decode_cursor(cursor).get("shards")
+        if not isinstance(positions, dict) or not set(positions) <= {str(n) for n in range(MONITOR_STATUS_SHARDS)}:
+            raise ValueError("invalid cursor")
+        positions = {n: key and _start_key(key, STATUS_INDEX, _status_shard(status, None, n))
+                     for n, key in positions.items()}
+    results = {}
+    for n, start_key in positions.items():
+        condition = Key("status_shard").eq(_status_shard(status, None, n))
+        resp = _query(STATUS_INDEX, condition, True, limit, start_key, extra_fields=("status_shard",))
+        results[n] = (resp.get("Items", []), bool(resp.get("LastEvaluatedKey")))
+    # heapq.merge keeps each shard's own order, so what a page takes from a
+    # shard is always a prefix of what that shard returned
+    merged = heapq.merge(*([(item.get("next_run_at", 0), n, item) for item in items]
+                           for n, (items, _) in results.items()), key=lambda row: row[0])
+    page = list(itertools.islice(merged, limit))
+    taken = {}
+    for _, n, item in page:
+        taken[n] = taken.get(n, 0) + 1
+    left = {}
+    for n, (items, more) in results.items():
+        used = taken.get(n, 0)
+        if used < len(items) or more:
+            last = items[used - 1] if used else None
+            left[n] = positions[n] if last is None else {key: last[key] for key in ("monitor_id", *INDEX_KEYS[STATUS_INDEX])}
+    return [project(item) for *_, item in page], encode_cursor({"shards": left}) if left else None
+
+def update_monitor(monitor_id, fields):
+    """Set `fields` on an existing monitor. Returns the new item, or None if there is no such monitor."""
+    from botocore.exceptions import ClientError
+    if "interval_seconds" in fields and "next_run_at" not in fields:
+        # status-index sorts on it; the old value belongs to the old interval
+        fields = dict(fields, next_run_at=int(time.time()) + int(fields["interval_seconds"]))
+    names, values, sets = {}, {}, []
+    for i, (name, value) in enumerate(fields.items()):
+        names[f"#f{i}"] = name
+        values[f":v{i}"] = value
+        sets.append(f"#f{i} = :v{i}")
+    try:
+        resp = get_dynamo_table().update_item(
+            Key={"monitor_id": monitor_id},
+            UpdateExpression="SET " + ", ".join(sets),
+            ConditionExpression="attribute_exists(monitor_id)",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues="ALL_NEW",
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return None
+        raise
+    item = resp.get("Attributes")
+    pubsub.publish(pubsub.MONITORS, {"type": "put", "monitor_id": monitor_id, "item": item})
+    return item
+
+def set_monitor_status(monitor_id, status):
+    """Pause ("paused") or resume ("active") a monitor, keeping the index keys in step."""
+    item = get_monitor_by_id(monitor_id)
+    if not item:
+        return None
+    return update_monitor(monitor_id, _status_fields(status, item, int(time.time()) if status == "active" else None))
+
+def delete_monitor(monitor_id):
+    resp = get_dynamo_table().delete_item(Key={"monitor_id": monitor_id}, ReturnValues="ALL_OLD")
+    pubsub.publish(pubsub.MONITORS, {"type": "delete", "monitor_id": monitor_id})
+    return bool(resp.get("Attributes"))
+
+def backfill_index_keys(dry_run=False):
+    """
+    Give items written before the list indexes existed (or before status-index
+    was sharded) the keys those indexes need, so listings see them. Returns
+    the number of items updated (or that would be, with dry_run).
+    """
+    table = get_dynamo_table()
+    now = int(time.time())
+    updated = 0
+    kwargs = {}
+    while True:
+        resp = table.scan(**kwargs)
+        for item in resp.get("Items", []):
+            status = item.get("status") or "active"
+            fields = {k: v for k, v in _status_fields(status, item).items() if item.get(k) != v}
+            if item.get("next_run_at") is None:
+                last = int(item.get("last_checked") or now)
+                fields["next_run_at"] = max(now, last + int(item.get("interval_seconds") or 0))
+            if not fields:
+                continue
+            updated += 1
+            if not dry_run and update_monitor(item["monitor_id"], fields) is None:
+                updated -= 1  # deleted since the scan
+        if not resp.get("LastEvaluatedKey"):
+            return updated
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
@@ -0,0 +1,136 @@
+# backend/db/monitor_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from backend.utils import metrics, pubsub
+    from backend.utils.env import MONITOR_CACHE_SIZE, MONITOR_CACHE_TTL
+except ImportError:
+    from utils import metrics, pubsub
+    from utils.env import MONITOR_CACHE_SIZE, MONITOR_CACHE_TTL
+
+# Read-through cache of monitor items, so a check on a hot monitor doesn't
+# round-trip to DynamoDB for its own configuration.
+#
+# Records are tuples over FIELDS (plus a dict for any attribute not listed),
+# which keeps 10k cached monitors to a few MB. UNCACHED attributes are large
+# and read only by the check that needs them (dom_fingerprint runs to ~50KB
+# on a long page), so they are left out and loaded on their own.
+#
+# Entries are dropped LRU past MONITOR_CACHE_SIZE and expire after
+# MONITOR_CACHE_TTL as a backstop; the real invalidation comes from
+# pubsub.MONITORS events, published by dynamo_client on every write in this
+# process and by the DynamoDB Streams poller (db/change_feed.py) for writes
+# made anywhere else.
+
+FIELDS = (
+    "url", "description", "condition", "interval_seconds", "last_price", "last_checked", "created_at",
+    "fetch_tier", "render_profile", "target_selector", "user_id", "user_tier", "status", "status_key",
+    "status_shard", "next_run_at",
+)
+_INDEX = {name: i for i, name in enumerate(FIELDS)}
+UNCACHED = frozenset(("dom_fingerprint",))
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # monitor_id -> (expires_at, fields tuple, extras dict or None)
+# bumped on every invalidation and patch; a load that raced with one is not cached
+_generation = 0
+
+
+def _pack(item):
+    extras = {k: v for k, v in item.items() if k not in _INDEX and k not in UNCACHED and k != "monitor_id"}
+    return tuple(item.get(name) for name in FIELDS), extras or None
+
+
+def _unpack(monitor_id, values, extras):
+    item = {"monitor_id": monitor_id}
+    # attributes the item doesn't have stay absent, as in a DynamoDB read
+    item.update((name, value) for name, value in zip(FIELDS, values) if value is not None)
+    if extras:
+        item.update(extras)
+    return item
+
+
+def _store(monitor_id, values, extras):
+    _entries[monitor_id] = (time.monotonic() + MONITOR_CACHE_TTL, values, extras)
+    _entries.move_to_end(monitor_id)
+    while len(_entries) > MONITOR_CACHE_SIZE:
+        _entries.popitem(last=False)
+
+
+def get(monitor_id, loader):
+    """Cached item for `monitor_id`, calling `loader(monitor_id)` on a miss. Returns a fresh dict."""
+    with _lock:
+        entry = _entries.get(monitor_id)
+        if entry is not None and entry[0] > time.monotonic():
+            _entries.move_to_end(monitor_id)
+            item = _unpack(monitor_id, entry[1], entry[2])
+        else:
+            item = None
+        generation = _generation
+    if item is not None:
+        metrics.inc("autoscout_cache_hits_total", cache="monitor")
+        return item
+    metrics.inc("autoscout_cache_misses_total", cache="monitor")
+    item = loader(monitor_id)
+    if item:
+        with _lock:
+            if generation == _generation:
+                _store(monitor_id, *_pack(item))
+    return item
+
+
+def put(item):
+    with _lock:
+        _store(item["monitor_id"], *_pack(item))
+
+
+def patch(monitor_id, fields):
+    """Apply an attribute update to a cached record. Not cached: only loads in flight are voided."""
+    global _generation
+    with _lock:
+        # a load that read the item before this update must not cache it,
+        # whether or not an entry exists yet
+        _generation += 1
+        entry = _entries.get(monitor_id)
+        if entry is None:
+            return
+        values, extras = list(entry[1]), dict(entry[2] or {})
+        for name, value in fields.items():
+            if name in _INDEX:
+                values[_INDEX[name]] = value
+            elif name not in UNCACHED:
+                extras[name] = value
+        _store(monitor_id, tuple(values), extras or None)
+
+
+def invalidate(monitor_id=None):
+    """Drop one monitor, or everything."""
+    global _generation
+    with _lock:
+        _generation += 1
+        if monitor_id is None:
+            _entries.clear()
+        else:
+            _entries.pop(monitor_id, None)
+
+
+def size():
+    return len(_entries)
+
+
+def _on_change(event):
+    kind = event.get("type")
+    monitor_id = event.get("monitor_id")
+    if kind == "put" and event.get("item"):
+        # a full new image; still bump the generation so in-flight loads don't overwrite it
+        invalidate(monitor_id)
+        put(event["item"])
+    elif kind == "update" and event.get("fields") is not None:
+        patch(monitor_id, event["fields"])
+    else:
+        invalidate(monitor_id)
+
+
+pubsub.subscribe(pubsub.MONITORS, _on_change)
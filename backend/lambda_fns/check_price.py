@@ -16,31 +16,57 @@
 # from google import genai
 # import logging
 import json
+import operator
+import re
 import traceback
-import boto3
-from backend.db.dynamo_client import get_monitor_by_id, update_monitor_price
+from backend.db.dynamo_client import get_dom_fingerprint, get_monitor_by_id, update_monitor_price
 from backend.scrapper.scraper import (
     fetch_page_html_requests,
     extract_with_xpath,
     fetch_page_html_with_browser,
     fetch_screenshot_playwright,
 )
+from backend.scrapper.fetch_tiers import fetch_and_extract, fetch_html
+from backend.scrapper import dom_diff
+from backend.scrapper.circuit_breaker import CircuitOpen, classify
+from backend.scrapper.render_profiles import resolve_profile
 from backend.agents.data_extractor import extract_from_text, extract_from_image, _resp_to_text
-from backend.utils.env import SNS_TOPIC_ARN, AWS_REGION, GEMINI_API_KEY
-from google import genai
+from backend.utils.env import SNS_TOPIC_ARN
+from backend.utils.clients import get_sns_client
+from backend.utils import cpu_pool, llm_budget, metrics, streams
 import logging
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
-sns = boto3.client("sns", region_name=AWS_REGION)
-genai_client = genai.Client(api_key=GEMINI_API_KEY)
+
+# plain numeric thresholds ("less than $300", "above 50") evaluated without
+# Gemini when the LLM budget is low; anything else still goes to the model
+CONDITION_OPS = (
+    (r"less than or equal to|at most|no more than|<=", operator.le),
+    (r"greater than or equal to|at least|no less than|>=", operator.ge),
+    (r"less than|lower than|below|under|drops? below|<", operator.lt),
+    (r"greater than|more than|higher than|above|over|exceeds?|>", operator.gt),
+    (r"equal to|equals|==|=", operator.eq),
+)
+LOCAL_CONDITION_RE = re.compile(
+    r"^\s*(?:(?:the\s+)?(?:price|value|it)\s+)?(?:is\s+|goes\s+|falls\s+)?(?P<op>"
+    + "|".join(pattern for pattern, _ in CONDITION_OPS)
+    + r")\s*(?:to\s+)?[$€£]?\s*(?P<num>\d[\d,]*(?:\.\d+)?)\s*$",
+    re.I,
+)
+NUMERIC_VALUE_RE = re.compile(r"^\W{0,3}(-?\d[\d,]*(?:\.\d+)?)\s*[A-Za-z]{0,3}$")
 
 
 def safe_get_html(url):
     try:
         return fetch_page_html_requests(url)
     except Exception as e:
+        reason, _ = classify(e)
+        if reason not in (None, "blocked"):
+            # the site itself is failing; a browser would hit the same error
+            raise
         logger.warning("requests fetch failed: %s; browser fallback", e)
+        metrics.inc("autoscout_fallbacks_total", component="fetch", reason="browser")
         try:
             return fetch_page_html_with_browser(url)
         except Exception as e2:
@@ -68,7 +94,83 @@ def publish_notification(monitor, old_price, new_price, confidence):
     #     "new_price": new_price,
     #     "monitor_id": monitor["monitor_id"]
     # }
-    sns.publish(TopicArn=SNS_TOPIC_ARN, Message=OUT_MESSAGE, Subject="AutoScout Alert")
+    get_sns_client().publish(TopicArn=SNS_TOPIC_ARN, Message=OUT_MESSAGE, Subject="AutoScout Alert")
+
+
+def summarize_change(monitor, result):
+    """One or two sentences on what changed, from Gemini; the raw block diff if that fails."""
+    added = "\n".join(f"+ {t[:300]}" for t in result["added"][:20])
+    removed = "\n".join(f"- {t[:300]}" for t in result["removed"][:20] if t)
+    prompt = f"""A monitored web page changed. In one or two sentences, summarize the change for someone tracking: {monitor['description']}. Return ONLY the summary.
+    Added blocks:
+    {added or '(none)'}
+    Removed blocks:
+    {removed or '(none)'}
+    """
+    text = ""
+    try:
+        with metrics.span("summarize"):
+            text = _resp_to_text(llm_budget.generate("summarize", prompt, user_id=monitor.get("user_id"))).strip()
+    except Exception as e:
+        logger.warning("change summary failed: %s", e)
+    return text or dom_diff.describe(result)
+
+
+def evaluate_locally(value, normalized, condition):
+    """True/False for a plain numeric threshold condition, None when only a model could tell."""
+    m = LOCAL_CONDITION_RE.match(condition or "")
+    if not m:
+        return None
+    if normalized is None:
+        v = NUMERIC_VALUE_RE.match(str(value or "").strip())
+        if not v:
+            return None
+        normalized = v.group(1).replace(",", "")
+    try:
+        number = float(normalized)
+        threshold = float(m.group("num").replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+    op = m.group("op").lower()
+    for pattern, compare in CONDITION_OPS:
+        if re.fullmatch(pattern, op):
+            return compare(number, threshold)
+    return None
+
+
+def condition_met(monitor, value, normalized, condition):
+    """
+    Whether the new value satisfies the monitor's condition: Gemini decides,
+    unless the LLM budget is low and the condition is a plain threshold. With
+    no budget and no local answer the condition counts as not met.
+    """
+    user_id = monitor.get("user_id")
+    budget = llm_budget.mode(user_id)
+    if budget != llm_budget.NORMAL:
+        verdict = evaluate_locally(value, normalized, condition)
+        if verdict is not None:
+            llm_budget.degraded("local_condition", budget)
+            return verdict
+    prompt = f"""Evaluate the following statement and return ONLY 'true' or 'false': 
+        Does the numerical value **{value}** satisfy the condition **{condition}**?
+        """
+    try:
+        with metrics.span("evaluate_condition"):
+            return 'true' in _resp_to_text(llm_budget.generate("condition", prompt, user_id=user_id)).lower()
+    except Exception as e:
+        if not isinstance(e, llm_budget.BudgetExceeded) and not llm_budget.is_quota_error(e):
+            raise
+        verdict = evaluate_locally(value, normalized, condition)
+        llm_budget.degraded("local_condition" if verdict is not None else "condition_skipped", budget)
+        logger.warning("Condition for %s not sent to Gemini (%s); local answer: %s", monitor["monitor_id"], e, verdict)
+        return bool(verdict)
+
+
+def _tier_to_persist(monitor, fetch_tier):
+    # only write the learned tier back when it changed
+    if fetch_tier and fetch_tier != monitor.get("fetch_tier"):
+        return fetch_tier
+    return None
 
 
 def lambda_handler(event, context):
@@ -76,51 +178,51 @@ def lambda_handler(event, context):
     Input: {"url": "...", "monitor_id": "...", "description": "..."}
     Output: {"interval_seconds": n, "status": "..."}
     """
+    with metrics.trace("check_price", monitor_id=event.get("monitor_id")):
+        result = _check(event)
+    metrics.inc("autoscout_checks_total", status=result["status"])
+    streams.emit("checked", event.get("monitor_id"), event.get("user_id"),
+                 status=result["status"], value=result.get("value"))
+    return result
+
+
+def _check(event):
     try:
-        print("check_price started event=%s", json.dumps(event))
         logger.info("check_price started event=%s", json.dumps(event))
         url = event.get("url")
         monitor_id = event.get("monitor_id")
 
-        monitor = get_monitor_by_id(monitor_id)
+        with metrics.span("load_monitor"):
+            monitor = get_monitor_by_id(monitor_id)
         if not monitor:
             logger.error("monitor not found: %s", monitor_id)
             return {"interval_seconds": 7200, "status": "monitor_not_found"}
+        if monitor.get("status") == "paused":
+            return {"interval_seconds": monitor.get("interval_seconds", 7200), "status": "paused"}
+        if dom_diff.is_any_change(monitor.get('condition') or event.get('condition')):
+            return _check_page_change(monitor, url)
 
-        # html_text = None
-        # try:
-        #     html_text = safe_get_html(url)
-        #     print("Fetched HTML for %s", url)
-        # except Exception:
-        #     logger.exception("Failed to fetch HTML")
-        #     # still try screenshot fallback
-        #     html_text = None
-
-        # # 1) Primary attempt: ask Gemini to extract from HTML/text
-        # extracted = None
-        # if html_text:
-        #     extracted = extract_from_text(html_text, monitor["description"])
-
-        # 2) If low confidence or no value, try screenshot-based extraction (visual)
-        # if (not extracted) or (extracted.get("confidence", 0.0) < 0.45) or (not extracted.get("value")):
-        #     logger.info("Text extraction low-confidence; trying screenshot extraction")
-        extracted = None
-        try:
-            print("Fetching screenshot for %s", url)
-
-            image_bytes = fetch_screenshot_playwright(url)
-            #save screenshot
-            with open("screenshot.png", "wb") as f:
-                f.write(image_bytes)
-            #saving image
-            with open("image.png", "wb") as f:
-                f.write(image_bytes)
-            extracted_img = extract_from_image(image_bytes, monitor["description"])
-                # prefer image extraction if confidence higher
-            # if extracted_img and extracted_img.get("confidence", 0.0) > extracted.get("confidence", 0.0) if extracted else True:
-            extracted = extracted_img
-        except Exception as e:
-            logger.warning("Screenshot extraction failed: %s", e)
+        # cheapest tier first: plain HTTP + structured data, then a headless
+        # DOM render, and a screenshot for Gemini vision only when both fail
+        with metrics.span("fetch", url=url):
+            try:
+                extracted, fetch_tier = fetch_and_extract(
+                    url,
+                    monitor["description"],
+                    monitor_id=monitor_id,
+                    persisted_tier=monitor.get("fetch_tier"),
+                    render=resolve_profile(url, monitor),
+                    user_id=monitor.get("user_id"),
+                )
+            except CircuitOpen as e:
+                # target is backing off: no browser, no Gemini, keep the last value
+                logger.info("Skipping %s: %s", url, e)
+                return {"interval_seconds": monitor.get("interval_seconds", 7200), "status": "circuit_open"}
+        if not extracted:
+            # nothing to evaluate; asking Gemini about an empty value only costs a call
+            logger.warning("All fetch tiers failed for %s", url)
+            return {"interval_seconds": monitor.get("interval_seconds", 7200), "status": "fetch_failed"}
+        streams.emit("fetched", monitor_id, monitor.get("user_id"), tier=fetch_tier)
 
         # Final normalization/cleanup
         new_value = None
@@ -136,6 +238,9 @@ def lambda_handler(event, context):
             new_norm = None
             confidence = 0.0
 
+        streams.emit("extracted", monitor_id, monitor.get("user_id"), value=new_value, normalized=new_norm,
+                     confidence=confidence, previous=monitor.get("last_price"))
+
         old_price = monitor.get("last_price")
         # decide changed: compare normalized if available, else string compare
         changed = False
@@ -148,27 +253,81 @@ def lambda_handler(event, context):
         else:
             changed = (new_value and new_value != old_price)
 
-        prompt = f"""Evaluate the following statement and return ONLY 'true' or 'false': 
-        Does the numerical value **{new_value}** satisfy the condition **{event['condition']}**?
-        """
-        send_notification = genai_client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-        text = _resp_to_text(send_notification)
-
-        if 'true' in text.lower():
-            print("Change detected for %s: %s -> %s", url, old_price, new_value)
-            publish_notification(monitor, old_price, new_value, confidence)
-            update_monitor_price(monitor_id, new_value, confidence)
+        if condition_met(monitor, new_value, new_norm, monitor.get('condition') or event['condition']):
+            streams.emit("triggered", monitor_id, monitor.get("user_id"), value=new_value, previous=old_price)
+            with metrics.span("notify"):
+                publish_notification(monitor, old_price, new_value, confidence)
+            with metrics.span("persist"):
+                persisted = update_monitor_price(monitor_id, new_value, confidence,
+                                                 fetch_tier=_tier_to_persist(monitor, fetch_tier),
+                                                 interval_seconds=monitor.get("interval_seconds"))
             logger.info("Change detected for %s: %s -> %s", url, old_price, new_value)
         else:
             # update timestamp even if unchanged
-            print("No change for %s (last=%s), new=%s", url, old_price, new_value)
-            update_monitor_price(monitor_id, new_value, confidence)
-            logger.info("No change for %s (last=%s)", url, old_price)
+            with metrics.span("persist"):
+                persisted = update_monitor_price(monitor_id, new_value, confidence,
+                                                 fetch_tier=_tier_to_persist(monitor, fetch_tier),
+                                                 interval_seconds=monitor.get("interval_seconds"))
+            logger.info("No change for %s (last=%s), new=%s", url, old_price, new_value)
+        if not persisted:
+            return {"interval_seconds": monitor.get("interval_seconds", 7200), "status": "deleted"}
 
-        return {"interval_seconds": monitor.get("interval_seconds", 7200), "status": "checked"}
+        # "value" lets the check queue rank monitors sitting near their threshold
+        return {"interval_seconds": monitor.get("interval_seconds", 7200), "status": "checked", "value": new_norm}
     except Exception:
         logger.error("check_price exception: %s", traceback.format_exc())
         return {"interval_seconds": 7200, "status": "error"}
+
+
+def _check_page_change(monitor, url):
+    # "any change": diff the page's block fingerprint; Gemini only summarizes a real change
+    monitor_id = monitor["monitor_id"]
+    interval = monitor.get("interval_seconds", 7200)
+    page = {}
+
+    def usable(html_text):
+        page["fp"] = cpu_pool.run(dom_diff.fingerprint, html_text)
+        return dom_diff.readable(page["fp"])
+
+    with metrics.span("fetch", url=url):
+        try:
+            html_text, fetch_tier = fetch_html(
+                url,
+                monitor_id=monitor_id,
+                persisted_tier=monitor.get("fetch_tier"),
+                render=resolve_profile(url, monitor),
+                usable=usable,
+            )
+        except CircuitOpen as e:
+            logger.info("Skipping %s: %s", url, e)
+            return {"interval_seconds": interval, "status": "circuit_open"}
+    if not html_text:
+        logger.warning("No readable page for %s", url)
+        return {"interval_seconds": interval, "status": "fetch_failed"}
+    streams.emit("fetched", monitor_id, monitor.get("user_id"), tier=fetch_tier)
+
+    with metrics.span("dom_diff"):
+        # not in the monitor cache; an item read straight from the table has it already
+        stored = monitor["dom_fingerprint"] if "dom_fingerprint" in monitor else get_dom_fingerprint(monitor_id)
+        result = dom_diff.compare(monitor_id, stored, page["fp"])
+    streams.emit("extracted", monitor_id, monitor.get("user_id"), blocks=result["blocks"], changed=result["changed"],
+                 added=len(result["added"]), removed=len(result["removed"]))
+    summary = monitor.get("last_price")
+    if result["changed"]:
+        summary = summarize_change(monitor, result)
+        streams.emit("triggered", monitor_id, monitor.get("user_id"), value=summary)
+        with metrics.span("notify"):
+            publish_notification(monitor, None, summary, 1.0)
+        logger.info("Page change for %s: %s", url, summary)
+    elif not result["baseline"]:
+        metrics.inc("autoscout_llm_calls_avoided_total", component="dom_diff")
+        logger.info("No page change for %s", url)
+    fingerprint = result["fingerprint"]
+    with metrics.span("persist"):
+        persisted = update_monitor_price(monitor_id, summary, 1.0, fetch_tier=_tier_to_persist(monitor, fetch_tier),
+                                         interval_seconds=monitor.get("interval_seconds"),
+                                         dom_fingerprint=fingerprint if fingerprint != stored else None)
+    return {"interval_seconds": interval, "status": "checked" if persisted else "deleted"}
     
 if __name__ == "__main__":
     # for local testing
@@ -146,20 +146,12 @@ import re
 #     from db.dynamo_client import create_monitor_item, get_monitor_by_url
 #     from utils.env import DEFAULT_INTERVAL, GEMINI_API_KEY
 from backend.db.dynamo_client import create_monitor_item, get_monitor_by_url
-from backend.utils.env import STEP_FUNCTION_ARN, DEFAULT_INTERVAL, GEMINI_API_KEY
+from backend.utils.env import STEP_FUNCTION_ARN, DEFAULT_INTERVAL
+from backend.utils import llm_budget
+from backend.utils.scheduler import schedule_check, start_scheduler
 
-from google import genai
-from apscheduler.schedulers.background import BackgroundScheduler
-from backend.lambda_fns.check_price import lambda_handler as check_price
 
-# global scheduler instance
-scheduler = BackgroundScheduler()
-scheduler.start()
-
-genai_client = genai.Client(api_key=GEMINI_API_KEY)
-
-
-def parse_interval(description: str) -> int:
+def parse_interval(description: str, user_id=None) -> int:
     desc = description.lower()
     m = re.search(r"every\s+(\d+)\s*(minute|hour|second|day)s?", desc)
     if m:
@@ -181,7 +173,7 @@ def parse_interval(description: str) -> int:
         f"Description: \"{description}\"\n\nReturn only the number."
     )
     try:
-        resp = genai_client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
+        resp = llm_budget.generate("parse_interval", prompt, user_id=user_id)
         text = getattr(resp, "text", "").strip()
         num = int(re.sub(r"\D", "", text))
         return num if num > 0 else DEFAULT_INTERVAL
@@ -202,9 +194,7 @@ def lambda_handler(event, context):
             "You are a structured data extractor..."
             f"\n\nRequest: {original_description}"
         )
-        llm_response = genai_client.models.generate_content(
-            model="gemini-2.5-flash", contents=prompt
-        )
+        llm_response = llm_budget.generate("parse_request", prompt, user_id=body.get("user_id"))
 
         response_text = llm_response.text.strip()
         if response_text.startswith("```json"):
@@ -231,24 +221,22 @@ def lambda_handler(event, context):
     if existing:
         return {"statusCode": 200, "body": json.dumps({"message": "Monitor already exists", "item": existing})}
 
-    interval_seconds = parse_interval(extracted_interval or original_description)
-    item = create_monitor_item(url, extracted_description, interval_seconds, condition)
+    interval_seconds = parse_interval(extracted_interval or original_description, user_id=body.get("user_id"))
+    item = create_monitor_item(url, extracted_description, interval_seconds, condition,
+                               user_id=body.get("user_id"), user_tier=body.get("tier"))
 
     # schedule recurring job
     input_payload = {
         "url": url,
         "monitor_id": item["monitor_id"],
         "description": extracted_description,
-        "condition": condition
+        "condition": condition,
+        "user_id": body.get("user_id"),
+        "user_tier": body.get("tier"),
     }
 
-    scheduler.add_job(
-        check_price,
-        "interval",
-        seconds=interval_seconds,
-        args=[input_payload, None],
-        id=item["monitor_id"],
-        replace_existing=True
-    )
+    # outside the FastAPI app nothing else starts the shared scheduler
+    start_scheduler()
+    schedule_check(input_payload, interval_seconds)
 
     return {"statusCode": 200, "body": json.dumps({"message": "Monitor created", "monitor": item})}
\ No newline at end of file
@@ -20,14 +20,11 @@
 #     return {"status": "sent"}
 
 import json
-import boto3
 import os
-from backend.utils.env import AWS_REGION
-
-sns = boto3.client("sns", region_name=AWS_REGION)
+from backend.utils.clients import get_sns_client
 
 def lambda_handler(event, context):
     subject = event.get("subject", "AutoScout Notification")
     message = event.get("message") or json.dumps(event)
-    sns.publish(TopicArn=os.environ.get("SNS_TOPIC_ARN"), Message=message, Subject=subject)
+    get_sns_client().publish(TopicArn=os.environ.get("SNS_TOPIC_ARN"), Message=message, Subject=subject)
     return {"status": "sent"}
\ No newline at end of file
@@ -0,0 +1,76 @@
+# backend/scrapper/antibot.py
+import re
+
+# Challenge and block pages from the common bot-protection vendors. They come
+# back as 200s often enough that the status code alone can't be trusted, and
+# reading one with Gemini just burns a call on "Just a moment...".
+
+TITLE_RE = re.compile(r"<title[^>]*>\s*([^<]{0,200})", re.I)
+BLOCK_TITLES = (
+    ("just a moment", "cloudflare"),
+    ("attention required! | cloudflare", "cloudflare"),
+    ("access denied", "access_denied"),
+    ("pardon our interruption", "imperva"),
+    ("robot check", "amazon"),
+    ("are you a robot", "captcha"),
+    ("are you a human", "captcha"),
+    ("security check", "captcha"),
+    ("request rejected", "waf"),
+    ("403 forbidden", "access_denied"),
+    ("too many requests", "rate_limited"),
+)
+# only trusted on small pages: real product pages can mention captcha in a
+# newsletter form or load a challenge script defensively
+BLOCK_MARKERS = (
+    ("cf-chl-", "cloudflare"),
+    ("_cf_chl_opt", "cloudflare"),
+    ("px-captcha", "perimeterx"),
+    ("captcha-delivery.com", "datadome"),
+    ("incapsula incident id", "imperva"),
+    ("_incapsula_resource", "imperva"),
+    ("/distil_r_captcha", "distil"),
+    ("errors.edgesuite.net", "akamai"),
+    ("unusual traffic from your computer", "captcha"),
+)
+SMALL_PAGE = 150 * 1024
+BLOCK_STATUSES = {401: "unauthorized", 403: "forbidden", 429: "rate_limited"}
+
+
+class TargetBlocked(Exception):
+    """The site answered with a bot challenge or block page instead of content."""
+
+    def __init__(self, reason, status=None):
+        super().__init__(f"blocked by target ({reason})")
+        self.reason = reason
+        self.status = status
+
+
+def detect_block(html_text, status=None, headers=None):
+    """Name of the block/challenge that `html_text` is, or None for a real page."""
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    if headers.get("cf-mitigated") == "challenge":
+        return "cloudflare"
+    if status in BLOCK_STATUSES:
+        return BLOCK_STATUSES[status]
+    if not html_text:
+        return None
+    head = html_text[:4096]
+    m = TITLE_RE.search(head)
+    if m:
+        title = m.group(1).strip().lower()
+        for needle, reason in BLOCK_TITLES:
+            if title.startswith(needle):
+                return reason
+    if len(html_text) <= SMALL_PAGE:
+        lowered = html_text.lower()
+        for needle, reason in BLOCK_MARKERS:
+            if needle in lowered:
+                return reason
+    return None
+
+
+def raise_if_blocked(html_text, status=None, headers=None):
+    reason = detect_block(html_text, status, headers)
+    if reason:
+        raise TargetBlocked(reason, status)
+    return html_text
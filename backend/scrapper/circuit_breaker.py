@@ -0,0 +1,294 @@
+# backend/scrapper/circuit_breaker.py
+import logging
+import random
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from backend.scrapper.antibot import TargetBlocked
+from backend.utils import metrics
+from backend.utils.env import (
+    BREAKER_BASE_BACKOFF,
+    BREAKER_DB,
+    BREAKER_DOMAIN_FAILURES,
+    BREAKER_MAX_BACKOFF,
+    BREAKER_URL_FAILURES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-URL and per-domain circuit breakers plus a negative cache, so a target
+# that is down or blocking us costs one SQLite lookup per check instead of a
+# Chrome launch and a Gemini call.
+#
+#   closed     checks run; consecutive failures are counted
+#   open       checks are refused until open_until; each re-open doubles the
+#              backoff (BREAKER_BASE_BACKOFF .. BREAKER_MAX_BACKOFF, +-10% jitter)
+#   half-open  after open_until one check may probe; success closes, failure
+#              re-opens with the next backoff
+#
+# A definitive failure (404, 410, a body over the size limit) puts the URL in
+# the negative cache at once; other failures only once the URL's breaker
+# threshold is reached. The TTL depends on the failure (a 404 stays bad for
+# longer than a timeout).
+#
+# A check that passes check() on a half-open breaker holds its probe until it
+# reports: record_success closes the breaker, record_failure re-opens it, and
+# release() hands the probe back when the check ended without saying anything
+# about the target.
+#
+# State is a SQLite table (WAL mode) rather than a dict so every scheduler
+# thread and every uvicorn/Lambda worker process on the host sees the same
+# breakers. Breakers fail open: if the database is unusable, checks run.
+
+NEGATIVE_TTL = {
+    "not_found": 3600,
+    "gone": 86400,
+    "http_4xx": 900,
+    "too_large": 3600,
+    "blocked": 600,
+    "rate_limited": 300,
+    "http_5xx": 120,
+    "timeout": 120,
+    "network": 120,
+}
+# failures that won't go away by retrying soon
+DEFINITIVE_REASONS = {"not_found", "gone", "too_large"}
+# failures that say something about the whole site, not just one page
+DOMAIN_REASONS = {"blocked", "rate_limited", "http_5xx", "timeout", "network"}
+PROBE_SECONDS = 120  # how long one caller holds the half-open probe
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS breakers (
+    key            TEXT PRIMARY KEY,
+    scope          TEXT NOT NULL,
+    target         TEXT NOT NULL,
+    failures       INTEGER NOT NULL DEFAULT 0,
+    opens          INTEGER NOT NULL DEFAULT 0,
+    open_until     REAL NOT NULL DEFAULT 0,
+    probe_until    REAL NOT NULL DEFAULT 0,
+    negative_until REAL NOT NULL DEFAULT 0,
+    reason         TEXT,
+    status         INTEGER,
+    updated_at     REAL NOT NULL
+)
+"""
+
+
+class CircuitOpen(Exception):
+    """Raised by check() when a URL or its domain is not to be fetched right now."""
+
+    def __init__(self, key, reason, retry_at):
+        super().__init__(f"{key} unavailable ({reason}), retry after {time.strftime('%H:%M:%S', time.localtime(retry_at))}")
+        self.key = key
+        self.reason = reason
+        self.retry_at = retry_at
+
+
+_local = threading.local()
+
+
+def _db():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(BREAKER_DB, timeout=5, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _targets(url):
+    host = (urlparse(url).hostname or "").lower()
+    return [("url", f"url:{url}", url), ("domain", f"domain:{host}", host)]
+
+
+def _backoff(opens):
+    delay = min(BREAKER_MAX_BACKOFF, BREAKER_BASE_BACKOFF * 2 ** max(0, opens - 1))
+    return delay * random.uniform(0.9, 1.1)
+
+
+def classify(exc):
+    """
+    (reason, status) for an exception raised while fetching a target, or
+    (None, None) when it isn't the target's fault (our bug, missing browser).
+    """
+    if isinstance(exc, TargetBlocked):
+        return ("rate_limited" if exc.reason == "rate_limited" else "blocked"), exc.status
+    if type(exc).__name__ == "ResponseTooLarge":
+        return "too_large", None
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status:
+        if status == 404:
+            return "not_found", status
+        if status == 410:
+            return "gone", status
+        if status == 429:
+            return "rate_limited", status
+        if status in (401, 403):
+            return "blocked", status
+        if status >= 500:
+            return "http_5xx", status
+        if status >= 400:
+            return "http_4xx", status
+    name = type(exc).__name__.lower()
+    if "timeout" in name:
+        return "timeout", None
+    if isinstance(exc, OSError) or any(s in name for s in ("connect", "transport", "protocol", "network")):
+        return "network", None
+    return None, None
+
+
+def check(url):
+    """Raise CircuitOpen unless `url` may be fetched now. Claims the probe when half-open."""
+    now = time.time()
+    keys = [key for _, key, _ in _targets(url)]
+    try:
+        conn = _db()
+        rows = conn.execute(
+            "SELECT key, scope, open_until, probe_until, negative_until, reason FROM breakers WHERE key IN (?, ?)",
+            keys,
+        ).fetchall()
+        for row in rows:
+            if row["negative_until"] > now:
+                metrics.inc("autoscout_breaker_rejections_total", scope=row["scope"], reason="negative_cache")
+                raise CircuitOpen(row["key"], row["reason"], row["negative_until"])
+            if row["open_until"] > now:
+                metrics.inc("autoscout_breaker_rejections_total", scope=row["scope"], reason="open")
+                raise CircuitOpen(row["key"], row["reason"], row["open_until"])
+        claimed = []
+        for row in rows:
+            if row["open_until"] > 0:
+                # half-open: exactly one caller across all processes gets to probe
+                if not conn.execute(
+                    "UPDATE breakers SET probe_until = ? WHERE key = ? AND probe_until <= ?",
+                    (now + PROBE_SECONDS, row["key"], now),
+                ).rowcount:
+                    # the URL's probe may be ours already; it can't run without the domain's
+                    for key in claimed:
+                        conn.execute("UPDATE breakers SET probe_until = 0 WHERE key = ?", (key,))
+                    metrics.inc("autoscout_breaker_rejections_total", scope=row["scope"], reason="probing")
+                    raise CircuitOpen(row["key"], "probe in flight", row["probe_until"])
+                claimed.append(row["key"])
+                logger.info("probing %s after backoff", row["key"])
+    except sqlite3.Error as e:
+        logger.warning("breaker store unavailable, allowing %s: %s", url, e)
+
+
+def record_success(url):
+    keys = [key for _, key, _ in _targets(url)]
+    try:
+        conn = _db()
+        rows = conn.execute("SELECT key, scope, open_until FROM breakers WHERE key IN (?, ?)", keys).fetchall()
+        if not rows:
+            return
+        conn.execute("DELETE FROM breakers WHERE key IN (?, ?)", keys)
+        for row in rows:
+            if row["open_until"] > 0:
+                metrics.inc("autoscout_breaker_transitions_total", scope=row["scope"], state="closed")
+                logger.info("breaker %s closed", row["key"])
+    except sqlite3.Error as e:
+        logger.warning("breaker store unavailable: %s", e)
+
+
+def release(url):
+    """Hand back a half-open probe claimed by check() for a check that ended without a verdict."""
+    keys = [key for _, key, _ in _targets(url)]
+    try:
+        _db().execute(
+            "UPDATE breakers SET probe_until = 0 WHERE key IN (?, ?) AND open_until > 0 AND open_until <= ?",
+            keys + [time.time()],
+        )
+    except sqlite3.Error as e:
+        logger.warning("breaker store unavailable: %s", e)
+
+
+def record_failure(url, reason, status=None):
+    """Count a failure against the URL (and its domain for site-wide reasons)."""
+    now = time.time()
+    try:
+        conn = _db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for scope, key, target in _targets(url):
+                if scope == "domain" and reason not in DOMAIN_REASONS:
+                    # says nothing about the site; a domain probe we hold goes back
+                    conn.execute(
+                        "UPDATE breakers SET probe_until = 0 WHERE key = ? AND open_until > 0 AND open_until <= ?",
+                        (key, now),
+                    )
+                    continue
+                row = conn.execute("SELECT failures, opens, open_until FROM breakers WHERE key = ?", (key,)).fetchone()
+                failures = (row["failures"] if row else 0) + 1
+                opens = row["opens"] if row else 0
+                open_until = row["open_until"] if row else 0
+                threshold = BREAKER_URL_FAILURES if scope == "url" else BREAKER_DOMAIN_FAILURES
+                # a failed half-open probe re-opens straight away
+                if failures >= threshold or open_until > 0:
+                    opens += 1
+                    open_until = now + _backoff(opens)
+                    metrics.inc("autoscout_breaker_transitions_total", scope=scope, state="open")
+                    logger.warning("breaker %s open for %.0fs (%s)", key, open_until - now, reason)
+                negative_until = 0
+                if scope == "url" and (reason in DEFINITIVE_REASONS or failures >= threshold):
+                    negative_until = now + NEGATIVE_TTL.get(reason, 120)
+                conn.execute(
+                    "INSERT OR REPLACE INTO breakers (key, scope, target, failures, opens, open_until, probe_until,"
+                    " negative_until, reason, status, updated_at) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                    (key, scope, target, failures, opens, open_until, negative_until, reason, status, now),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    except sqlite3.Error as e:
+        logger.warning("breaker store unavailable: %s", e)
+    metrics.inc("autoscout_target_failures_total", reason=reason)
+
+
+def _state(row, now):
+    if row["open_until"] > now:
+        return "open"
+    if row["open_until"] > 0:
+        return "half_open"
+    return "closed"
+
+
+def snapshot(state=None):
+    """Breakers with recorded failures, newest first, for the API."""
+    now = time.time()
+    rows = _db().execute("SELECT * FROM breakers ORDER BY updated_at DESC").fetchall()
+    out = []
+    for row in rows:
+        item = dict(row)
+        item["state"] = _state(row, now)
+        item["negative_cached"] = row["negative_until"] > now
+        if state and item["state"] != state:
+            continue
+        out.append(item)
+    return out
+
+
+def reset(domain=None, url=None):
+    """Close breakers by hand. Without arguments every breaker is cleared."""
+    conn = _db()
+    if url:
+        return conn.execute("DELETE FROM breakers WHERE key = ?", (f"url:{url}",)).rowcount
+    if domain:
+        domain = domain.lower()
+        # the domain and every URL on it or its subdomains
+        keys = []
+        for row in conn.execute("SELECT key, scope, target FROM breakers").fetchall():
+            host = row["target"] if row["scope"] == "domain" else (urlparse(row["target"]).hostname or "").lower()
+            if host == domain or host.endswith("." + domain):
+                keys.append(row["key"])
+        return sum(conn.execute("DELETE FROM breakers WHERE key = ?", (key,)).rowcount for key in keys)
+    return conn.execute("DELETE FROM breakers").rowcount
+
+
+metrics.describe("autoscout_breaker_transitions_total", "counter", "Circuit breaker state changes.")
+metrics.describe("autoscout_breaker_rejections_total", "counter", "Checks refused by an open breaker or the negative cache.")
+metrics.describe("autoscout_target_failures_total", "counter", "Target fetch failures by reason.")
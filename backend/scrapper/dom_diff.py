@@ -0,0 +1,261 @@
+# backend/scrapper/dom_diff.py
+import base64
+import hashlib
+import logging
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from lxml import etree, html
+
+from backend.utils import metrics
+from backend.utils.env import DOM_DIFF_CACHE_MB, DOM_DIFF_MAX_BLOCKS
+
+logger = logging.getLogger(__name__)
+
+# Change detection for "any change" monitors, without a screenshot or Gemini
+# on every check.
+#
+# A page is reduced to its block-level text (paragraphs, list items, cells,
+# headings, ...) after dropping boilerplate: scripts and styles, nav/header/
+# footer/aside, forms, and elements whose class/id/role marks them as cookie
+# banners, ads, recommendations and the like. Volatile tokens (clock times,
+# "5 minutes ago", long hex ids) are masked, and every remaining block is
+# hashed to 64 bits. The fingerprint is that list of hashes, in page order.
+#
+# Two fingerprints are compared as multisets, in one pass over each: a block
+# is added or removed when its text is new or gone. A block that only moved
+# is not a change, so re-sorted carousels and lists stay quiet. Only the
+# first DOM_DIFF_MAX_BLOCKS blocks count, which keeps the fingerprint well
+# under DynamoDB's item size limit on huge pages.
+#
+# The hashes are small enough to persist on the monitor item; the block texts,
+# needed to tell the user what was removed, are kept per process in a
+# byte-capped LRU (DOM_DIFF_CACHE_MB).
+
+# Only conditions that name no field: "any change", "any update to the page",
+# "the page has changed", a bare "changed". "price has changed" or "any change
+# in stock" name a value, and go down the value path like any other condition.
+PAGE_WORDS = r"(?:page|site|website|listing|content|anything|something)"
+ANY_CHANGE_RE = re.compile(
+    r"\bany\s+(?:change|update)s?\b(?!\s+(?:in|to|of|on)\s+(?!(?:the\s+)?" + PAGE_WORDS + r"\b))"
+    r"|\b" + PAGE_WORDS + r"\s+(?:has\s+|have\s+|is\s+|gets?\s+)?(?:changed|changes|updated|updates)\b"
+    r"|^\s*(?:on\s+)?(?:changes?|changed|updates?|updated)\s*$",
+    re.I,
+)
+
+BLOCK_TAGS = frozenset((
+    "address", "article", "blockquote", "caption", "dd", "details", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "legend", "li", "main", "ol",
+    "p", "pre", "section", "summary", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+))
+BOILERPLATE_TAGS = frozenset((
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object", "head",
+    "nav", "header", "footer", "aside", "form", "button", "select", "dialog",
+))
+BOILERPLATE_ROLES = frozenset(("navigation", "banner", "contentinfo", "complementary", "search", "dialog", "alert"))
+BOILERPLATE_ATTR_RE = re.compile(
+    r"cookie|consent|gdpr|advert|(?:^|[\s_-])ads?(?:$|[\s_-])|sponsor|newsletter|subscribe|recommend|related"
+    r"|breadcrumb|social|modal|popup|toast|skip-link|visually-hidden|sr-only",
+    re.I,
+)
+VOLATILE_RE = re.compile(
+    r"\b\d{1,2}:\d{2}(?::\d{2})?(?:\s*[ap]\.?m\.?)?\b"
+    r"|\b\d+\s+(?:sec|second|min|minute|hr|hour|day|week)s?\s+ago\b"
+    r"|\b[0-9a-f]{16,}\b",
+    re.I,
+)
+READABLE_BLOCKS = 3  # fewer content blocks than this is a JS shell, not the page
+ALNUM_RE = re.compile(r"\w")
+
+_PARSER = html.HTMLParser(remove_comments=True, remove_pis=True)
+
+_lock = threading.Lock()
+_texts = OrderedDict()  # monitor key -> {hash: block text} of the last fingerprint
+_text_bytes = 0
+
+
+def is_any_change(condition):
+    """True when a monitor's condition asks about any change to the page rather than a value."""
+    return bool(condition and ANY_CHANGE_RE.search(condition))
+
+
+def _boilerplate(el, tag):
+    if tag in BOILERPLATE_TAGS:
+        return True
+    attrib = el.attrib
+    if not attrib:
+        return False
+    if "hidden" in attrib or attrib.get("aria-hidden") == "true" or attrib.get("role") in BOILERPLATE_ROLES:
+        return True
+    attrs = attrib.get("class", "") + " " + attrib.get("id", "")
+    return bool(BOILERPLATE_ATTR_RE.search(attrs))
+
+
+def blocks(html_text):
+    """Normalized text of every content block on the page, in document order."""
+    try:
+        root = html.fromstring(html_text, parser=_PARSER)
+    except (etree.ParserError, ValueError):
+        return []
+    out = []
+    buf = []
+
+    def flush():
+        if buf:
+            text = " ".join("".join(buf).split())
+            buf.clear()
+            if text and ALNUM_RE.search(text):
+                out.append(text)
+
+    walker = etree.iterwalk(root, events=("start", "end"))
+    for event, el in walker:
+        tag = el.tag if isinstance(el.tag, str) else ""
+        if event == "start":
+            if _boilerplate(el, tag):
+                # its tail is still page text; it is picked up on "end"
+                walker.skip_subtree()
+                continue
+            if tag in BLOCK_TAGS:
+                flush()
+            elif tag == "br":
+                buf.append(" ")
+            if el.text:
+                buf.append(el.text)
+        else:
+            if tag in BLOCK_TAGS:
+                flush()
+            if el.tail:
+                buf.append(el.tail)
+    flush()
+    return out
+
+
+def page_text(html_text, limit=None):
+    """The page's content blocks as plain text, one per line, cut at `limit` characters."""
+    return "\n".join(blocks(html_text))[:limit]
+
+
+def _hash(text):
+    if VOLATILE_RE.search(text):
+        text = VOLATILE_RE.sub("#", text)
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def fingerprint(html_text):
+    """(hashes, texts) for a page: block hashes in page order and hash -> block text."""
+    hashes = []
+    texts = {}
+    for text in blocks(html_text)[:DOM_DIFF_MAX_BLOCKS]:
+        h = _hash(text)
+        hashes.append(h)
+        texts.setdefault(h, text)
+    return hashes, texts
+
+
+def readable(fp):
+    return len(fp[0]) >= READABLE_BLOCKS
+
+
+def pack(hashes):
+    """Compact string form of a fingerprint's hashes, for the monitor item."""
+    return base64.b64encode(b"".join(h.to_bytes(8, "big") for h in hashes)).decode("ascii")
+
+
+def unpack(packed):
+    if not packed:
+        return None
+    try:
+        raw = base64.b64decode(packed)
+    except (ValueError, TypeError):
+        return None
+    return [int.from_bytes(raw[i:i + 8], "big") for i in range(0, len(raw) - 7, 8)]
+
+
+def _unmatched(hashes, other):
+    left = Counter(other)
+    out = []
+    for h in hashes:
+        if left[h] > 0:
+            left[h] -= 1
+        else:
+            out.append(h)
+    return out
+
+
+def diff(old_hashes, new_hashes):
+    """(added, removed) block hashes between two fingerprints, each in its own page order."""
+    return _unmatched(new_hashes, old_hashes), _unmatched(old_hashes, new_hashes)
+
+
+def compare(key, old_packed, fp):
+    """
+    Diff a page fingerprint against the stored (packed) one. Returns a dict
+    with the new packed fingerprint and, unless this is the first fingerprint,
+    the added block texts and removed block texts (None where this process
+    never saw the old text).
+    """
+    hashes, texts = fp
+    old = unpack(old_packed)
+    result = {"fingerprint": pack(hashes), "blocks": len(hashes), "baseline": old is None,
+              "added": [], "removed": []}
+    with _lock:
+        old_texts = _texts.get(key) or {}
+    if old is not None:
+        added, removed = diff(old, hashes)
+        result["added"] = [texts[h] for h in added]
+        result["removed"] = [old_texts.get(h) for h in removed]
+    result["changed"] = bool(result["added"] or result["removed"])
+    if result["changed"]:
+        logger.debug("%s: %d block(s) added, %d removed", key, len(result["added"]), len(result["removed"]))
+    metrics.inc("autoscout_dom_diff_total", outcome="baseline" if old is None else
+                ("changed" if result["changed"] else "unchanged"))
+    _remember(key, texts)
+    return result
+
+
+def _remember(key, texts):
+    global _text_bytes
+    size = sum(len(t) for t in texts.values())
+    limit = DOM_DIFF_CACHE_MB * 1024 * 1024
+    with _lock:
+        old = _texts.pop(key, None)
+        if old is not None:
+            _text_bytes -= sum(len(t) for t in old.values())
+        if size > limit:
+            return
+        _texts[key] = texts
+        _text_bytes += size
+        while _text_bytes > limit:
+            _, evicted = _texts.popitem(last=False)
+            _text_bytes -= sum(len(t) for t in evicted.values())
+
+
+def describe(result, limit=3):
+    """Plain-text account of a diff, used as is when no summary can be had."""
+    parts = []
+    added = result["added"]
+    removed = [t for t in result["removed"] if t]
+    if added:
+        parts.append(f"{len(added)} block(s) added: " + " | ".join(t[:160] for t in added[:limit]))
+    if result["removed"]:
+        line = f"{len(result['removed'])} block(s) removed"
+        parts.append(line + (": " + " | ".join(t[:160] for t in removed[:limit]) if removed else ""))
+    return "; ".join(parts)
+
+
+def forget(key=None):
+    """Drop the stored block texts for `key`, or all of them."""
+    global _text_bytes
+    with _lock:
+        if key is None:
+            _texts.clear()
+            _text_bytes = 0
+        else:
+            old = _texts.pop(key, None)
+            if old is not None:
+                _text_bytes -= sum(len(t) for t in old.values())
+
+
+metrics.describe("autoscout_dom_diff_total", "counter", "DOM fingerprint comparisons for any-change monitors.")
+metrics.describe("autoscout_llm_calls_avoided_total", "counter", "Gemini calls skipped by a reuse gate.")
@@ -0,0 +1,261 @@
+# backend/scrapper/fetch_tiers.py
+import logging
+import threading
+from urllib.parse import urlparse
+
+from backend.scrapper.scraper import (
+    fetch_page_html_requests,
+    fetch_rendered_html,
+    fetch_screenshot_playwright,
+)
+from backend.scrapper.structured_data import extract_structured, wants_offer_field
+from backend.utils import cpu_pool, llm_budget, pubsub
+from backend.utils.env import LLM_TEXT_FALLBACK_CHARS
+from backend.scrapper.antibot import raise_if_blocked
+from backend.scrapper import circuit_breaker, dom_diff
+from backend.agents import local_ocr
+from backend.agents.data_extractor import extract_from_image, extract_from_text
+from backend.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cheapest first. "http" is a plain requests GET plus structured-data parsing,
+# "dom" renders the page headless and parses the live DOM, "screenshot" is a
+# capture read by Gemini vision, skipped when it looks the same as last time.
+TIER_HTTP = "http"
+TIER_DOM = "dom"
+TIER_SCREENSHOT = "screenshot"
+TIERS = (TIER_HTTP, TIER_DOM, TIER_SCREENSHOT)
+
+MIN_CONFIDENCE = 0.6
+# a monitor parked on an expensive tier re-tries the cheapest one every N checks,
+# so a site that later ships structured data drops back to plain HTTP
+PROBE_CHEAPER_EVERY = 20
+
+_lock = threading.Lock()
+_monitor_tiers = {}   # monitor_id -> [tier index, checks since learned]
+_domain_tiers = {}    # hostname -> tier index
+
+
+def _domain(url):
+    return (urlparse(url).hostname or "").lower()
+
+
+def _tier_plan(monitor_id, domain, persisted=None):
+    """Indexes of the tiers to try, in order, for this check."""
+    with _lock:
+        state = _monitor_tiers.get(monitor_id)
+        if state is None:
+            if persisted in TIERS:
+                idx = TIERS.index(persisted)
+            else:
+                idx = _domain_tiers.get(domain, 0)
+            state = _monitor_tiers[monitor_id] = [idx, 0]
+        state[1] += 1
+        learned = state[0]
+    plan = list(range(learned, len(TIERS)))
+    if learned > 0 and state[1] % PROBE_CHEAPER_EVERY == 0:
+        # probe only the cheapest tier, then go straight back to the known-good one
+        plan.insert(0, 0)
+    return plan
+
+
+def forget(monitor_id):
+    """Drop what was learned for a deleted monitor."""
+    with _lock:
+        return _monitor_tiers.pop(monitor_id, None) is not None
+
+
+def _on_monitor_change(event):
+    # the monitor's own entry only; what the domain taught stays useful
+    if event.get("type") == "delete":
+        forget(event.get("monitor_id"))
+
+
+def _learn(monitor_id, domain, idx):
+    with _lock:
+        state = _monitor_tiers.get(monitor_id)
+        if state is None or state[0] != idx:
+            _monitor_tiers[monitor_id] = [idx, 0]
+        _domain_tiers[domain] = idx
+
+
+def _structured(html_text, description):
+    extracted = cpu_pool.run(extract_structured, html_text, description)
+    if extracted:
+        metrics.inc("autoscout_structured_hits_total", source=extracted["source"])
+    return extracted
+
+
+def _fetch_html(tier, url, render=None):
+    if tier == TIER_HTTP:
+        with metrics.span("http"):
+            return raise_if_blocked(fetch_page_html_requests(url))
+    with metrics.span("render"):
+        return raise_if_blocked(fetch_rendered_html(url, profile=render))
+
+
+def _run_tier(tier, url, description, render=None, key=None, user_id=None, budget=llm_budget.NORMAL):
+    if tier in (TIER_HTTP, TIER_DOM):
+        html_text = _fetch_html(tier, url, render)
+        with metrics.span("extract", tier=tier):
+            return _structured(html_text, description)
+    if budget == llm_budget.MINIMAL and not local_ocr.available():
+        # nothing but Gemini can read a screenshot; don't launch Chrome for it
+        llm_budget.degraded("screenshot_skipped", budget)
+        return None
+    if budget == llm_budget.ECONOMY and not local_ocr.available():
+        # the rendered page's visible text costs fewer tokens than its screenshot
+        llm_budget.degraded("text_instead_of_vision", budget)
+        html_text = _fetch_html(TIER_DOM, url, render)
+        with metrics.span("extract", tier=tier):
+            return extract_from_text(cpu_pool.run(dom_diff.page_text, html_text, LLM_TEXT_FALLBACK_CHARS),
+                                     description, user_id=user_id)
+    # numpy/Pillow are only needed once a check gets this far
+    from backend.scrapper import visual_diff
+
+    with metrics.span("screenshot"):
+        image_bytes = fetch_screenshot_playwright(url, profile=render)
+    with metrics.span("visual_diff"):
+        reused, fp = visual_diff.lookup(key, description, image_bytes)
+    if reused is not None:
+        return reused
+    with metrics.span("extract", tier=tier):
+        extracted = extract_from_image(image_bytes, description, user_id=user_id)
+    visual_diff.remember(key, description, fp, extracted)
+    return extracted
+
+
+def _good(extracted):
+    if not extracted or not extracted.get("value"):
+        return False
+    # image extraction does not report confidence; a value is all we get
+    return float(extracted.get("confidence", MIN_CONFIDENCE)) >= MIN_CONFIDENCE
+
+
+def _target_failing(tier, url, exc, last):
+    """
+    Record `exc` against the target's breaker when the site itself is failing.
+    True when the check should stop here rather than try a costlier tier.
+    """
+    reason, status = circuit_breaker.classify(exc)
+    if reason is None or (reason == "blocked" and not last):
+        # our own failure, or a bot wall a real browser may get past
+        logger.warning("%s tier failed for %s: %s", tier, url, exc)
+        return False
+    # the site is failing: a costlier tier would hit the same wall
+    logger.warning("%s tier: %s is failing (%s): %s", tier, url, reason, exc)
+    metrics.inc("autoscout_fetch_tier_total", tier=tier, outcome="target_failure")
+    circuit_breaker.record_failure(url, reason, status)
+    return True
+
+
+def _parse_failed(tier, url, exc):
+    # the page loaded but hung or killed a CPU worker; a costlier tier would
+    # fetch the same page and parse it again, so the check stops here with no
+    # verdict on the target
+    logger.warning("%s tier: could not parse %s: %s", tier, url, exc)
+    metrics.inc("autoscout_fetch_tier_total", tier=tier, outcome="parse_failure")
+    circuit_breaker.release(url)
+    return None, None
+
+
+def fetch_and_extract(url, description, monitor_id=None, persisted_tier=None, render=None, user_id=None):
+    """
+    Try the cheapest tier known to work for this monitor (or its domain) and
+    escalate only when it yields nothing usable. Returns (extracted, tier);
+    `extracted` is None when every tier failed or the target itself is
+    failing. `render` is the resolved render profile used by the two browser
+    tiers; under LLM budget pressure for `user_id` the screenshot tier is read
+    by local OCR only, or without it reads page text instead or is skipped.
+    Raises circuit_breaker.CircuitOpen when the URL or its domain is backing
+    off.
+    """
+    circuit_breaker.check(url)
+    domain = _domain(url)
+    key = monitor_id or url
+    if wants_offer_field(description):
+        plan = _tier_plan(key, domain, persisted_tier)
+    else:
+        # structured data can't answer this (scores, headlines, ...); go
+        # straight to the screenshot and don't teach the domain anything
+        plan = [TIERS.index(TIER_SCREENSHOT)]
+        domain = None
+    budget = llm_budget.mode(user_id)
+    reached = False
+    for pos, idx in enumerate(plan):
+        tier = TIERS[idx]
+        try:
+            extracted = _run_tier(tier, url, description, render, key, user_id, budget)
+            reached = True
+        except cpu_pool.TaskFailed as e:
+            return _parse_failed(tier, url, e)
+        except Exception as e:
+            if _target_failing(tier, url, e, pos + 1 == len(plan)):
+                return None, None
+            extracted = None
+        if _good(extracted):
+            metrics.inc("autoscout_fetch_tier_total", tier=tier, outcome="hit")
+            if domain is not None:
+                _learn(key, domain, idx)
+            circuit_breaker.record_success(url)
+            return extracted, tier
+        metrics.inc("autoscout_fetch_tier_total", tier=tier, outcome="miss")
+        if pos + 1 < len(plan):
+            metrics.inc("autoscout_fallbacks_total", component="fetch_tier", reason=f"{tier}_to_{TIERS[plan[pos + 1]]}")
+    if reached:
+        # the page loaded fine, we just couldn't read the value from it
+        circuit_breaker.record_success(url)
+    else:
+        # only our own failures: no verdict on the target
+        circuit_breaker.release(url)
+    return None, None
+
+
+def fetch_html(url, monitor_id=None, persisted_tier=None, render=None, usable=bool):
+    """
+    Page HTML for checks that read the whole page rather than one value, from
+    the cheapest of the http and dom tiers whose result passes `usable` (a JS
+    shell from plain HTTP usually doesn't). Returns (html_text, tier), or
+    (None, None) like fetch_and_extract; raises CircuitOpen the same way.
+    """
+    circuit_breaker.check(url)
+    domain = _domain(url)
+    key = monitor_id or url
+    screenshot = TIERS.index(TIER_SCREENSHOT)
+    plan = [idx for idx in _tier_plan(key, domain, persisted_tier) if idx != screenshot]
+    if not plan:
+        plan = [TIERS.index(TIER_DOM)]
+    reached = False
+    for pos, idx in enumerate(plan):
+        tier = TIERS[idx]
+        try:
+            html_text = _fetch_html(tier, url, render)
+            reached = True
+        except Exception as e:
+            if _target_failing(tier, url, e, pos + 1 == len(plan)):
+                return None, None
+            html_text = None
+        try:
+            ok = bool(html_text) and usable(html_text)
+        except cpu_pool.TaskFailed as e:
+            return _parse_failed(tier, url, e)
+        if ok:
+            metrics.inc("autoscout_fetch_tier_total", tier=tier, outcome="hit")
+            _learn(key, domain, idx)
+            circuit_breaker.record_success(url)
+            return html_text, tier
+        metrics.inc("autoscout_fetch_tier_total", tier=tier, outcome="miss")
+        if pos + 1 < len(plan):
+            metrics.inc("autoscout_fallbacks_total", component="fetch_tier", reason=f"{tier}_to_{TIERS[plan[pos + 1]]}")
+    if reached:
+        circuit_breaker.record_success(url)
+    else:
+        circuit_breaker.release(url)
+    return None, None
+
+
+pubsub.subscribe(pubsub.MONITORS, _on_monitor_change)
+
+metrics.describe("autoscout_fetch_tier_total", "counter", "Fetch tier attempts by outcome.")
+metrics.describe("autoscout_structured_hits_total", "counter", "Values answered from structured product data instead of an LLM.")
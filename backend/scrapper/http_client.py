@@ -0,0 +1,322 @@
+# backend/scrapper/http_client.py
+import ipaddress
+import logging
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from backend.utils import metrics
+from backend.utils.env import (
+    HTTP_CLIENT,
+    HTTP_DNS_CACHE_SIZE,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_MAX_RESPONSE_BYTES,
+    HTTP_POOL_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (compatible; AutoScout/1.0; +https://example.com/bot)"
+CHUNK_SIZE = 64 * 1024
+META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w-]+)", re.I)
+
+
+class ResponseTooLarge(Exception):
+    """Raised when a response body exceeds the configured size limit."""
+
+
+# One client per process, shared by every scheduler thread. Both backends keep
+# per-host keep-alive pools, so monitors on the same site reuse TCP+TLS
+# connections instead of handshaking on every check.
+_lock = threading.Lock()
+_client = None
+_backend = None
+
+
+def _accept_encoding():
+    try:
+        import brotli  # noqa: F401  (urllib3/httpx decode br when it is importable)
+        return "gzip, deflate, br"
+    except ImportError:
+        return "gzip, deflate"
+
+
+def _build():
+    headers = {
+        "User-Agent": USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Encoding": _accept_encoding(),
+        "Accept-Language": "en-US,en;q=0.9",
+    }
+    if HTTP_CLIENT in ("auto", "httpx"):
+        try:
+            import httpx
+            try:
+                import h2  # noqa: F401
+                http2 = True
+            except ImportError:
+                http2 = False
+            if http2 or HTTP_CLIENT == "httpx":
+                transport = httpx.HTTPTransport(
+                    http2=http2,
+                    limits=httpx.Limits(max_connections=HTTP_POOL_SIZE * 4,
+                                        max_keepalive_connections=HTTP_POOL_SIZE),
+                )
+                if HTTP_DNS_CACHE_TTL > 0:
+                    _cache_httpx_dns(transport)
+                client = httpx.Client(headers=headers, follow_redirects=True, transport=transport)
+                return client, "httpx"
+        except ImportError:
+            if HTTP_CLIENT == "httpx":
+                logger.warning("HTTP_CLIENT=httpx but httpx is not installed; using requests")
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.headers.update(headers)
+    # pool_connections = number of hosts kept, pool_maxsize = sockets per host
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE * 4, pool_maxsize=HTTP_POOL_SIZE)
+    if HTTP_DNS_CACHE_TTL > 0:
+        adapter.poolmanager.pool_classes_by_scheme = _cached_pool_classes()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session, "requests"
+
+
+def get_client():
+    global _client, _backend
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client, _backend = _build()
+                logger.info("http client ready (%s)", _backend)
+    return _client
+
+
+def close():
+    global _client, _backend
+    with _lock:
+        client, _client, _backend = _client, None, None
+    if client is not None:
+        client.close()
+
+
+def _decode(body, content_type):
+    m = re.search(r"charset=([\w-]+)", content_type or "", re.I)
+    charset = m.group(1) if m else None
+    if not charset:
+        m = META_CHARSET_RE.search(body[:2048])
+        charset = m.group(1).decode("ascii") if m else "utf-8"
+    try:
+        return body.decode(charset, "replace")
+    except LookupError:
+        return body.decode("utf-8", "replace")
+
+
+def _read_limited(chunks, limit, url):
+    buf = bytearray()
+    for chunk in chunks:
+        buf += chunk
+        # counted after decompression, so a gzip bomb trips the limit too
+        if len(buf) > limit:
+            raise ResponseTooLarge(f"{url}: body exceeds {limit} bytes")
+    return bytes(buf)
+
+
+def fetch(url, timeout=15, max_bytes=None, headers=None):
+    """
+    GET `url` through the shared pool and return (status, headers, body bytes).
+    Raises for HTTP errors and ResponseTooLarge once the body passes `max_bytes`.
+    """
+    limit = max_bytes or HTTP_MAX_RESPONSE_BYTES
+    client = get_client()
+    start = time.perf_counter()
+    if _backend == "httpx":
+        with client.stream("GET", url, headers=headers, timeout=timeout) as resp:
+            resp.raise_for_status()
+            if int(resp.headers.get("content-length") or 0) > limit:
+                raise ResponseTooLarge(f"{url}: content-length exceeds {limit} bytes")
+            body = _read_limited(resp.iter_bytes(CHUNK_SIZE), limit, url)
+            status, resp_headers = resp.status_code, dict(resp.headers)
+            metrics.inc("autoscout_http_responses_total", version=resp.http_version)
+    else:
+        with client.get(url, headers=headers, timeout=timeout, stream=True) as resp:
+            resp.raise_for_status()
+            if int(resp.headers.get("content-length") or 0) > limit:
+                raise ResponseTooLarge(f"{url}: content-length exceeds {limit} bytes")
+            body = _read_limited(resp.iter_content(CHUNK_SIZE), limit, url)
+            status, resp_headers = resp.status_code, dict(resp.headers)
+            metrics.inc("autoscout_http_responses_total", version="HTTP/1.1")
+    metrics.observe("autoscout_http_fetch_seconds", time.perf_counter() - start)
+    return status, resp_headers, body
+
+
+def fetch_text(url, timeout=15, max_bytes=None):
+    status, headers, body = fetch(url, timeout=timeout, max_bytes=max_bytes)
+    content_type = next((v for k, v in headers.items() if k.lower() == "content-type"), "")
+    return _decode(body, content_type)
+
+
+# --- DNS cache -------------------------------------------------------------
+# Both clients resolve the host on every new connection. The cache below is
+# plugged into the scraper's own transports only (an httpcore network backend
+# for httpx, a connection class for urllib3), so boto3, the Gemini SDK and the
+# rest of the process keep resolving normally.
+#
+# Entries live for the record's TTL when dnspython is installed, capped at
+# HTTP_DNS_CACHE_TTL; getaddrinfo reports no TTL, so without dnspython they
+# live for DNS_FALLBACK_TTL. The least recently used host is dropped past
+# HTTP_DNS_CACHE_SIZE, and a host whose addresses all refuse a connection is
+# dropped so the next connection resolves it again.
+
+DNS_FALLBACK_TTL = 30
+
+
+class DNSCache:
+    def __init__(self, max_ttl, size):
+        self.max_ttl = max_ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # host -> (expires, [addresses])
+
+    def resolve(self, host, port):
+        """Addresses to try for `host`, in order; IP literals pass through."""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(host)
+            if hit and hit[0] > now:
+                self._entries.move_to_end(host)
+                metrics.inc("autoscout_cache_hits_total", cache="dns")
+                return hit[1]
+        metrics.inc("autoscout_cache_misses_total", cache="dns")
+        addresses, ttl = _lookup(host, port)
+        ttl = min(ttl, self.max_ttl)
+        if ttl > 0:
+            with self._lock:
+                self._entries[host] = (now + ttl, addresses)
+                self._entries.move_to_end(host)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return addresses
+
+    def forget(self, host):
+        with self._lock:
+            self._entries.pop(host, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _lookup(host, port):
+    """(addresses, ttl seconds) for `host`."""
+    try:
+        import dns.resolver
+    except ImportError:
+        dns = None
+    if dns is not None:
+        addresses, ttl = [], None
+        for rdtype in ("A", "AAAA"):
+            try:
+                answer = dns.resolver.resolve(host, rdtype)
+            except Exception:  # NXDOMAIN, no answer, timeout: getaddrinfo decides below
+                continue
+            addresses += [r.address for r in answer]
+            ttl = answer.rrset.ttl if ttl is None else min(ttl, answer.rrset.ttl)
+        if addresses:
+            return addresses, ttl
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    return addresses, DNS_FALLBACK_TTL
+
+
+def _connect_first(host, addresses, connect):
+    """connect(address) for each address until one succeeds, like socket.create_connection."""
+    for n, address in enumerate(addresses):
+        try:
+            return connect(address)
+        except Exception:
+            if n == len(addresses) - 1:
+                _dns.forget(host)
+                raise
+
+
+class _CachingNetworkBackend:
+    """httpcore network backend that connects to the cached addresses; TLS still uses the host name."""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        return _connect_first(host, _dns.resolve(host, port), lambda address: self.inner.connect_tcp(
+            address, port, timeout=timeout, local_address=local_address, socket_options=socket_options))
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self.inner.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    def sleep(self, seconds):
+        return self.inner.sleep(seconds)
+
+
+def _cache_httpx_dns(transport):
+    pool = getattr(transport, "_pool", None)
+    if pool is None or not hasattr(pool, "_network_backend"):
+        logger.warning("httpx transport has no network backend to wrap; DNS cache off")
+        return
+    pool._network_backend = _CachingNetworkBackend(pool._network_backend)
+
+
+def _cached_pool_classes():
+    """urllib3 pool classes whose connections resolve through the DNS cache."""
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class CachedDNSMixin:
+        def _new_conn(self):
+            # _dns_host is only used to open the socket; SNI and Host use self.host
+            host = self._dns_host
+
+            def connect(address):
+                self._dns_host = address
+                try:
+                    return super(CachedDNSMixin, self)._new_conn()
+                finally:
+                    self._dns_host = host
+
+            return _connect_first(host, _dns.resolve(host, self.port), connect)
+
+    class Connection(CachedDNSMixin, HTTPConnection):
+        pass
+
+    class TLSConnection(CachedDNSMixin, HTTPSConnection):
+        pass
+
+    class Pool(HTTPConnectionPool):
+        ConnectionCls = Connection
+
+    class TLSPool(HTTPSConnectionPool):
+        ConnectionCls = TLSConnection
+
+    return {"http": Pool, "https": TLSPool}
+
+
+_dns = DNSCache(HTTP_DNS_CACHE_TTL, HTTP_DNS_CACHE_SIZE)
+
+
+def clear_dns_cache():
+    _dns.clear()
+
+
+metrics.describe("autoscout_http_responses_total", "counter", "Scraper HTTP responses by protocol version.")
+metrics.describe("autoscout_http_fetch_seconds", "histogram", "Scraper HTTP fetch latency including body read.")
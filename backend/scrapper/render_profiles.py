@@ -0,0 +1,135 @@
+# backend/scrapper/render_profiles.py
+import json
+import logging
+from urllib.parse import urlparse
+
+from backend.utils.env import RENDER_PROFILE_DEFAULT, RENDER_PROFILE_DOMAINS
+
+logger = logging.getLogger(__name__)
+
+# How a headless render may spend its time and bandwidth. A monitor can pick a
+# profile (`render_profile` on the item) and a `target_selector`; otherwise the
+# domain override from RENDER_PROFILE_DOMAINS applies, then RENDER_PROFILE_DEFAULT.
+#
+#   block        resource classes to drop before they are requested
+#   block_ads    drop known ad/analytics/tag-manager hosts
+#   capture      "full_page" or "viewport" when the monitor has no target_selector
+#   wait         "dom" for DOMContentLoaded, "load" for the full load event
+#   use_selector with a target_selector, wait for it and capture only that element
+#   timeout_ms   hard budget for navigation + wait
+#
+# Without a selector the default still captures the whole page, as before
+# profiles existed; viewport-only capture is opt-in ("viewport", "lean").
+PROFILES = {
+    # the original behaviour: everything loads, full-height capture, selector ignored
+    "full": {
+        "block": (),
+        "block_ads": False,
+        "capture": "full_page",
+        "wait": "load",
+        "use_selector": False,
+        "timeout_ms": 30000,
+        "viewport": (1920, 1080),
+    },
+    "default": {
+        "block": ("media",),
+        "block_ads": True,
+        "capture": "full_page",
+        "wait": "load",
+        "use_selector": True,
+        "timeout_ms": 30000,
+        "viewport": (1920, 1080),
+    },
+    # pages whose value sits above the fold
+    "viewport": {
+        "block": ("image", "media", "font"),
+        "block_ads": True,
+        "capture": "viewport",
+        "wait": "dom",
+        "use_selector": True,
+        "timeout_ms": 20000,
+        "viewport": (1366, 1024),
+    },
+    # DOM-only renders and sites that stay readable unstyled
+    "lean": {
+        "block": ("image", "media", "font", "stylesheet"),
+        "block_ads": True,
+        "capture": "viewport",
+        "wait": "dom",
+        "use_selector": True,
+        "timeout_ms": 12000,
+        "viewport": (1280, 900),
+    },
+}
+
+# URL patterns for Network.setBlockedURLs ("*" wildcards)
+RESOURCE_PATTERNS = {
+    "image": ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp"),
+    "media": ("*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.ogg", "*.mov"),
+    "font": ("*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"),
+    "stylesheet": ("*.css", "*.css?*"),
+}
+
+AD_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "googletagmanager.com", "google-analytics.com",
+    "googleadservices.com", "adservice.google.com", "facebook.net", "connect.facebook.net",
+    "analytics.tiktok.com", "bat.bing.com", "hotjar.com", "segment.io", "segment.com",
+    "optimizely.com", "newrelic.com", "nr-data.net", "criteo.com", "criteo.net", "taboola.com",
+    "outbrain.com", "amazon-adsystem.com", "adnxs.com", "scorecardresearch.com", "quantserve.com",
+    "mouseflow.com", "fullstory.com", "clarity.ms", "branch.io", "braze.com", "klaviyo.com",
+)
+
+
+def _domain_overrides():
+    if not RENDER_PROFILE_DOMAINS:
+        return {}
+    try:
+        return {k.lower(): v for k, v in json.loads(RENDER_PROFILE_DOMAINS).items()}
+    except ValueError:
+        logger.warning("RENDER_PROFILE_DOMAINS is not valid JSON; ignoring")
+        return {}
+
+
+_DOMAINS = _domain_overrides()
+
+
+def _for_domain(host):
+    # most specific suffix wins: "shop.example.com" before "example.com"
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        name = _DOMAINS.get(".".join(parts[i:]))
+        if name:
+            return name
+    return None
+
+
+def resolve_profile(url, monitor=None):
+    """
+    Effective render profile for a check: a copy of the named profile with the
+    monitor's target_selector folded in. With a selector (and a profile that
+    uses it) the render waits for that element and captures only it; the
+    profile's own capture stays in `page_capture` for when it is missing.
+    """
+    monitor = monitor or {}
+    host = (urlparse(url).hostname or "").lower()
+    name = monitor.get("render_profile") or _for_domain(host) or RENDER_PROFILE_DEFAULT
+    if name not in PROFILES:
+        logger.warning("unknown render profile %r; using default", name)
+        name = "default"
+    profile = dict(PROFILES[name], name=name)
+    selector = monitor.get("target_selector")
+    profile["selector"] = selector
+    profile["page_capture"] = profile["capture"]
+    if selector and profile["use_selector"]:
+        profile["wait"] = "selector"
+        profile["capture"] = "element"
+    return profile
+
+
+def blocked_url_patterns(profile):
+    patterns = []
+    for kind in profile.get("block", ()):
+        patterns.extend(RESOURCE_PATTERNS.get(kind, ()))
+    if profile.get("block_ads"):
+        patterns.extend(f"*{host}*" for host in AD_HOSTS)
+    return patterns
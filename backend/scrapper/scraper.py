@@ -1,23 +1,30 @@
 # backend/scraper/scraper.py
-import requests
 from lxml import etree, html
 import logging
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 
-# If you plan to use Playwright or Selenium, ensure Chrome + driver in your Lambda image and import here.
+from backend.scrapper.antibot import raise_if_blocked
+from backend.scrapper.http_client import fetch_text
+from backend.scrapper.render_profiles import blocked_url_patterns, resolve_profile
+from backend.utils import cpu_pool, metrics
+
+logger = logging.getLogger(__name__)
+
+# If you plan to use Playwright or Selenium, ensure Chrome + driver in your Lambda image.
+# Both are imported inside the functions that need them so that importing this
+# module stays cheap on cold start.
 
 def fetch_page_html_requests(url, timeout=15):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; AutoScout/1.0; +https://example.com/bot)"
-    }
-    resp = requests.get(url, headers=headers, timeout=timeout)
-    resp.raise_for_status()
-    return resp.text
+    # shared keep-alive pool (HTTP/2 when available), size-capped streaming read
+    return fetch_text(url, timeout=timeout)
 
 
 def extract_with_xpath(html_text, xpath_expr):
+    # parsing a big page holds the GIL; large ones go to the CPU pool
+    return cpu_pool.run(_xpath_first, html_text, xpath_expr)
+
+
+def _xpath_first(html_text, xpath_expr):
     tree = html.fromstring(html_text)
     nodes = tree.xpath(xpath_expr)
     if not nodes:
@@ -32,6 +39,90 @@ def extract_with_xpath(html_text, xpath_expr):
         return None
 
 
+def _start_driver(profile):
+    """Headless Chrome configured for a render profile (see render_profiles.py)."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    width, height = profile["viewport"]
+    options.add_argument(f"--window-size={width},{height}")
+    # "load" waits for every subresource; "dom" / "selector" return at
+    # DOMContentLoaded and wait for what they need themselves
+    options.page_load_strategy = "normal" if profile["wait"] == "load" else "eager"
+    if "image" in profile["block"]:
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    if "media" in profile["block"]:
+        options.add_argument("--autoplay-policy=user-gesture-required")
+
+    driver = webdriver.Chrome(options=options)
+    patterns = blocked_url_patterns(profile)
+    if patterns:
+        # dropped in the network stack, before any bytes are requested
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    driver.set_page_load_timeout(max(1, profile["timeout_ms"] // 1000))
+    return driver
+
+
+def _load(driver, url, profile):
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    start = time.perf_counter()
+    driver.get(url)
+    # a challenge page never grows the target selector; fail now, not at the timeout
+    raise_if_blocked(driver.page_source)
+    if profile["wait"] == "selector" and profile.get("selector"):
+        remaining = max(1.0, profile["timeout_ms"] / 1000.0 - (time.perf_counter() - start))
+        try:
+            WebDriverWait(driver, remaining, poll_frequency=0.1).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, profile["selector"]))
+            )
+        except TimeoutException:
+            # the page answered; the selector is stale or wrong. That is the
+            # monitor's problem, not a target timeout for the breakers
+            logger.warning("target selector %r never appeared on %s", profile["selector"], url)
+            metrics.inc("autoscout_selector_misses_total", profile=profile["name"])
+    _record_transfer(driver, profile)
+
+
+def _record_transfer(driver, profile):
+    try:
+        transferred = driver.execute_script(
+            "return performance.getEntriesByType('navigation').concat("
+            "performance.getEntriesByType('resource')).reduce((t, e) => t + (e.transferSize || 0), 0);"
+        )
+        metrics.observe("autoscout_render_bytes", float(transferred or 0), profile=profile["name"])
+    except Exception:
+        pass
+
+
+def fetch_rendered_html(url, timeout=30000, profile=None):
+    """
+    Render the page in headless Chrome and return the DOM after scripts ran.
+    Cheaper than a screenshot: no full-height resize, no PNG encode, no vision call.
+    """
+    profile = profile or resolve_profile(url)
+    # the DOM is all we read, so images and styles can go too unless the
+    # profile loads everything
+    if profile["block"]:
+        wait = "dom" if profile["wait"] == "load" else profile["wait"]
+        profile = dict(profile, wait=wait, block=tuple(set(profile["block"]) | {"image", "media", "font", "stylesheet"}))
+    driver = _start_driver(profile)
+    try:
+        _load(driver, url, profile)
+        return driver.page_source
+    finally:
+        driver.quit()
+
+
 # Optional: Selenium/Playwright fallback (requires browser in container)
 def fetch_page_html_with_browser(url):
     # Minimal example using Playwright sync API (ensure playwright is installed & browsers installed)
@@ -66,36 +157,42 @@ def fetch_page_html_with_browser(url):
     #     image_bytes = page.screenshot(full_page=True)
     #     browser.close()
     # return image_bytes
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
 
-    driver = webdriver.Chrome(options=options)
-    driver.set_page_load_timeout(timeout // 1000)  # Selenium uses seconds
-    driver.get(url)
 
-    # Full-page screenshot (Chrome-specific)
-    screenshot = driver.get_screenshot_as_png()
-    driver.quit()
-    return screenshot
-def fetch_screenshot_playwright(url, timeout=30000):
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
+def fetch_screenshot_playwright(url, timeout=30000, profile=None):
+    """
+    PNG of the page under a render profile: just the target element, just the
+    viewport, or the original scroll-and-resize full page.
+    """
+    from selenium.webdriver.common.by import By
 
-    driver = webdriver.Chrome(options=options)
-    driver.set_page_load_timeout(timeout // 1000)
-    driver.get(url)
+    profile = profile or resolve_profile(url)
+    driver = _start_driver(profile)
+    try:
+        _load(driver, url, profile)
+
+        capture = profile["capture"]
+        if capture == "element" and profile.get("selector"):
+            try:
+                element = driver.find_element(By.CSS_SELECTOR, profile["selector"])
+                return element.screenshot_as_png
+            except Exception:
+                capture = profile.get("page_capture", "viewport")
+                logger.warning("target selector %r not found on %s; capturing %s", profile["selector"], url, capture)
+
+        if capture == "full_page":
+            # 👇 Scroll to bottom to load dynamic content
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+
+            # 👇 Resize window to full height before screenshot
+            height = driver.execute_script("return document.body.scrollHeight")
+            driver.set_window_size(profile["viewport"][0], height)
 
-    # 👇 Scroll to bottom to load dynamic content
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        return driver.get_screenshot_as_png()
+    finally:
+        driver.quit()
 
-    # 👇 Resize window to full height before screenshot
-    height = driver.execute_script("return document.body.scrollHeight")
-    driver.set_window_size(1920, height)
 
-    screenshot = driver.get_screenshot_as_png()
-    driver.quit()
-    return screenshot
\ No newline at end of file
+metrics.describe("autoscout_selector_misses_total", "counter", "Renders whose target selector never appeared.")
+metrics.describe("autoscout_render_bytes", "histogram", "Bytes transferred per headless render.",
+                 buckets=(50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6, 25e6))
@@ -0,0 +1,288 @@
+# backend/scrapper/structured_data.py
+import json
+import re
+
+from lxml import html
+
+# Product data embedded for search engines: schema.org JSON-LD, product/OpenGraph
+# <meta> tags and schema.org microdata. Reading it is plain parsing, so it is
+# tried before any Gemini call.
+#
+# JSON-LD blocks and <meta> tags are located with str.find / a regex over <head>
+# instead of a full DOM build, which keeps the common case in the tens of microseconds even on
+# large pages. lxml is only used for microdata, which has to be read in
+# document structure, and only when the page mentions itemprop at all.
+
+LD_JSON_MARKER = "application/ld+json"
+META_RE = re.compile(r"<meta\s[^>]*>", re.I)
+ATTR_RE = re.compile(r"([\w:-]+)\s*=\s*(\"[^\"]*\"|'[^']*')")
+PRICE_META = ("product:price:amount", "og:price:amount", "product:sale_price:amount")
+CURRENCY_META = ("product:price:currency", "og:price:currency", "product:sale_price:currency")
+AVAILABILITY_META = ("product:availability", "og:availability")
+
+# which structured field a monitor description is asking for
+AVAILABILITY_FIELD_RE = re.compile(r"\b(stock|in-stock|availab\w*|sold out|restock\w*)\b", re.I)
+OFFER_FIELD_RE = re.compile(
+    r"\b(price|prices|cost|costs|deal|discount|sale|msrp|stock|in-stock|availab\w*|sold out|restock\w*)\b", re.I
+)
+
+CONFIDENCE = {"json-ld": 0.95, "microdata": 0.85, "meta": 0.85}
+
+AVAILABILITY_ALIASES = {
+    "instock": "InStock",
+    "in stock": "InStock",
+    "outofstock": "OutOfStock",
+    "out of stock": "OutOfStock",
+    "soldout": "SoldOut",
+    "preorder": "PreOrder",
+    "backorder": "BackOrder",
+    "limitedavailability": "LimitedAvailability",
+    "discontinued": "Discontinued",
+    "onlineonly": "OnlineOnly",
+    "instoreonly": "InStoreOnly",
+}
+
+
+def wants_offer_field(description):
+    """True when the monitor asks about something a product offer can answer."""
+    return bool(OFFER_FIELD_RE.search(description or ""))
+
+
+def parse_price(value):
+    """
+    Parse a price given as a number or text ("1,149.99", "1.149,99", "34,99",
+    "$ 255"). Returns a float or None.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    s = re.sub(r"[^\d.,]", "", str(value or ""))
+    if not s:
+        return None
+    if "," in s and "." in s:
+        # whichever separator comes last is the decimal point
+        if s.rfind(",") > s.rfind("."):
+            s = s.replace(".", "").replace(",", ".")
+        else:
+            s = s.replace(",", "")
+    elif "," in s:
+        head, _, tail = s.rpartition(",")
+        # "34,99" is a decimal comma, "1,149" is a thousands separator
+        s = f"{head.replace(',', '')}.{tail}" if len(tail) != 3 else s.replace(",", "")
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def normalize_availability(value):
+    if not value:
+        return None
+    token = str(value).strip().rsplit("/", 1)[-1]
+    return AVAILABILITY_ALIASES.get(token.lower(), token)
+
+
+def _types(node):
+    t = node.get("@type")
+    if isinstance(t, list):
+        return {str(x).rsplit("/", 1)[-1] for x in t}
+    return {str(t).rsplit("/", 1)[-1]} if t else set()
+
+
+def _iter_nodes(node):
+    """Yield every dict in a JSON-LD document (iteratively, no recursion limit)."""
+    stack = [node]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            yield cur
+            stack.extend(reversed(list(cur.values())))
+        elif isinstance(cur, list):
+            stack.extend(reversed(cur))
+
+
+def _offer_price(offer):
+    for key in ("price", "lowPrice", "highPrice"):
+        if offer.get(key) not in (None, ""):
+            return offer[key]
+    spec = offer.get("priceSpecification")
+    if isinstance(spec, list) and spec:
+        spec = spec[0]
+    if isinstance(spec, dict) and spec.get("price") not in (None, ""):
+        return spec["price"]
+    return None
+
+
+def _offer_currency(offer):
+    currency = offer.get("priceCurrency")
+    spec = offer.get("priceSpecification")
+    if not currency and isinstance(spec, dict):
+        currency = spec.get("priceCurrency")
+    return currency
+
+
+def _pick_offer(offers):
+    """First in-stock offer with a price, else the first offer with a price."""
+    priced = [o for o in offers if _offer_price(o) is not None]
+    for offer in priced:
+        if normalize_availability(offer.get("availability")) == "InStock":
+            return offer
+    return priced[0] if priced else None
+
+
+def _collect_offers(product):
+    offers = product.get("offers")
+    if isinstance(offers, dict):
+        offers = [offers]
+    out = []
+    for offer in offers or []:
+        if not isinstance(offer, dict):
+            continue
+        # AggregateOffer may wrap the individual offers
+        nested = offer.get("offers")
+        if isinstance(nested, (list, dict)):
+            out.extend(o for o in (nested if isinstance(nested, list) else [nested]) if isinstance(o, dict))
+        out.append(offer)
+    return out
+
+
+def _ld_json_blocks(text):
+    """Yield the bodies of <script type="application/ld+json"> elements."""
+    pos = text.find(LD_JSON_MARKER)
+    while pos >= 0:
+        tag_start = text.rfind("<", 0, pos)
+        body_start = text.find(">", pos) + 1
+        body_end = text.find("</script", body_start)
+        if body_start <= 0 or body_end < 0:
+            return
+        if text[tag_start:tag_start + 7].lower() == "<script":
+            yield text[body_start:body_end]
+        pos = text.find(LD_JSON_MARKER, body_end)
+
+
+def _from_json_ld(text):
+    offers = []
+    for raw in _ld_json_blocks(text):
+        raw = raw.strip()
+        if raw.startswith("<!--"):
+            raw = raw[4:].rsplit("-->", 1)[0]
+        try:
+            doc = json.loads(raw)
+        except ValueError:
+            continue
+        for node in _iter_nodes(doc):
+            # the first product with offers is the page's own; later ones are
+            # usually "related items"
+            if _types(node) & {"Product", "ProductGroup", "IndividualProduct", "Vehicle"}:
+                offers = _collect_offers(node)
+                if offers:
+                    break
+        if not offers:
+            # some sites publish a bare Offer
+            offers.extend(n for n in _iter_nodes(doc) if _types(n) & {"Offer", "AggregateOffer"})
+        if offers:
+            break
+    offer = _pick_offer(offers)
+    if offer is None:
+        return None
+    return {
+        "price": _offer_price(offer),
+        "currency": _offer_currency(offer),
+        "availability": normalize_availability(offer.get("availability")),
+        "offers": len(offers),
+    }
+
+
+def _from_meta(text):
+    head_end = text.find("</head")
+    scope = text if head_end < 0 else text[:head_end]
+    found = {}
+    for tag in META_RE.findall(scope):
+        attrs = {k.lower(): v[1:-1] for k, v in ATTR_RE.findall(tag)}
+        key = (attrs.get("property") or attrs.get("name") or "").lower()
+        if key and "content" in attrs and key not in found:
+            found[key] = attrs["content"]
+    price = next((found[k] for k in PRICE_META if k in found), None)
+    if price is None:
+        return None
+    return {
+        "price": price,
+        "currency": next((found[k] for k in CURRENCY_META if k in found), None),
+        "availability": normalize_availability(next((found[k] for k in AVAILABILITY_META if k in found), None)),
+        "offers": 1,
+    }
+
+
+def _itemprop(scope, name):
+    for node in scope.xpath(".//*[@itemprop=$name]", name=name):
+        value = node.get("content") or node.get("href") or node.text_content()
+        if value and value.strip():
+            return value.strip()
+    return None
+
+
+def _from_microdata(text):
+    if "itemprop" not in text:
+        return None
+    try:
+        tree = html.fromstring(text)
+    except Exception:
+        return None
+    for offer in tree.xpath('//*[@itemprop="offers"]'):
+        price = _itemprop(offer, "price") or _itemprop(offer, "lowPrice")
+        if price:
+            return {
+                "price": price,
+                "currency": _itemprop(offer, "priceCurrency"),
+                "availability": normalize_availability(_itemprop(offer, "availability")),
+                "offers": 1,
+            }
+    nodes = tree.xpath('//*[@itemprop="price"]')
+    if nodes:
+        node = nodes[0]
+        return {"price": node.get("content") or node.text_content().strip(), "currency": None,
+                "availability": None, "offers": 1}
+    return None
+
+
+def extract_offer(html_text):
+    """
+    Return the page's primary offer as {"price", "currency", "availability",
+    "offers", "source"}, or None when no structured product data is present.
+    """
+    if not html_text:
+        return None
+    if isinstance(html_text, bytes):
+        html_text = html_text.decode("utf-8", "replace")
+    for source, parser in (("json-ld", _from_json_ld), ("meta", _from_meta), ("microdata", _from_microdata)):
+        offer = parser(html_text)
+        if offer and (offer["price"] is not None or offer["availability"]):
+            offer["source"] = source
+            return offer
+    return None
+
+
+def extract_structured(html_text, description=None):
+    """
+    Answer `description` from structured product data, in the same
+    {"value", "normalized", "confidence"} shape data_extractor returns
+    (plus "currency", "availability" and "source"). Returns None when the
+    description is not about price/stock or the page has no usable offer.
+    """
+    if description is not None and not wants_offer_field(description):
+        return None
+    offer = extract_offer(html_text)
+    if not offer:
+        return None
+    confidence = CONFIDENCE[offer["source"]]
+    if offer["offers"] > 1:
+        # several offers (sellers, variants): the pick may not be the one shown
+        confidence -= 0.1
+    extra = {"currency": offer["currency"], "availability": offer["availability"], "source": offer["source"]}
+    if description and AVAILABILITY_FIELD_RE.search(description) and offer["availability"]:
+        return {"value": offer["availability"], "normalized": None, "confidence": confidence, **extra}
+    normalized = parse_price(offer["price"])
+    if normalized is None:
+        return None
+    return {"value": str(offer["price"]).strip(), "normalized": normalized, "confidence": confidence, **extra}
@@ -0,0 +1,197 @@
+# backend/scrapper/visual_diff.py
+import io
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.utils import cpu_pool, metrics
+from backend.utils.env import (
+    VISUAL_DIFF_CACHE_MB,
+    VISUAL_DIFF_MAX_CHANGED_PIXELS,
+    VISUAL_DIFF_MAX_HASH_DISTANCE,
+    VISUAL_DIFF_MAX_REUSE,
+    VISUAL_DIFF_PIXEL_TOLERANCE,
+)
+
+try:
+    from PIL import Image
+except ImportError:  # gate stays off; every screenshot goes to Gemini as before
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Gate in front of the screenshot tier. The page's HTML can churn (ads,
+# timestamps, tracking ids) while the region the monitor reads looks exactly
+# the same; in that case the previous Gemini answer is still right.
+#
+# Two checks, both on the greyscale capture:
+#   1. a 64-bit DCT perceptual hash, a cheap coarse reject for layout changes
+#   2. a full-resolution pixel diff, which is what catches a single digit
+#      changing: the region only counts as unchanged when at most
+#      VISUAL_DIFF_MAX_CHANGED_PIXELS pixels moved by more than the tolerance
+#
+# The capture is whatever the render profile produced: the target element when
+# the monitor has a target_selector; otherwise, with the default profile, the
+# full page, whose height changes whenever content above the fold grows or
+# shrinks (the "viewport" profile gives a fixed-size capture). A capture of a
+# different size fails the shape check at once, so without a selector the gate
+# rarely fires and the savings come almost entirely from element captures.
+
+HASH_SIZE = 8
+SAMPLE_SIZE = 32
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m.astype(np.float32)
+
+
+_DCT = _dct_matrix(SAMPLE_SIZE)
+
+_lock = threading.Lock()
+_baselines = OrderedDict()  # monitor key -> baseline dict, least recently used first
+_baseline_bytes = 0
+
+
+def decode_grey(image_bytes):
+    """PNG/JPEG bytes -> 2-D uint8 array, or None when the bytes are not an image."""
+    if Image is None or not image_bytes:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            return np.asarray(img.convert("L"), dtype=np.uint8)
+    except Exception:
+        return None
+
+
+def _downsample(grey, size=SAMPLE_SIZE):
+    """Area-average to size x size (nearest sampling for tiny images)."""
+    h, w = grey.shape
+    if h < size or w < size:
+        rows = np.arange(size) * h // size
+        cols = np.arange(size) * w // size
+        return grey[rows][:, cols].astype(np.float32)
+    row_edges = np.arange(size) * h // size
+    col_edges = np.arange(size) * w // size
+    sums = np.add.reduceat(np.add.reduceat(grey, row_edges, axis=0, dtype=np.uint32), col_edges, axis=1)
+    counts = np.outer(np.diff(np.append(row_edges, h)), np.diff(np.append(col_edges, w)))
+    return (sums / counts).astype(np.float32)
+
+
+def phash(grey):
+    """64-bit DCT perceptual hash of a greyscale array, as an int."""
+    coeffs = (_DCT @ _downsample(grey) @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    # the DC term only tracks overall brightness; leave it out of the median
+    bits = coeffs > np.median(coeffs[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def changed_pixels(a, b, tolerance=VISUAL_DIFF_PIXEL_TOLERANCE):
+    """Number of pixels whose grey level moved by more than `tolerance`."""
+    # |a - b| without widening: max - min can't wrap around in uint8
+    diff = np.maximum(a, b) - np.minimum(a, b)
+    return int(np.count_nonzero(diff > tolerance))
+
+
+def fingerprint(image_bytes):
+    """(grey array, phash) for a capture, or None when it can't be decoded."""
+    grey = decode_grey(image_bytes)
+    if grey is None or grey.size == 0:
+        return None
+    return grey, phash(grey)
+
+
+def _unchanged(base, fp):
+    grey, h = fp
+    if base["grey"].shape != grey.shape:
+        return False
+    if hamming(base["hash"], h) > VISUAL_DIFF_MAX_HASH_DISTANCE:
+        return False
+    return changed_pixels(base["grey"], grey) <= VISUAL_DIFF_MAX_CHANGED_PIXELS
+
+
+def lookup(key, description, image_bytes):
+    """
+    Compare a fresh capture with the one stored for `key`. Returns
+    (extracted, fp): `extracted` is the previous answer when the region is
+    unchanged and may be reused, else None; pass `fp` to remember() after a
+    fresh extraction.
+    """
+    if VISUAL_DIFF_MAX_REUSE <= 0:
+        return None, None
+    fp = cpu_pool.run(fingerprint, image_bytes)
+    if fp is None:
+        metrics.inc("autoscout_visual_diff_total", outcome="undecodable")
+        return None, None
+    with _lock:
+        base = _baselines.get(key)
+        if base is not None:
+            _baselines.move_to_end(key)
+    if base is None or base["description"] != description:
+        metrics.inc("autoscout_visual_diff_total", outcome="no_baseline")
+        return None, fp
+    if not _unchanged(base, fp):
+        metrics.inc("autoscout_visual_diff_total", outcome="changed")
+        return None, fp
+    with _lock:
+        if base["reused"] >= VISUAL_DIFF_MAX_REUSE:
+            # re-read now and then so a change the gate can't see gets corrected
+            outcome = "refresh"
+        else:
+            base["reused"] += 1
+            outcome = "unchanged"
+    metrics.inc("autoscout_visual_diff_total", outcome=outcome)
+    if outcome == "refresh":
+        return None, fp
+    metrics.inc("autoscout_llm_calls_avoided_total", component="visual_diff")
+    logger.debug("capture for %s unchanged; reusing %r", key, base["extracted"].get("value"))
+    return dict(base["extracted"]), fp
+
+
+def remember(key, description, fp, extracted):
+    """Store the capture and its extraction as the baseline for `key`."""
+    global _baseline_bytes
+    if fp is None or not extracted or not extracted.get("value"):
+        return
+    grey, h = fp
+    limit = VISUAL_DIFF_CACHE_MB * 1024 * 1024
+    if grey.nbytes > limit:
+        return
+    with _lock:
+        old = _baselines.pop(key, None)
+        if old is not None:
+            _baseline_bytes -= old["grey"].nbytes
+        _baselines[key] = {"grey": grey, "hash": h, "description": description,
+                           "extracted": dict(extracted), "reused": 0}
+        _baseline_bytes += grey.nbytes
+        while _baseline_bytes > limit:
+            _, evicted = _baselines.popitem(last=False)
+            _baseline_bytes -= evicted["grey"].nbytes
+    metrics.set_gauge("autoscout_visual_diff_baseline_bytes", _baseline_bytes)
+
+
+def forget(key=None):
+    """Drop the baseline for `key`, or every baseline."""
+    global _baseline_bytes
+    with _lock:
+        if key is None:
+            _baselines.clear()
+            _baseline_bytes = 0
+        else:
+            old = _baselines.pop(key, None)
+            if old is not None:
+                _baseline_bytes -= old["grey"].nbytes
+
+
+metrics.describe("autoscout_visual_diff_total", "counter", "Screenshot visual diff gate decisions.")
+metrics.describe("autoscout_llm_calls_avoided_total", "counter", "Gemini calls skipped by a reuse gate.")
+metrics.describe("autoscout_visual_diff_baseline_bytes", "gauge", "Memory held by stored screenshot baselines.")
@@ -0,0 +1,11 @@
+# backend/tests/conftest.py
+import os
+import tempfile
+
+# set before any backend module reads its config: clients are never built, and
+# the SQLite-backed breaker store and LLM ledger live in a fresh directory
+os.environ.setdefault("GEMINI_API_KEY", "test-offline")
+os.environ.setdefault("SNS_TOPIC_ARN", "arn:aws:sns:us-east-1:000000000000:test")
+_state_dir = tempfile.mkdtemp(prefix="autoscout-tests-")
+os.environ["BREAKER_DB"] = os.path.join(_state_dir, "breakers.sqlite3")
+os.environ["LLM_BUDGET_DB"] = os.path.join(_state_dir, "llm_budget.sqlite3")
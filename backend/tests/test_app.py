@@ -0,0 +1,23 @@
+# backend/tests/test_app.py
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import app
+
+
+@pytest.fixture
+def client():
+    # no `with`: the lifespan (scheduler, broker, change feed) stays off
+    return TestClient(app)
+
+
+def test_queued_check_needs_a_monitor_id(client):
+    resp = client.post("/check_price", json={"wait": False, "url": "https://shop.example/item"})
+    assert resp.status_code == 400
+    assert "monitor_id" in resp.json()["detail"]
+
+
+def test_user_tier_cannot_be_patched(client):
+    resp = client.patch("/monitors/m1", json={"user_tier": "enterprise"})
+    assert resp.status_code == 400
+    assert "user_tier" not in resp.json()["detail"]
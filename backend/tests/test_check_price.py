@@ -0,0 +1,41 @@
+# backend/tests/test_check_price.py
+import pytest
+
+from backend.lambda_fns import check_price
+from backend.utils import llm_budget
+from backend.utils.llm_budget import BudgetExceeded
+
+
+@pytest.mark.parametrize("value, normalized, condition, expected", [
+    ("$255.00", 255, "less than $300", True),
+    ("$255", None, "price is above 300", False),
+    ("$1,200", None, "drops below 1,000", False),
+    ("12", None, "equal to 12", True),
+    ("5", None, "at least 5", True),
+    ("5", None, "no more than 4", False),
+    ("4.5 kg", None, "the value is under 5", True),
+    # not a number, or not a threshold: only the model can tell
+    ("In stock", None, "less than 5", None),
+    ("5", None, "in stock", None),
+    ("$255", None, "less than $300 or back in stock", None),
+])
+def test_evaluate_locally(value, normalized, condition, expected):
+    assert check_price.evaluate_locally(value, normalized, condition) is expected
+
+
+MONITOR = {"monitor_id": "m1", "user_id": "u1"}
+
+
+def test_economy_answers_thresholds_without_gemini(monkeypatch):
+    monkeypatch.setattr(llm_budget, "mode", lambda user_id=None: llm_budget.ECONOMY)
+    monkeypatch.setattr(llm_budget, "generate", lambda *a, **k: pytest.fail("Gemini called"))
+    assert check_price.condition_met(MONITOR, "$255", 255, "below 300") is True
+
+
+def test_no_budget_and_no_local_answer_is_not_met(monkeypatch):
+    def refuse(purpose, contents, user_id=None):
+        raise BudgetExceeded(purpose, llm_budget.MINIMAL)
+
+    monkeypatch.setattr(llm_budget, "mode", lambda user_id=None: llm_budget.MINIMAL)
+    monkeypatch.setattr(llm_budget, "generate", refuse)
+    assert check_price.condition_met(MONITOR, "In stock", None, "back in stock") is False
@@ -0,0 +1,148 @@
+# backend/tests/test_check_queue.py
+import pytest
+
+from backend.utils import check_queue
+from backend.utils.check_queue import CheckQueue
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_queue(cost=1.0):
+    """A queue without worker threads; every check takes `cost` seconds of the fake clock."""
+    clock = Clock()
+    ran = []
+
+    def runner(payload):
+        ran.append(payload["monitor_id"])
+        clock.now += cost
+        return {"value": payload.get("value")}
+
+    return CheckQueue(workers=0, runner=runner, clock=clock), clock, ran
+
+
+def check(monitor_id, user="alice", interval=60, **extra):
+    return dict(monitor_id=monitor_id, user_id=user, interval_seconds=interval, **extra)
+
+
+def drain(queue):
+    while len(queue):
+        queue._run(queue._pop())
+
+
+def test_light_user_is_not_starved_by_a_heavy_one():
+    queue, _, ran = make_queue()
+    for n in range(5):
+        queue.submit(check(f"a{n}", user="alice"), due=0)
+    queue.submit(check("b0", user="bob"), due=0)
+    drain(queue)
+    # alice's first check ran first; her used worker time puts bob ahead of the rest
+    assert ran[:2] == ["a0", "b0"]
+    assert sorted(ran) == ["a0", "a1", "a2", "a3", "a4", "b0"]
+
+
+def test_tier_weight_scales_the_fair_share(monkeypatch):
+    monkeypatch.setattr(check_queue, "_WEIGHTS", {"pro": 4.0})
+    queue, _, ran = make_queue()
+    for n in range(4):
+        queue.submit(check(f"p{n}", user="pro-user", user_tier="pro"), due=0)
+        queue.submit(check(f"f{n}", user="free-user"), due=0)
+    drain(queue)
+    # a check costs the pro user a quarter of what it costs the free user
+    assert ran[:5] == ["p0", "f0", "p1", "p2", "p3"]
+
+
+def test_repeat_submissions_coalesce():
+    queue, _, _ = make_queue()
+    assert queue.submit(check("m1"), due=0)
+    assert not queue.submit(check("m1"), due=0)
+    assert len(queue) == 1
+
+
+def test_earlier_deadline_runs_first():
+    queue, _, ran = make_queue()
+    queue.submit(check("hourly", interval=3600), due=0)
+    queue.submit(check("minutely", interval=60), due=0)
+    drain(queue)
+    assert ran == ["minutely", "hourly"]
+
+
+def test_close_to_threshold_moves_a_check_forward():
+    queue, _, ran = make_queue(cost=0)
+    queue.submit(check("near", condition="price below 200", value=201), due=0)
+    queue.submit(check("far", condition="price below 200", value=500), due=0)
+    drain(queue)
+    queue.submit(check("far", condition="price below 200"), due=0)
+    queue.submit(check("near", condition="price below 200"), due=0)
+    ran.clear()
+    drain(queue)
+    assert ran == ["near", "far"]
+
+
+def test_bulk_checks_are_shed_past_max_depth(monkeypatch):
+    monkeypatch.setattr(check_queue, "CHECK_QUEUE_SOFT_LIMIT", 2)
+    monkeypatch.setattr(check_queue, "CHECK_QUEUE_MAX_DEPTH", 3)
+    monkeypatch.setattr(check_queue, "CHECK_QUEUE_HARD_LIMIT", 4)
+    queue, _, _ = make_queue()
+    for n in range(3):
+        assert queue.submit(check(f"rt{n}"), due=0)
+    assert not queue.submit(check("bulk", interval=7200), due=0)
+    # other classes keep going until the hard limit
+    assert queue.submit(check("rt3"), due=0)
+    assert not queue.submit(check("rt4"), due=0)
+    assert len(queue) == 4
+
+
+def test_bulk_checks_are_deferred_under_overload(monkeypatch):
+    monkeypatch.setattr(check_queue, "CHECK_QUEUE_SOFT_LIMIT", 2)
+    queue, _, ran = make_queue(cost=0)
+    queue.submit(check("bulk", interval=7200), due=0)
+    queue.submit(check("rt0", interval=60), due=100)
+    queue.submit(check("rt1", interval=60), due=200)
+    queue._run(queue._pop())
+    # bulk's deadline is earlier, but it waits while the queue is over the soft limit
+    assert ran == ["rt0"]
+
+
+def test_stale_check_is_dropped_under_overload():
+    queue, clock, ran = make_queue()
+    queue.submit(check("m1", interval=60), due=0)
+    clock.now = 61
+    queue._run(queue._pop(), overloaded=True)
+    assert ran == []
+
+
+def test_forget_drops_pending_check_and_bookkeeping():
+    queue, _, ran = make_queue()
+    queue.submit(check("m1", value=10), due=0)
+    drain(queue)
+    queue.submit(check("m1"), due=0)
+    queue.submit(check("m2"), due=0)
+    assert queue.forget("m1")
+    assert "m1" not in queue._admitted and "m1" not in queue._last_value
+    ran.clear()
+    drain(queue)
+    assert ran == ["m2"]
+    assert not queue.forget("m1")
+
+
+def test_idle_monitors_and_users_are_pruned():
+    queue, clock, _ = make_queue()
+    queue.submit(check("m1", user="alice", interval=60, value=5), due=0)
+    drain(queue)
+    assert "m1" in queue._admitted and "alice" in queue._vtime
+    clock.now += 60 * check_queue.IDLE_INTERVALS + check_queue.PRUNE_EVERY + 1
+    queue.submit(check("m2", user="bob"), due=clock.now)
+    assert "m1" not in queue._admitted and "m1" not in queue._last_value
+    # alice has no pending work and no debt above bob's
+    assert "alice" not in queue._vtime
+
+
+@pytest.mark.parametrize("interval, klass", [(60, "realtime"), (600, "standard"), (3600, "bulk")])
+def test_priority_class(interval, klass):
+    assert check_queue.priority_class(interval) == klass
@@ -0,0 +1,145 @@
+# backend/tests/test_circuit_breaker.py
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.scrapper import circuit_breaker
+from backend.scrapper.antibot import TargetBlocked
+from backend.scrapper.circuit_breaker import CircuitOpen
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(
+        time=lambda: clock.now, strftime=time.strftime, localtime=time.localtime,
+    ))
+    monkeypatch.setattr(circuit_breaker, "BREAKER_URL_FAILURES", 2)
+    monkeypatch.setattr(circuit_breaker, "BREAKER_DOMAIN_FAILURES", 3)
+    monkeypatch.setattr(circuit_breaker, "BREAKER_BASE_BACKOFF", 60)
+    circuit_breaker.reset()
+    yield clock
+    circuit_breaker.reset()
+
+
+def row(key):
+    return next((r for r in circuit_breaker.snapshot() if r["key"] == key), None)
+
+
+URL = "https://shop.example/item/1"
+
+
+def test_transient_failure_below_threshold_is_not_cached(clock):
+    circuit_breaker.record_failure(URL, "http_5xx", 503)
+    circuit_breaker.check(URL)
+    assert not row(f"url:{URL}")["negative_cached"]
+
+
+def test_url_opens_at_threshold(clock):
+    circuit_breaker.record_failure(URL, "http_5xx", 503)
+    circuit_breaker.record_failure(URL, "http_5xx", 503)
+    with pytest.raises(CircuitOpen):
+        circuit_breaker.check(URL)
+    assert row(f"url:{URL}")["state"] == "open"
+
+
+@pytest.mark.parametrize("reason", ["not_found", "gone", "too_large"])
+def test_definitive_failure_is_cached_at_once(clock, reason):
+    circuit_breaker.record_failure(URL, reason)
+    with pytest.raises(CircuitOpen) as info:
+        circuit_breaker.check(URL)
+    assert info.value.reason == reason
+    assert row(f"url:{URL}")["state"] == "closed"
+
+
+def test_domain_opens_on_site_wide_failures(clock):
+    for n in range(3):
+        circuit_breaker.record_failure(f"https://shop.example/item/{n}", "timeout")
+    with pytest.raises(CircuitOpen) as info:
+        circuit_breaker.check("https://shop.example/other")
+    assert info.value.key == "domain:shop.example"
+    # a page-level failure doesn't count against the domain
+    circuit_breaker.record_failure("https://else.example/a", "not_found", 404)
+    assert row("domain:else.example") is None
+
+
+def open_url(clock):
+    circuit_breaker.record_failure(URL, "http_5xx", 503)
+    circuit_breaker.record_failure(URL, "http_5xx", 503)
+    clock.now += 200  # past the backoff and the negative cache
+
+
+def test_half_open_admits_one_probe(clock):
+    open_url(clock)
+    circuit_breaker.check(URL)
+    with pytest.raises(CircuitOpen) as info:
+        circuit_breaker.check(URL)
+    assert info.value.reason == "probe in flight"
+    circuit_breaker.record_success(URL)
+    circuit_breaker.check(URL)
+    assert row(f"url:{URL}") is None
+
+
+def test_failed_probe_reopens_with_longer_backoff(clock):
+    open_url(clock)
+    circuit_breaker.check(URL)
+    circuit_breaker.record_failure(URL, "http_5xx", 503)
+    state = row(f"url:{URL}")
+    assert state["state"] == "open" and state["opens"] == 2
+    assert state["open_until"] - clock.now >= 0.9 * 120
+
+
+def test_release_hands_the_probe_back(clock):
+    open_url(clock)
+    circuit_breaker.check(URL)
+    circuit_breaker.release(URL)
+    circuit_breaker.check(URL)
+
+
+def test_domain_probe_released_by_page_level_failure(clock):
+    for n in range(3):
+        circuit_breaker.record_failure(f"https://shop.example/item/{n}", "timeout")
+    clock.now += 200
+    circuit_breaker.check("https://shop.example/a")
+    circuit_breaker.record_failure("https://shop.example/a", "not_found", 404)
+    assert row("domain:shop.example")["probe_until"] == 0
+    circuit_breaker.check("https://shop.example/b")
+
+
+def test_url_probe_released_when_domain_probe_in_flight(clock):
+    for n in range(3):
+        circuit_breaker.record_failure(f"https://shop.example/item/{n}", "timeout")
+    circuit_breaker.record_failure(URL, "http_4xx", 400)
+    circuit_breaker.record_failure(URL, "http_4xx", 400)
+    clock.now += 1000
+    circuit_breaker.check("https://shop.example/other")  # holds the domain probe
+    with pytest.raises(CircuitOpen):
+        circuit_breaker.check(URL)
+    assert row(f"url:{URL}")["probe_until"] == 0
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(status)
+        self.response = SimpleNamespace(status_code=status)
+
+
+class ReadTimeout(Exception):
+    pass
+
+
+@pytest.mark.parametrize("exc, reason", [
+    (HTTPError(404), "not_found"),
+    (HTTPError(410), "gone"),
+    (HTTPError(429), "rate_limited"),
+    (HTTPError(403), "blocked"),
+    (HTTPError(502), "http_5xx"),
+    (ReadTimeout(), "timeout"),
+    (ConnectionResetError(), "network"),
+    (TargetBlocked("captcha", 200), "blocked"),
+    (TargetBlocked("rate_limited", 429), "rate_limited"),
+    (ValueError("our bug"), None),
+])
+def test_classify(exc, reason):
+    assert circuit_breaker.classify(exc)[0] == reason
@@ -0,0 +1,82 @@
+# backend/tests/test_cpu_pool.py
+import os
+import time
+
+import pytest
+
+from backend.utils import cpu_pool
+
+PAGE = "<p>" + "é" * (cpu_pool.SHARED_MEMORY_MIN_BYTES) + "</p>"
+
+
+def describe(data):
+    return type(data).__name__, len(data)
+
+
+def reject(data):
+    raise OSError("cannot identify image file")  # like PIL's UnidentifiedImageError
+
+
+def die(data):
+    os._exit(1)  # like lxml segfaulting or the OOM killer
+
+
+def slow(data, seconds):
+    time.sleep(seconds)
+    return len(data)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(cpu_pool, "CPU_WORKERS", 1)
+    monkeypatch.setattr(cpu_pool, "_unavailable", False)
+    cpu_pool.shutdown_cpu_pool()
+    yield
+    cpu_pool.shutdown_cpu_pool()
+
+
+def test_text_and_bytes_cross_shared_memory(pool):
+    assert cpu_pool.run(describe, PAGE, min_bytes=0) == ("str", len(PAGE))
+    raw = PAGE.encode("utf-8")
+    assert cpu_pool.run(describe, raw, min_bytes=0) == ("memoryview", len(raw))
+    assert cpu_pool.run(describe, b"small", min_bytes=0) == ("bytes", 5)
+
+
+def test_task_exception_propagates_without_rerunning_inline(pool, monkeypatch):
+    inline = []
+    monkeypatch.setattr(cpu_pool, "_inline", lambda *a: inline.append(a))
+    with pytest.raises(OSError, match="cannot identify"):
+        cpu_pool.run(reject, b"x" * 1024, min_bytes=0)
+    assert inline == []
+    assert cpu_pool._pool is not None  # the pool is fine
+
+
+def test_timeout_fails_the_task_and_recycles_the_pool(pool, monkeypatch):
+    monkeypatch.setattr(cpu_pool, "CPU_TASK_TIMEOUT", 1.0)
+    assert cpu_pool.run(slow, b"x" * 1024, 0.0, min_bytes=0) == 1024  # started and warm
+    stuck = cpu_pool._pool
+    workers = list(stuck._processes.values())
+    inline = []
+    monkeypatch.setattr(cpu_pool, "_inline", lambda *a: inline.append(a))
+    with pytest.raises(cpu_pool.TaskFailed) as failed:
+        cpu_pool.run(slow, b"x" * 1024, 60, min_bytes=0)
+    assert failed.value.reason == "timeout"
+    assert inline == []  # never re-run on the caller's thread
+    for process in workers:
+        process.join(5)
+        assert not process.is_alive()
+    # the next task gets a fresh pool
+    monkeypatch.undo()
+    monkeypatch.setattr(cpu_pool, "CPU_WORKERS", 1)
+    assert cpu_pool.run(slow, b"x" * 1024, 0.0, min_bytes=0) == 1024
+    assert cpu_pool._pool is not stuck
+
+
+def test_worker_death_fails_the_task(pool, monkeypatch):
+    inline = []
+    monkeypatch.setattr(cpu_pool, "_inline", lambda *a: inline.append(a))
+    with pytest.raises(cpu_pool.TaskFailed) as failed:
+        cpu_pool.run(die, b"x" * 1024, min_bytes=0)
+    assert failed.value.reason == "worker_died"
+    assert inline == []
+    assert cpu_pool._pool is None  # restarted on the next task
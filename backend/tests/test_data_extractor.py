@@ -0,0 +1,102 @@
+# backend/tests/test_data_extractor.py
+import threading
+import time
+
+import pytest
+
+from backend.agents import data_extractor, local_ocr
+
+SURE = {"value": "$10.00", "normalized": 10.0, "confidence": 0.95, "source": "ocr"}
+UNSURE = {"value": "$12.00", "normalized": 12.0, "confidence": 0.4, "source": "ocr"}
+GEMINI = {"value": "$10.00"}
+
+
+class Reader:
+    """Answers after `delay` seconds (or raises `answer` if it is an exception), counting calls."""
+
+    def __init__(self, answer, delay=0.0):
+        self.answer = answer
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, image_bytes, description, user_id=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+@pytest.fixture
+def hedge(monkeypatch):
+    monkeypatch.setattr(local_ocr, "hedge_delay", lambda: 0.1)
+    monkeypatch.setattr(local_ocr, "LOCAL_OCR_MIN_CONFIDENCE", 0.75)
+    monkeypatch.setattr(data_extractor, "LOCAL_OCR_TIMEOUT", 0.5)
+
+    def run(ocr, gemini):
+        monkeypatch.setattr(local_ocr, "extract", ocr)
+        monkeypatch.setattr(data_extractor, "_gemini_image", gemini)
+        start = time.monotonic()
+        result = data_extractor._hedged(b"png", "price", "u1")
+        return result, time.monotonic() - start
+
+    return run
+
+
+def test_confident_ocr_within_its_head_start_skips_gemini(hedge):
+    gemini = Reader(GEMINI)
+    result, _ = hedge(Reader(SURE, 0.02), gemini)
+    assert result is SURE
+    assert gemini.calls == 0
+
+
+def test_unsure_ocr_asks_gemini_at_once(hedge):
+    result, elapsed = hedge(Reader(UNSURE), Reader(GEMINI, 0.02))
+    assert result is GEMINI
+    assert elapsed < 0.1  # didn't sit out the head start
+
+
+def test_slow_ocr_is_hedged_and_the_first_sure_answer_wins(hedge):
+    gemini = Reader(GEMINI, 0.5)
+    result, elapsed = hedge(Reader(SURE, 0.2), gemini)
+    assert result is SURE and gemini.calls == 1
+    assert elapsed < 0.4  # didn't wait for the loser
+
+    result, _ = hedge(Reader(SURE, 0.4), Reader(GEMINI, 0.05))
+    assert result is GEMINI
+
+
+def test_gemini_failure_falls_back_to_the_ocr_guess(hedge):
+    result, _ = hedge(Reader(UNSURE), Reader(RuntimeError("quota")))
+    assert result is UNSURE
+
+
+def test_gives_up_after_the_timeout(hedge):
+    result, elapsed = hedge(Reader(UNSURE), Reader(GEMINI, 2.0))
+    assert result is UNSURE
+    assert elapsed < 1.0  # head start + LOCAL_OCR_TIMEOUT, not Gemini's 2s
+
+    result, _ = hedge(Reader(RuntimeError("tesseract")), Reader(GEMINI, 2.0))
+    assert result == {"value": None}
+
+
+def test_hedge_pool_is_created_once(monkeypatch):
+    def slow_executor(**kwargs):
+        time.sleep(0.01)  # widen the window a second creator would fall into
+        return object()
+
+    monkeypatch.setattr(data_extractor, "_hedge_pool", None)
+    monkeypatch.setattr(data_extractor, "ThreadPoolExecutor", slow_executor)
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def first_call():
+        barrier.wait()
+        pools.append(data_extractor._pool())
+
+    threads = [threading.Thread(target=first_call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(p) for p in pools}) == 1
@@ -0,0 +1,33 @@
+# backend/tests/test_dom_diff.py
+import pytest
+
+from backend.scrapper import dom_diff
+
+
+@pytest.mark.parametrize("condition", [
+    "any change",
+    "notify me of any changes",
+    "any update to the page",
+    "any change on the site",
+    "when the page has changed",
+    "if anything changes",
+    "alert me when the listing is updated",
+    "changed",
+    "on update",
+])
+def test_page_level_conditions(condition):
+    assert dom_diff.is_any_change(condition)
+
+
+@pytest.mark.parametrize("condition", [
+    "notify when price has changed",
+    "alert me if stock is updated",
+    "any change in price",
+    "any change to the rating",
+    "any price change",
+    "price below 200",
+    "",
+    None,
+])
+def test_field_conditions_take_the_value_path(condition):
+    assert not dom_diff.is_any_change(condition)
@@ -0,0 +1,159 @@
+# backend/tests/test_dynamo_client.py
+import base64
+import json
+from decimal import Decimal
+
+import pytest
+
+from backend.bench.fakes import InMemoryTable
+from backend.db import dynamo_client, monitor_cache
+from backend.db.dynamo_client import decode_cursor, encode_cursor, list_monitors
+from backend.utils import clients
+
+
+@pytest.fixture
+def table():
+    table = InMemoryTable()
+    clients.override("dynamo_table", table)
+    monitor_cache.invalidate()
+    yield table
+    clients.reset()
+    monitor_cache.invalidate()
+
+
+def create(n, user_id=None, interval=None):
+    return dynamo_client.create_monitor_item(
+        f"https://shop.example/{n}", "price", interval or 60 + n, "below 10", monitor_id=f"m{n:03d}", user_id=user_id,
+    )
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def pages(**kwargs):
+    cursor, out = None, []
+    while True:
+        items, cursor = list_monitors(cursor=cursor, **kwargs)
+        out.append([i["monitor_id"] for i in items])
+        if not cursor:
+            return out
+
+
+def test_cursor_round_trip():
+    key = {"monitor_id": "m1", "user_id": "u1", "created_at": Decimal("1700000000")}
+    cursor = encode_cursor(key)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == {"monitor_id": "m1", "user_id": "u1", "created_at": 1700000000}
+    assert encode_cursor(None) is None
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", raw_cursor([1, 2]), raw_cursor("x"), "e30"[:2]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_status_listing_merges_shards_in_due_order(table):
+    for n in range(23):
+        create(n)
+    seen = pages(limit=5)
+    assert all(len(page) <= 5 for page in seen)
+    ids = [m for page in seen for m in page]
+    # every monitor once, soonest due first across pages
+    assert sorted(ids) == [f"m{n:03d}" for n in range(23)]
+    assert ids == [f"m{n:03d}" for n in range(23)]
+    assert len({i["status_shard"] for i in table.items.values()}) > 1
+
+
+def test_user_listing_pages_newest_first(table):
+    for n in range(7):
+        create(n, user_id="u1")
+    create(99, user_id="u2")
+    ids = [m for page in pages(user_id="u1", limit=3) for m in page]
+    assert len(ids) == 7 and "m099" not in ids
+
+
+def test_monitor_without_owner_stays_out_of_user_index(table):
+    item = create(1)
+    assert "user_id" not in item
+    assert list_monitors(user_id="anonymous")[0] == []
+    assert [i["monitor_id"] for i in list_monitors()[0]] == ["m001"]
+
+
+def test_cursor_from_another_user_is_rejected(table):
+    for n in range(3):
+        create(n, user_id="u1")
+    _, cursor = list_monitors(user_id="u1", limit=1)
+    key = decode_cursor(cursor)
+    with pytest.raises(ValueError):
+        list_monitors(user_id="u2", cursor=cursor)
+    with pytest.raises(ValueError):
+        list_monitors(user_id="u1", cursor=encode_cursor(dict(key, extra="x")))
+    # a status listing cursor doesn't fit a user listing, nor the reverse
+    _, status_cursor = list_monitors(limit=1)
+    with pytest.raises(ValueError):
+        list_monitors(user_id="u1", cursor=status_cursor)
+    with pytest.raises(ValueError):
+        list_monitors(cursor=cursor)
+
+
+def test_tampered_shard_cursor_is_rejected(table):
+    for n in range(40):
+        create(n)
+    _, cursor = list_monitors(limit=10)
+    shards = decode_cursor(cursor)["shards"]
+    n, key = next((n, k) for n, k in shards.items() if k)
+    with pytest.raises(ValueError):
+        list_monitors(cursor=encode_cursor({"shards": {n: dict(key, status_shard="paused#" + n)}}))
+    with pytest.raises(ValueError):
+        list_monitors(cursor=encode_cursor({"shards": {"999": None}}))
+    with pytest.raises(ValueError):
+        list_monitors(status="paused", cursor=cursor)
+
+
+def test_patching_interval_moves_next_run_at(table):
+    item = create(1, interval=3600)
+    updated = dynamo_client.update_monitor("m001", {"interval_seconds": 60})
+    assert updated["next_run_at"] < item["next_run_at"]
+    assert updated["next_run_at"] - updated["interval_seconds"] <= item["created_at"] + 5
+
+
+def test_price_update_on_deleted_monitor_is_dropped(table):
+    create(1)
+    assert dynamo_client.update_monitor_price("m001", "$9", interval_seconds=60)
+    dynamo_client.delete_monitor("m001")
+    assert not dynamo_client.update_monitor_price("m001", "$8", interval_seconds=60)
+    assert table.items == {}
+
+
+def test_pause_moves_monitor_between_status_shards(table):
+    create(1)
+    dynamo_client.set_monitor_status("m001", "paused")
+    assert list_monitors()[0] == []
+    assert [i["status"] for i in list_monitors(status="paused")[0]] == ["paused"]
+
+
+def test_backfill_brings_legacy_items_into_listings(table):
+    table.put_item(Item={"monitor_id": "old", "url": "https://shop.example/old", "description": "price",
+                         "interval_seconds": 600, "created_at": 1600000000, "last_checked": None})
+    create(1)
+    assert [i["monitor_id"] for i in list_monitors()[0]] == ["m001"]
+    assert dynamo_client.backfill_index_keys(dry_run=True) == 1
+    assert dynamo_client.backfill_index_keys() == 1
+    assert dynamo_client.backfill_index_keys() == 0
+    assert {i["monitor_id"] for i in list_monitors()[0]} == {"old", "m001"}
+
+
+def test_dom_fingerprint_stays_out_of_the_monitor_cache(table):
+    create(1)
+    fingerprint = "A" * 50000
+    assert dynamo_client.update_monitor_price("m001", "no change", 1.0, dom_fingerprint=fingerprint)
+    assert table.items["m001"]["dom_fingerprint"] == fingerprint
+    # a miss loads the full item, but only the small attributes are kept
+    monitor_cache.invalidate()
+    assert "dom_fingerprint" in dynamo_client.get_monitor_by_id("m001")
+    cached = dynamo_client.get_monitor_by_id("m001")
+    assert "dom_fingerprint" not in cached and cached["last_price"] == "no change"
+    assert dynamo_client.get_dom_fingerprint("m001") == fingerprint
+    assert dynamo_client.get_dom_fingerprint("missing") is None
@@ -0,0 +1,134 @@
+# backend/tests/test_fetch_tiers.py
+import pytest
+
+from backend.scrapper import circuit_breaker, fetch_tiers
+from backend.scrapper.antibot import TargetBlocked
+from backend.utils import cpu_pool, llm_budget, pubsub
+
+URL = "https://shop.example/item/1"
+HIT = {"value": "$10", "normalized": 10, "confidence": 0.9}
+
+
+class Tiers:
+    """Stands in for _run_tier: per tier, a result (or exception) to give back; records the tiers run."""
+
+    def __init__(self, **answers):
+        self.answers = answers
+        self.runs = []
+
+    def __call__(self, tier, url, description, render=None, key=None, user_id=None, budget=None):
+        self.runs.append(tier)
+        answer = self.answers.get(tier)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class Breaker:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda url, *args: self.calls.append((name,) + args)
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = Breaker()
+    for name in ("check", "record_success", "record_failure", "release"):
+        monkeypatch.setattr(circuit_breaker, name, getattr(breaker, name))
+    monkeypatch.setattr(llm_budget, "mode", lambda user_id=None: llm_budget.NORMAL)
+    fetch_tiers._monitor_tiers.clear()
+    fetch_tiers._domain_tiers.clear()
+    yield breaker
+    fetch_tiers._monitor_tiers.clear()
+    fetch_tiers._domain_tiers.clear()
+
+
+def check(monkeypatch, tiers, monitor_id="m1", url=URL, description="price of the item", persisted=None):
+    monkeypatch.setattr(fetch_tiers, "_run_tier", tiers)
+    tiers.runs = []
+    return fetch_tiers.fetch_and_extract(url, description, monitor_id=monitor_id, persisted_tier=persisted)
+
+
+def test_escalates_until_a_tier_answers_and_learns_it(breaker, monkeypatch):
+    tiers = Tiers(http=None, dom=HIT)
+    assert check(monkeypatch, tiers) == (HIT, "dom")
+    assert tiers.runs == ["http", "dom"]
+    assert breaker.calls[-1] == ("record_success",)
+    # the monitor, and any other monitor on the domain, start at dom now
+    check(monkeypatch, tiers)
+    assert tiers.runs == ["dom"]
+    check(monkeypatch, tiers, monitor_id="m2", url="https://shop.example/item/2")
+    assert tiers.runs == ["dom"]
+
+
+def test_low_confidence_answer_escalates(breaker, monkeypatch):
+    tiers = Tiers(http=dict(HIT, confidence=0.3), dom=None, screenshot=HIT)
+    assert check(monkeypatch, tiers) == (HIT, "screenshot")
+    assert tiers.runs == ["http", "dom", "screenshot"]
+
+
+def test_persisted_tier_seeds_a_cold_monitor(breaker, monkeypatch):
+    tiers = Tiers(screenshot=HIT)
+    assert check(monkeypatch, tiers, persisted="screenshot") == (HIT, "screenshot")
+    assert tiers.runs == ["screenshot"]
+
+
+def test_cheaper_tier_is_probed_every_n_checks(breaker, monkeypatch):
+    monkeypatch.setattr(fetch_tiers, "PROBE_CHEAPER_EVERY", 3)
+    tiers = Tiers(dom=HIT)
+    plans = []
+    for _ in range(6):
+        check(monkeypatch, tiers, persisted="dom")
+        plans.append(tiers.runs)
+    assert plans == [["dom"], ["dom"], ["http", "dom"], ["dom"], ["dom"], ["http", "dom"]]
+    # the site started shipping structured data: the probe moves the monitor back
+    tiers.answers["http"] = HIT
+    for _ in range(3):
+        check(monkeypatch, tiers)
+    assert tiers.runs == ["http"]
+    assert fetch_tiers._monitor_tiers["m1"][0] == 0
+
+
+def test_non_offer_fields_go_straight_to_the_screenshot(breaker, monkeypatch):
+    tiers = Tiers(screenshot=HIT)
+    assert check(monkeypatch, tiers, description="top headline") == (HIT, "screenshot")
+    assert tiers.runs == ["screenshot"]
+    assert fetch_tiers._domain_tiers == {}
+
+
+def test_failing_target_stops_without_costlier_tiers(breaker, monkeypatch):
+    tiers = Tiers(http=TargetBlocked("rate_limited", 429), dom=HIT)
+    assert check(monkeypatch, tiers) == (None, None)
+    assert tiers.runs == ["http"]
+    assert breaker.calls[-1] == ("record_failure", "rate_limited", 429)
+
+
+def test_bot_wall_escalates_to_a_real_browser(breaker, monkeypatch):
+    tiers = Tiers(http=TargetBlocked("challenge", 403), dom=HIT)
+    assert check(monkeypatch, tiers) == (HIT, "dom")
+    assert ("record_failure", "blocked", 403) not in breaker.calls
+
+
+def test_own_failures_release_the_breaker(breaker, monkeypatch):
+    tiers = Tiers(http=ValueError("bug"), dom=RuntimeError("no chrome"), screenshot=KeyError("x"))
+    assert check(monkeypatch, tiers) == (None, None)
+    assert tiers.runs == ["http", "dom", "screenshot"]
+    assert breaker.calls[-1] == ("release",)
+    assert not any(call[0] == "record_failure" for call in breaker.calls)
+
+
+def test_page_that_breaks_the_parser_stops_the_check(breaker, monkeypatch):
+    tiers = Tiers(http=cpu_pool.TaskFailed("extract_structured", "timeout"), dom=HIT)
+    assert check(monkeypatch, tiers) == (None, None)
+    assert tiers.runs == ["http"]
+    assert breaker.calls[-1] == ("release",)
+
+
+def test_deleted_monitor_is_forgotten(breaker, monkeypatch):
+    check(monkeypatch, Tiers(http=HIT))
+    assert "m1" in fetch_tiers._monitor_tiers
+    pubsub.publish(pubsub.MONITORS, {"type": "delete", "monitor_id": "m1"})
+    assert "m1" not in fetch_tiers._monitor_tiers
+    assert fetch_tiers._domain_tiers == {"shop.example": 0}
@@ -0,0 +1,166 @@
+# backend/tests/test_http_client.py
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from backend.scrapper import http_client
+from backend.scrapper.http_client import DNSCache, ResponseTooLarge
+
+PAGE = b"<html><body>" + b"x" * 50000 + b"</body></html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.path == "/chunked":
+            # no content-length: only the streaming read can stop it
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(PAGE), 8192):
+                chunk = PAGE[start:start + 8192]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # the client hanging up on an oversized body
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    # "localhost", so connections go through the DNS cache
+    yield f"http://localhost:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture(params=["httpx", "requests"])
+def backend(request, monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_CLIENT", request.param)
+    monkeypatch.setattr(http_client, "_dns", DNSCache(300, 16))
+    http_client.close()
+    yield request.param
+    http_client.close()
+
+
+def test_fetch_resolves_through_the_dns_cache(server, backend):
+    status, headers, body = http_client.fetch(server + "/page")
+    assert status == 200 and body == PAGE
+    assert http_client._backend == backend
+    assert len(http_client._dns) == 1  # "localhost", cached by the scraper's own transport
+
+
+@pytest.mark.parametrize("path", ["/page", "/chunked"])
+def test_body_over_the_limit_is_refused(server, backend, path):
+    with pytest.raises(ResponseTooLarge):
+        http_client.fetch(server + path, max_bytes=len(PAGE) // 2)
+    assert http_client.fetch(server + path, max_bytes=len(PAGE))[2] == PAGE
+
+
+def test_read_limited():
+    assert http_client._read_limited([b"ab", b"cd"], 4, "u") == b"abcd"
+    with pytest.raises(ResponseTooLarge):
+        http_client._read_limited(iter([b"ab", b"cd", b"e"]), 4, "u")
+
+
+def test_httpx_transport_still_has_the_network_backend_we_wrap():
+    # _cache_httpx_dns relies on httpcore's private ConnectionPool._network_backend
+    import httpx
+
+    transport = httpx.HTTPTransport()
+    http_client._cache_httpx_dns(transport)
+    assert isinstance(transport._pool._network_backend, http_client._CachingNetworkBackend)
+    transport.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(http_client, "time", SimpleNamespace(monotonic=lambda: clock.now, perf_counter=time.perf_counter))
+    return clock
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+    ttls = {}
+
+    def lookup(host, port):
+        calls.append(host)
+        return [f"10.0.0.{len(calls)}"], ttls.get(host, 60)
+
+    monkeypatch.setattr(http_client, "_lookup", lookup)
+    return SimpleNamespace(calls=calls, ttls=ttls)
+
+
+def test_dns_entries_live_for_the_record_ttl_capped(clock, lookups):
+    cache = DNSCache(max_ttl=120, size=8)
+    lookups.ttls.update({"short.example": 10, "long.example": 86400})
+    first = cache.resolve("short.example", 443)
+    clock.now += 9
+    assert cache.resolve("short.example", 443) == first
+    clock.now += 2
+    assert cache.resolve("short.example", 443) != first
+    cache.resolve("long.example", 443)
+    clock.now += 121  # the cap, not the record's day
+    cache.resolve("long.example", 443)
+    assert lookups.calls == ["short.example", "short.example", "long.example", "long.example"]
+
+
+def test_dns_zero_ttl_and_ip_literals_are_not_cached(clock, lookups):
+    cache = DNSCache(max_ttl=120, size=8)
+    lookups.ttls["volatile.example"] = 0
+    cache.resolve("volatile.example", 80)
+    cache.resolve("volatile.example", 80)
+    assert cache.resolve("192.0.2.7", 80) == ["192.0.2.7"]
+    assert cache.resolve("2001:db8::1", 80) == ["2001:db8::1"]
+    assert lookups.calls == ["volatile.example", "volatile.example"] and len(cache) == 0
+
+
+def test_dns_cache_drops_the_least_recently_used_host(clock, lookups):
+    cache = DNSCache(max_ttl=120, size=2)
+    cache.resolve("a.example", 80)
+    cache.resolve("b.example", 80)
+    cache.resolve("a.example", 80)  # a is now the most recent
+    cache.resolve("c.example", 80)
+    assert list(cache._entries) == ["a.example", "c.example"]
+
+
+def test_host_is_forgotten_when_every_address_fails(monkeypatch, clock, lookups):
+    cache = DNSCache(max_ttl=120, size=8)
+    monkeypatch.setattr(http_client, "_dns", cache)
+    cache._entries["shop.example"] = (clock.now + 60, ["10.0.0.1", "10.0.0.2"])
+
+    def refuse_first(address):
+        if address == "10.0.0.1":
+            raise ConnectionRefusedError(address)
+        return address
+
+    assert http_client._connect_first("shop.example", ["10.0.0.1", "10.0.0.2"], refuse_first) == "10.0.0.2"
+    assert "shop.example" in cache._entries  # one good address is enough
+
+    def refuse(address):
+        raise socket.timeout(address)
+
+    with pytest.raises(socket.timeout):
+        http_client._connect_first("shop.example", ["10.0.0.1", "10.0.0.2"], refuse)
+    assert "shop.example" not in cache._entries
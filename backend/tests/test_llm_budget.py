@@ -0,0 +1,125 @@
+# backend/tests/test_llm_budget.py
+from types import SimpleNamespace
+
+import pytest
+
+from backend.utils import clients, llm_budget
+from backend.utils.llm_budget import BudgetExceeded
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+class FakeModels:
+    def __init__(self):
+        self.fail = None
+        self.calls = 0
+
+    def generate_content(self, model, contents):
+        self.calls += 1
+        if self.fail:
+            raise self.fail
+        return SimpleNamespace(text="ok", usage_metadata=None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # start of a minute bucket, so the sliding minute counts every request in full
+    clock = SimpleNamespace(now=1_000_020.0 - 1_000_020.0 % 60)
+    monkeypatch.setattr(llm_budget, "time", SimpleNamespace(time=lambda: clock.now))
+    monkeypatch.setattr(llm_budget, "LLM_BUDGET_REFRESH_SECONDS", 0)
+    monkeypatch.setattr(llm_budget, "LLM_GLOBAL_RPM", 10)
+    monkeypatch.setattr(llm_budget, "LLM_USER_DAILY_REQUESTS", 10)
+    monkeypatch.setattr(llm_budget, "LLM_ECONOMY_AT", 0.8)
+    monkeypatch.setattr(llm_budget, "LLM_MINIMAL_AT", 0.95)
+    monkeypatch.setattr(llm_budget, "LLM_QUOTA_BACKOFF", 60)
+    monkeypatch.setattr(llm_budget, "LLM_QUOTA_MAX_BACKOFF", 3600)
+    llm_budget.reset(usage=True)
+    yield clock
+    llm_budget.reset(usage=True)
+
+
+@pytest.fixture
+def models():
+    models = FakeModels()
+    clients.override("genai", SimpleNamespace(models=models))
+    yield models
+    clients.reset()
+
+
+def test_modes_follow_the_worst_share(clock):
+    llm_budget.record("condition", None, 10, 10, requests=7)
+    assert llm_budget.mode() == llm_budget.NORMAL
+    assert llm_budget.interval_multiplier() == 1
+    llm_budget.record("condition", None, 10, 10)
+    assert llm_budget.mode() == llm_budget.ECONOMY
+    assert llm_budget.interval_multiplier() == 2
+    llm_budget.record("condition", None, 10, 10, requests=2)
+    assert llm_budget.mode() == llm_budget.MINIMAL
+    assert llm_budget.interval_multiplier() == 4
+
+
+def test_economy_drops_vision_only(clock):
+    llm_budget.record("condition", None, 10, 10, requests=8)
+    assert not llm_budget.allows("extract_image")
+    assert llm_budget.allows("condition")
+    llm_budget.record("condition", None, 10, 10, requests=2)
+    assert not llm_budget.allows("condition")
+
+
+def test_minute_window_slides(clock):
+    llm_budget.record("condition", None, 10, 10, requests=10)
+    assert llm_budget.mode() == llm_budget.MINIMAL
+    clock.now += 90  # half of the last minute's bucket still counts
+    assert llm_budget.mode() == llm_budget.NORMAL
+    clock.now += 30
+    assert llm_budget.snapshot()["minute"]["requests"] == 0
+
+
+def test_user_limits_apply_to_that_user_only(clock):
+    llm_budget.record("condition", "u1", 10, 10, requests=2)
+    clock.now += 120  # out of the global minute, still inside the user's day
+    llm_budget.record("condition", "u1", 10, 10, requests=6)
+    assert llm_budget.mode("u1") == llm_budget.ECONOMY
+    assert llm_budget.mode("u2") == llm_budget.NORMAL
+    assert llm_budget.mode() == llm_budget.NORMAL
+
+
+def test_quota_error_cools_everyone_down_with_backoff(clock, models):
+    models.fail = QuotaError("RESOURCE_EXHAUSTED")
+    with pytest.raises(QuotaError):
+        llm_budget.generate("condition", "prompt")
+    assert llm_budget.mode() == llm_budget.MINIMAL
+    with pytest.raises(BudgetExceeded):
+        llm_budget.generate("condition", "prompt")
+    assert models.calls == 1
+
+    clock.now += 61
+    assert llm_budget.mode() == llm_budget.NORMAL
+    with pytest.raises(QuotaError):
+        llm_budget.generate("condition", "prompt")
+    assert llm_budget.snapshot()["cooldown_until"] == clock.now + 120  # doubled
+
+    clock.now += 121
+    models.fail = None
+    assert llm_budget.generate("condition", "prompt").text == "ok"
+    # recovered: the next quota error starts from the base backoff again
+    models.fail = QuotaError("RESOURCE_EXHAUSTED")
+    with pytest.raises(QuotaError):
+        llm_budget.generate("condition", "prompt")
+    assert llm_budget.snapshot()["cooldown_until"] == clock.now + 60
+
+
+def test_reset_ends_cooldown(clock, models):
+    models.fail = QuotaError("quota")
+    with pytest.raises(QuotaError):
+        llm_budget.generate("condition", "prompt")
+    assert llm_budget.reset() == 1
+    assert llm_budget.mode() == llm_budget.NORMAL
+
+
+def test_is_quota_error():
+    assert llm_budget.is_quota_error(QuotaError())
+    assert llm_budget.is_quota_error(RuntimeError("429 RESOURCE_EXHAUSTED"))
+    assert not llm_budget.is_quota_error(RuntimeError("500 INTERNAL"))
@@ -0,0 +1,55 @@
+# backend/tests/test_local_ocr.py
+import pytest
+
+from backend.agents import local_ocr
+from backend.bench.ocr_bench import correct, load_corpus
+
+CORPUS = load_corpus()
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_recorded_captures(case):
+    result = local_ocr.best(case["words"], case["description"])
+    assert correct(result, case["expected"]), result
+
+
+def test_confident_answers_are_right():
+    # a confident wrong answer is never checked by Gemini
+    sure = [case for case in CORPUS if local_ocr.confident(local_ocr.best(case["words"], case["description"]))]
+    assert len(sure) >= len(CORPUS) // 2
+    assert all(correct(local_ocr.best(c["words"], c["description"]), c["expected"]) for c in sure)
+
+
+def word(text, left, height=20, conf=95, line="1.1.1"):
+    return (text, conf, left, 10, len(text) * 10, height, line)
+
+
+def test_old_price_and_instalment_rank_below_the_price():
+    words = [word("Was", 0), word("$40.00", 40), word("$30.00", 120, height=30, line="1.1.2"),
+             word("or", 0, line="1.1.3"), word("$7.50", 30, line="1.1.3"), word("/mo", 90, line="1.1.3")]
+    ranked = local_ocr.candidates(words, "price of the item")
+    assert [c["value"] for _, c in ranked][0] == "$30.00"
+    assert {c["value"] for _, c in ranked} == {"$40.00", "$30.00", "$7.50"}
+
+
+def test_ocr_misreads_are_repaired():
+    ranked = local_ocr.candidates([word("S2O0.00", 0)], "price")
+    assert ranked[0][1]["value"] == "$200.00" and ranked[0][1]["normalized"] == 200.0
+
+
+def test_split_decimal_is_joined():
+    ranked = local_ocr.candidates([word("$1,149", 0), word(".99", 70)], "price")
+    assert ranked[0][1]["normalized"] == 1149.99
+
+
+def test_close_runner_up_lowers_confidence():
+    alone = local_ocr.best([word("$49.99", 0)], "price")
+    tied = local_ocr.best([word("$49.99", 0), word("$59.99", 0, line="1.1.2")], "price")
+    assert alone["confidence"] > tied["confidence"]
+    assert not local_ocr.confident(tied)
+
+
+def test_no_numbers():
+    assert local_ocr.best([word("Sold", 0), word("out", 50)], "price") == {
+        "value": None, "normalized": None, "confidence": 0.0, "source": "ocr",
+    }
@@ -0,0 +1,81 @@
+# backend/tests/test_monitor_cache.py
+import pytest
+
+from backend.db import monitor_cache
+from backend.utils import pubsub
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    monitor_cache.invalidate()
+    yield
+    monitor_cache.invalidate()
+
+
+def item(monitor_id="m1", **fields):
+    return dict({"monitor_id": monitor_id, "url": "https://x.example", "last_price": "$10"}, **fields)
+
+
+class Loader:
+    """Returns `stored` as read before `during(monitor_id)` runs, like a read racing a write."""
+
+    def __init__(self, stored, during=None):
+        self.stored = stored
+        self.during = during
+        self.calls = 0
+
+    def __call__(self, monitor_id):
+        self.calls += 1
+        read = dict(self.stored)
+        if self.during:
+            self.during(monitor_id)
+        return read
+
+
+def test_miss_then_hit():
+    loader = Loader(item(extra="kept"))
+    assert monitor_cache.get("m1", loader) == item(extra="kept")
+    assert monitor_cache.get("m1", loader) == item(extra="kept")
+    assert loader.calls == 1
+
+
+def test_patch_during_load_of_uncached_item_is_not_lost():
+    def update(monitor_id):
+        pubsub.publish(pubsub.MONITORS, {"type": "update", "monitor_id": monitor_id, "fields": {"last_price": "$8"}})
+
+    loader = Loader(item(), during=update)
+    # this caller saw the item as it was when read ...
+    assert monitor_cache.get("m1", loader)["last_price"] == "$10"
+    # ... but the stale read was not cached over the update
+    loader.during = None
+    loader.stored = item(last_price="$8")
+    assert monitor_cache.get("m1", loader)["last_price"] == "$8"
+    assert loader.calls == 2
+
+
+def test_delete_during_load_is_not_cached():
+    loader = Loader(item(), during=lambda m: pubsub.publish(pubsub.MONITORS, {"type": "delete", "monitor_id": m}))
+    monitor_cache.get("m1", loader)
+    assert monitor_cache.size() == 0
+
+
+def test_put_during_load_wins():
+    new = item(last_price="$7")
+    loader = Loader(item(), during=lambda m: pubsub.publish(pubsub.MONITORS, {"type": "put", "monitor_id": m, "item": new}))
+    monitor_cache.get("m1", loader)
+    assert monitor_cache.get("m1", Loader(item()))["last_price"] == "$7"
+
+
+def test_update_patches_cached_entry():
+    monitor_cache.put(item())
+    pubsub.publish(pubsub.MONITORS, {"type": "update", "monitor_id": "m1", "fields": {"last_price": "$9", "note": "x"}})
+    cached = monitor_cache.get("m1", Loader({}))
+    assert cached["last_price"] == "$9" and cached["note"] == "x"
+
+
+def test_large_attributes_are_not_cached():
+    loader = Loader(item(dom_fingerprint="A" * 1000))
+    monitor_cache.get("m1", loader)
+    pubsub.publish(pubsub.MONITORS, {"type": "update", "monitor_id": "m1", "fields": {"dom_fingerprint": "B" * 1000}})
+    assert monitor_cache.get("m1", loader) == item()
+    assert loader.calls == 1
@@ -0,0 +1,133 @@
+# backend/tests/test_streams.py
+import asyncio
+import itertools
+
+import pytest
+
+from backend.utils import pubsub, streams
+
+
+class CountingBroker:
+    """Stands in for RedisBroker: one shared counter numbers every event, then all processes get it."""
+
+    topics = frozenset((pubsub.CHECKS,))
+
+    def __init__(self, start=500):
+        self._seq = itertools.count(start)
+
+    def publish(self, topic, event):
+        pubsub.deliver(topic, dict(event, seq=next(self._seq)))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def ids(sub):
+    out = []
+    while True:
+        frame = await sub.next(0.01)
+        if frame is None:
+            return out
+        out.append(frame[0])
+
+
+@pytest.fixture
+def broker():
+    broker = CountingBroker()
+    pubsub.set_broker(broker)
+    yield broker
+    pubsub.set_broker(None)
+
+
+def test_ids_are_per_process_without_a_broker():
+    async def scenario():
+        hub = streams.Hub(replay=10).start()
+        try:
+            sub = hub.open(monitors=["m1"])
+            for _ in range(3):
+                streams.emit("checked", "m1")
+            await asyncio.sleep(0)
+            return await ids(sub)
+        finally:
+            hub.stop()
+
+    assert run(scenario()) == [1, 2, 3]
+
+
+def test_broker_ids_let_a_client_resume_on_another_process(broker):
+    async def scenario():
+        # two workers, each with its own hub, both fed by the broker
+        first, second = streams.Hub(replay=10).start(), streams.Hub(replay=10).start()
+        try:
+            sub = first.open(monitors=["m1"])
+            for kind in ("queued", "started", "fetched", "checked"):
+                streams.emit(kind, "m1")
+            await asyncio.sleep(0)
+            seen = await ids(sub)
+            # the client read two events, then reconnected to the other worker
+            resumed = second.open(monitors=["m1"], last_event_id=seen[1])
+            return seen, await ids(resumed)
+        finally:
+            first.stop()
+            second.stop()
+
+    seen, resumed = run(scenario())
+    assert seen == [500, 501, 502, 503]
+    assert resumed == [502, 503]
+
+
+def test_broker_seq_is_not_sent_to_clients(broker):
+    async def scenario():
+        hub = streams.Hub(replay=10).start()
+        try:
+            sub = hub.open(users=["u1"])
+            streams.emit("checked", "m1", "u1", value=3)
+            await asyncio.sleep(0)
+            return await sub.next(0.01)
+        finally:
+            hub.stop()
+
+    seq, kind, data, frame = run(scenario())
+    assert seq == 500 and kind == "checked"
+    assert '"seq"' not in data and frame.startswith(b"id: 500\n")
+
+
+def test_snapshot_and_lagged_frames_carry_no_id():
+    async def scenario():
+        hub = streams.Hub(queue_size=2, replay=10).start()
+        try:
+            sub = hub.open(monitors=["m1"])
+            for kind in ("queued", "started", "checked"):
+                streams.emit(kind, "m1")
+            await asyncio.sleep(0)
+            frames = []
+            while (frame := await sub.next(0.01)) is not None:
+                frames.append(frame)
+            return frames
+        finally:
+            hub.stop()
+
+    snapshot = streams.encode(None, {"type": "snapshot", "monitor_id": "m1"})
+    assert snapshot[3].startswith(b"event: snapshot\n")
+    frames = run(scenario())
+    # the oldest frame was dropped; "lagged" follows the two that were kept
+    assert [f[1] for f in frames] == ["started", "checked", "lagged"]
+    assert frames[1][3].startswith(b"id: 3\n")
+    assert b"id:" not in frames[2][3]
+
+
+def test_reconnect_after_a_snapshot_replays_nothing_old():
+    async def scenario():
+        hub = streams.Hub(replay=10).start()
+        try:
+            for kind in ("queued", "started", "checked"):
+                streams.emit(kind, "m1")
+            await asyncio.sleep(0)
+            # a client that only saw a snapshot reconnects without Last-Event-ID
+            sub = hub.open(monitors=["m1"], last_event_id=None)
+            return await ids(sub)
+        finally:
+            hub.stop()
+
+    assert run(scenario()) == []
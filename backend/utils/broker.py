@@ -0,0 +1,100 @@
+# backend/utils/broker.py
+import json
+import logging
+
+try:
+    from backend.utils import pubsub
+    from backend.utils.env import PUBSUB_BROKER_TOPICS, PUBSUB_BROKER_URL
+    from backend.utils.streams import to_json
+except ImportError:
+    from utils import pubsub
+    from utils.env import PUBSUB_BROKER_TOPICS, PUBSUB_BROKER_URL
+    from utils.streams import to_json
+
+logger = logging.getLogger(__name__)
+
+# Cross-process transport for pubsub topics. A broker has `topics` and
+# publish(topic, event), and calls pubsub.deliver() for every message it
+# receives, including the ones this process sent, so local subscribers see
+# each event exactly once. Anything with that shape can replace RedisBroker.
+#
+# Only PUBSUB_BROKER_TOPICS go through it (by default just check events);
+# monitor changes already reach other processes through the DynamoDB stream.
+#
+# Each message gets a "seq" from a per-topic Redis counter, taken and
+# published in one script call, so ids are shared by every process and
+# increase in the order subscribers receive them. streams.Hub uses it as the
+# SSE event id, which lets Last-Event-ID replay work on any worker.
+
+CHANNEL_PREFIX = "autoscout:"
+# KEYS: counter, channel; ARGV: the event as a JSON object
+PUBLISH_WITH_SEQ = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('PUBLISH', KEYS[2], '{"seq":' .. seq .. ',' .. string.sub(ARGV[1], 2))
+return seq
+"""
+
+
+class RedisBroker:
+    """pubsub topics over Redis PUBLISH/SUBSCRIBE."""
+
+    def __init__(self, url, topics=PUBSUB_BROKER_TOPICS):
+        import redis
+
+        self.topics = frozenset(topics)
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._publish = self._redis.register_script(PUBLISH_WITH_SEQ)
+        self._pubsub.subscribe(**{CHANNEL_PREFIX + t: self._on_message for t in self.topics})
+        self._thread = self._pubsub.run_in_thread(sleep_time=0.5, daemon=True)
+
+    def _on_message(self, message):
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+        try:
+            event = json.loads(message["data"])
+        except (TypeError, ValueError):
+            logger.warning("dropping malformed message on %s", channel)
+            return
+        pubsub.deliver(channel[len(CHANNEL_PREFIX):], event)
+
+    def publish(self, topic, event):
+        event = {k: v for k, v in event.items() if k != "seq"}
+        if not event:
+            self._redis.publish(CHANNEL_PREFIX + topic, to_json(event))
+            return
+        channel = CHANNEL_PREFIX + topic
+        self._publish(keys=[channel + ":seq", channel], args=[to_json(event)])
+
+    def close(self):
+        self._thread.stop()
+        self._pubsub.close()
+        self._redis.close()
+
+
+_broker = None
+
+
+def start_broker(url=None):
+    """Connect the configured broker and route pubsub through it. No-op when unset."""
+    global _broker
+    url = url or PUBSUB_BROKER_URL
+    if not url or _broker is not None:
+        return _broker
+    try:
+        _broker = RedisBroker(url)
+    except Exception as e:  # redis not installed or unreachable: stay in-process
+        logger.warning("pubsub broker unavailable, staying in-process: %s", e)
+        return None
+    pubsub.set_broker(_broker)
+    logger.info("pubsub topics %s shared through %s", sorted(_broker.topics), url.split("@")[-1])
+    return _broker
+
+
+def stop_broker():
+    global _broker
+    broker, _broker = _broker, None
+    if broker is not None:
+        pubsub.set_broker(None)
+        broker.close()
@@ -0,0 +1,347 @@
+# backend/utils/check_queue.py
+import heapq
+import itertools
+import json
+import logging
+import re
+import threading
+import time
+
+try:
+    from backend.utils import llm_budget, metrics, pubsub, streams
+    from backend.utils.env import (
+        CHECK_QUEUE_HARD_LIMIT,
+        CHECK_QUEUE_MAX_DEPTH,
+        CHECK_QUEUE_SOFT_LIMIT,
+        CHECK_SLA_FRACTION,
+        CHECK_SLA_MIN_SECONDS,
+        CHECK_WORKERS,
+        DEFAULT_INTERVAL,
+        USER_TIER_WEIGHTS,
+    )
+except ImportError:
+    from utils import llm_budget, metrics, pubsub, streams
+    from utils.env import (
+        CHECK_QUEUE_HARD_LIMIT,
+        CHECK_QUEUE_MAX_DEPTH,
+        CHECK_QUEUE_SOFT_LIMIT,
+        CHECK_SLA_FRACTION,
+        CHECK_SLA_MIN_SECONDS,
+        CHECK_WORKERS,
+        DEFAULT_INTERVAL,
+        USER_TIER_WEIGHTS,
+    )
+
+logger = logging.getLogger(__name__)
+
+# APScheduler only decides *when* a monitor is due; the check itself goes
+# through this queue. Each due check gets a deadline (due time + an SLA that is
+# a share of its interval, so a 1-minute monitor tolerates seconds of lateness
+# and an hourly one minutes), pulled earlier when the last value sat close to
+# the monitor's threshold. Workers take the most urgent check across users,
+# where every user's checks are pushed back by the worker time that user has
+# already had beyond their fair share (weighted by tier). One user with
+# thousands of hourly monitors therefore can't starve another's 1-minute one.
+#
+# Under overload bulk checks (hourly or slower) are deferred past
+# CHECK_QUEUE_SOFT_LIMIT and shed past CHECK_QUEUE_MAX_DEPTH; their next
+# scheduled run picks them up again. When a user's LLM budget runs low (see
+# utils/llm_budget.py) their monitors run every 2nd or 4th scheduled time.
+#
+# Other classes are never shed for depth alone: a monitor has at most one
+# pending check (later runs coalesce into it), so the queue can't grow past
+# the number of scheduled monitors. CHECK_QUEUE_HARD_LIMIT is the backstop
+# for a process that schedules far more monitors than it can run; past it
+# every class is shed.
+#
+# Per-user and per-monitor bookkeeping is dropped when a monitor is deleted,
+# and swept every PRUNE_EVERY seconds: a monitor not queued for IDLE_INTERVALS
+# of its intervals is forgotten, and so is an idle user whose worker time
+# carries no debt.
+
+# by interval: under 10 minutes, under an hour, hourly or slower
+PRIORITY_CLASSES = (("realtime", 600), ("standard", 3600), ("bulk", None))
+# a value within this fraction of the threshold counts as "close"
+PROXIMITY_BAND = 0.1
+THRESHOLD_RE = re.compile(
+    r"(?:<|>|=|below|under|less than|above|over|more than|drops? to|reach\w*|hits?)\s*=?\s*[$€£]?\s*(\d[\d,]*(?:\.\d+)?)",
+    re.I,
+)
+
+PRUNE_EVERY = 60
+IDLE_INTERVALS = 8
+IDLE_USER_SECONDS = 6 * 3600
+
+LATENESS_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+def _tier_weights():
+    try:
+        return {k.lower(): float(v) for k, v in json.loads(USER_TIER_WEIGHTS).items()}
+    except (ValueError, AttributeError):
+        logger.warning("USER_TIER_WEIGHTS is not a JSON object; all users weigh the same")
+        return {}
+
+
+_WEIGHTS = _tier_weights()
+
+
+def tier_weight(tier):
+    return max(_WEIGHTS.get((tier or "free").lower(), 1.0), 0.01)
+
+
+def priority_class(interval_seconds):
+    for name, limit in PRIORITY_CLASSES:
+        if limit is None or interval_seconds < limit:
+            return name
+
+
+def threshold_closeness(condition, value):
+    """
+    1.0 when `value` sits on the number in `condition` ("price below 200"),
+    falling to 0.0 at PROXIMITY_BAND away from it; 0.0 when either is unknown.
+    """
+    if value is None or not condition:
+        return 0.0
+    m = THRESHOLD_RE.search(condition)
+    if not m:
+        return 0.0
+    try:
+        threshold = float(m.group(1).replace(",", ""))
+        distance = abs(float(value) - threshold) / max(abs(threshold), 1e-9)
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, 1.0 - distance / PROXIMITY_BAND)
+
+
+def _run_check(payload):
+    # imported here so scheduling stays cheap to import (see scheduler.CHECK_JOB)
+    from backend.lambda_fns.check_price import lambda_handler
+    return lambda_handler(payload, None)
+
+
+class CheckQueue:
+    """Priority queue of due checks with weighted fair sharing across users."""
+
+    def __init__(self, workers=CHECK_WORKERS, runner=None, clock=time.monotonic):
+        self.workers = workers
+        self.runner = runner or _run_check
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._users = {}       # user -> heap of (key, seq, item)
+        self._vtime = {}       # user -> worker seconds used / weight
+        self._active = {}      # user -> clock time of their last queued or finished check
+        self._queued = {}      # monitor_id -> item, one pending check per monitor
+        self._last_value = {}  # monitor_id -> last normalized value seen
+        self._admitted = {}    # monitor_id -> (clock time its last check was queued, interval)
+        self._pruned = clock()
+        self._seq = itertools.count()
+        self._threads = []
+        self._stopping = False
+
+    def __len__(self):
+        return len(self._queued)
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return self
+            self._stopping = False
+            for i in range(self.workers):
+                t = threading.Thread(target=self._work, name=f"check-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        logger.info("check queue started with %d workers", self.workers)
+        return self
+
+    def stop(self, timeout=5):
+        with self._cond:
+            self._stopping = True
+            threads, self._threads = self._threads, []
+            self._cond.notify_all()
+        for t in threads:
+            t.join(timeout)
+
+    def submit(self, payload, due=None):
+        """Queue one check. Returns False when it was coalesced or shed."""
+        now = self.clock()
+        due = now if due is None else due
+        monitor_id = payload["monitor_id"]
+        interval = int(payload.get("interval_seconds") or DEFAULT_INTERVAL)
+        klass = priority_class(interval)
+        sla = max(CHECK_SLA_MIN_SECONDS, interval * CHECK_SLA_FRACTION)
+        stretch = llm_budget.interval_multiplier(payload.get("user_id"))
+        item = {
+            "payload": payload,
+            "monitor_id": monitor_id,
+            "user": payload.get("user_id") or "anonymous",
+            "weight": tier_weight(payload.get("user_tier")),
+            "class": klass,
+            "interval": interval,
+            "due": due,
+        }
+        with self._cond:
+            if monitor_id in self._queued:
+                # still waiting from its last run; one pending check is enough
+                metrics.inc("autoscout_check_queue_coalesced_total", priority_class=klass)
+                return False
+            if now - self._pruned >= PRUNE_EVERY:
+                self._prune(now)
+            last, _ = self._admitted.get(monitor_id, (None, None))
+            if stretch > 1 and last is not None and now - last < interval * (stretch - 0.5):
+                metrics.inc("autoscout_check_queue_shed_total", priority_class=klass, reason="llm_budget")
+                return False
+            closeness = threshold_closeness(payload.get("condition"), self._last_value.get(monitor_id))
+            key = due + sla - closeness * sla * 0.5
+            depth = len(self._queued)
+            if depth >= CHECK_QUEUE_HARD_LIMIT or (klass == "bulk" and depth >= CHECK_QUEUE_MAX_DEPTH):
+                metrics.inc("autoscout_check_queue_shed_total", priority_class=klass, reason="overload")
+                return False
+            if klass == "bulk" and depth >= CHECK_QUEUE_SOFT_LIMIT:
+                # ranked behind other classes by _pop while the queue stays this deep
+                metrics.inc("autoscout_check_queue_deferred_total", priority_class=klass)
+            user = item["user"]
+            heap = self._users.get(user)
+            if heap is None:
+                # a user coming back starts level with the least-served active
+                # user, so idle time doesn't bank credit
+                floor = min((self._vtime[u] for u in self._users), default=0.0)
+                self._vtime[user] = max(self._vtime.get(user, 0.0), floor)
+                heap = self._users[user] = []
+            heapq.heappush(heap, (key, next(self._seq), item))
+            self._queued[monitor_id] = item
+            self._admitted[monitor_id] = (now, interval)
+            self._active[user] = now
+            metrics.set_gauge("autoscout_check_queue_depth", len(self._queued))
+            self._cond.notify()
+        streams.emit("queued", monitor_id, payload.get("user_id"), priority_class=klass)
+        return True
+
+    def forget(self, monitor_id):
+        """Drop a deleted monitor: its pending check and what the queue remembers about it."""
+        with self._cond:
+            self._last_value.pop(monitor_id, None)
+            self._admitted.pop(monitor_id, None)
+            item = self._queued.pop(monitor_id, None)
+            if item is None:
+                return False
+            heap = [entry for entry in self._users[item["user"]] if entry[2] is not item]
+            if heap:
+                heapq.heapify(heap)
+                self._users[item["user"]] = heap
+            else:
+                del self._users[item["user"]]
+            metrics.set_gauge("autoscout_check_queue_depth", len(self._queued))
+            return True
+
+    def _prune(self, now):
+        # called with self._cond held
+        self._pruned = now
+        for monitor_id, (admitted, interval) in list(self._admitted.items()):
+            if monitor_id not in self._queued and now - admitted > interval * IDLE_INTERVALS:
+                del self._admitted[monitor_id]
+                self._last_value.pop(monitor_id, None)
+        # a returning user is lifted to the least-served active user anyway,
+        # so an idle user at or below that level loses nothing by being dropped
+        floor = min((self._vtime[u] for u in self._users), default=None)
+        for user in list(self._vtime):
+            if user in self._users:
+                continue
+            if floor is None or self._vtime[user] <= floor or now - self._active.get(user, now) > IDLE_USER_SECONDS:
+                del self._vtime[user]
+                self._active.pop(user, None)
+
+    def _rank(self, user, floor, overloaded):
+        key, _, item = self._users[user][0]
+        if overloaded and item["class"] == "bulk":
+            # defer bulk work behind everything else; the same shift for every
+            # user keeps their fair shares intact
+            key += item["interval"] / 2
+        return key + self._vtime[user] - floor
+
+    def _pop(self):
+        floor = min(self._vtime[u] for u in self._users)
+        overloaded = len(self._queued) >= CHECK_QUEUE_SOFT_LIMIT
+        user = min(self._users, key=lambda u: self._rank(u, floor, overloaded))
+        heap = self._users[user]
+        _, _, item = heapq.heappop(heap)
+        if not heap:
+            del self._users[user]
+        del self._queued[item["monitor_id"]]
+        metrics.set_gauge("autoscout_check_queue_depth", len(self._queued))
+        return item
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._stopping and not self._queued:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                item = self._pop()
+                overloaded = len(self._queued) >= CHECK_QUEUE_SOFT_LIMIT
+            self._run(item, overloaded)
+
+    def _run(self, item, overloaded=False):
+        start = self.clock()
+        lateness = max(0.0, start - item["due"])
+        if overloaded and lateness > item["interval"]:
+            # a full interval late: the next scheduled run is already due
+            metrics.inc("autoscout_check_queue_shed_total", priority_class=item["class"], reason="stale")
+            return
+        metrics.observe("autoscout_check_lateness_seconds", lateness, priority_class=item["class"])
+        streams.emit("started", item["monitor_id"], item["payload"].get("user_id"), lateness=round(lateness, 3))
+        result = None
+        try:
+            result = self.runner(item["payload"])
+        except Exception:
+            logger.exception("check %s failed", item["monitor_id"])
+        elapsed = self.clock() - start
+        with self._cond:
+            self._vtime[item["user"]] = self._vtime.get(item["user"], 0.0) + elapsed / item["weight"]
+            self._active[item["user"]] = self.clock()
+            value = (result or {}).get("value") if isinstance(result, dict) else None
+            if value is not None:
+                self._last_value[item["monitor_id"]] = value
+
+
+_lock = threading.Lock()
+_queue = None
+
+
+def get_check_queue():
+    global _queue
+    if _queue is None:
+        with _lock:
+            if _queue is None:
+                _queue = CheckQueue().start()
+    return _queue
+
+
+def submit(payload):
+    """APScheduler job target: queue the check instead of running it inline."""
+    get_check_queue().submit(payload)
+
+
+def _on_monitor_change(event):
+    queue = _queue
+    if queue is not None and event.get("type") == "delete":
+        queue.forget(event.get("monitor_id"))
+
+
+def shutdown_check_queue(timeout=5):
+    global _queue
+    with _lock:
+        queue, _queue = _queue, None
+    if queue is not None:
+        queue.stop(timeout)
+
+
+pubsub.subscribe(pubsub.MONITORS, _on_monitor_change)
+
+metrics.describe("autoscout_check_lateness_seconds", "histogram",
+                 "Seconds between a check falling due and a worker starting it.", buckets=LATENESS_BUCKETS)
+metrics.describe("autoscout_check_queue_depth", "gauge", "Checks waiting for a worker.")
+metrics.describe("autoscout_check_queue_shed_total", "counter", "Checks dropped under overload.")
+metrics.describe("autoscout_check_queue_deferred_total", "counter", "Bulk checks pushed back under overload.")
+metrics.describe("autoscout_check_queue_coalesced_total", "counter", "Checks merged into one already waiting.")
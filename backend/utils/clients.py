@@ -0,0 +1,61 @@
+# backend/utils/clients.py
+import threading
+
+try:
+    from backend.utils.env import AWS_REGION, DYNAMO_TABLE, GEMINI_API_KEY
+except ImportError:
+    from utils.env import AWS_REGION, DYNAMO_TABLE, GEMINI_API_KEY
+
+# Clients are built on first use, not at import, and shared by every module.
+# google-genai and boto3 are heavy imports and each client opens its own
+# connection pool, so building them eagerly slowed every cold start.
+_lock = threading.Lock()
+_clients = {}
+
+
+def _get(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def _build_genai():
+    from google import genai
+    return genai.Client(api_key=GEMINI_API_KEY)
+
+
+def _build_sns():
+    import boto3
+    return boto3.client("sns", region_name=AWS_REGION)
+
+
+def _build_dynamo_table():
+    import boto3
+    return boto3.resource("dynamodb", region_name=AWS_REGION).Table(DYNAMO_TABLE)
+
+
+def get_genai_client():
+    return _get("genai", _build_genai)
+
+
+def get_sns_client():
+    return _get("sns", _build_sns)
+
+
+def get_dynamo_table():
+    return _get("dynamo_table", _build_dynamo_table)
+
+
+def override(name, client):
+    """Install a client under `name` ("genai", "sns", "dynamo_table"); used by benchmarks."""
+    with _lock:
+        _clients[name] = client
+
+
+def reset():
+    with _lock:
+        _clients.clear()
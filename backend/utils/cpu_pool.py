@@ -0,0 +1,235 @@
+# backend/utils/cpu_pool.py
+import logging
+import multiprocessing
+import threading
+import time
+import weakref
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+try:
+    from backend.utils import metrics
+    from backend.utils.env import CPU_OFFLOAD_MIN_BYTES, CPU_TASK_TIMEOUT, CPU_WORKERS
+except ImportError:
+    from utils import metrics
+    from utils.env import CPU_OFFLOAD_MIN_BYTES, CPU_TASK_TIMEOUT, CPU_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Process pool for the CPU-heavy parts of a check: lxml parsing of large pages
+# (structured data, DOM fingerprints, XPath) and screenshot decoding/hashing.
+# In the API and check-worker threads these hold the GIL, so a few big pages
+# stall everything else in the process; in a pool they run on other cores.
+#
+# Large pages and images go over in a shared memory segment rather than being
+# pickled through the pool's pipe (serialize, write, read, deserialize). Bytes
+# are one memcpy in and a memoryview in the worker. A str is encoded to UTF-8
+# in the parent, copied in, and decoded once in the worker, since the parsers
+# take text; that is still two copies fewer than the pipe. Setting up a
+# segment costs about as much as pickling a few hundred KB, so smaller buffers
+# are pickled. Only the arguments and the result are pickled either way.
+#
+# Buffers under CPU_OFFLOAD_MIN_BYTES run inline: below that the hop costs
+# more than the work. CPU_WORKERS=0 turns the pool off; when the pool can't
+# take the task (no shared memory, no processes, a pool already broken or
+# recycled) it runs inline too. An exception raised by the task is the task's
+# own and is re-raised as it would be inline. A task that kills its worker
+# (an lxml crash, the OOM killer) or is still running after CPU_TASK_TIMEOUT
+# raises TaskFailed instead: running that input again inline would crash or
+# hang the API process itself. A timed-out task's pool has its workers
+# terminated and a new one is started for the next task.
+
+# warmed in each worker so the first task doesn't pay for the imports
+PRELOAD = (
+    "backend.scrapper.structured_data",
+    "backend.scrapper.dom_diff",
+    "backend.scrapper.visual_diff",
+    "backend.agents.local_ocr",
+)
+
+SHARED_MEMORY_MIN_BYTES = 256 * 1024
+
+_lock = threading.Lock()
+_pool = None
+_unavailable = False  # no process support here (AWS Lambda has no /dev/shm)
+_recycled = weakref.WeakSet()  # pools terminated over another task's timeout
+
+
+def _init_worker():
+    for name in PRELOAD:
+        try:
+            __import__(name)
+        except Exception as e:  # optional deps (numpy/Pillow) may be missing
+            logger.debug("cpu worker could not preload %s: %s", name, e)
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers the segment again, but with the parent's
+        # resource tracker (workers inherit it), so it's a no-op there; the
+        # parent's unlink() is what unregisters it
+        return shared_memory.SharedMemory(name=name)
+
+
+class TaskFailed(Exception):
+    """The pool gave up on a task: it timed out or its worker died. The input is suspect; don't retry it inline."""
+
+    def __init__(self, task, reason):
+        super().__init__(f"{task} failed in the cpu pool ({reason})")
+        self.task = task
+        self.reason = reason
+
+
+class WorkerSetupError(Exception):
+    """A worker could not attach the task's shared memory; the pool, not the task, failed."""
+
+
+def _run_shared(fn, name, size, text, args):
+    # in the worker: bytes are a view on the parent's segment, text is decoded from it
+    try:
+        shm = _attach(name)
+    except OSError as e:
+        raise WorkerSetupError(str(e)) from None
+    view = shm.buf[:size]
+    try:
+        data = str(view, "utf-8") if text else view
+        return fn(data, *args)
+    finally:
+        data = None
+        view.release()
+        shm.close()
+
+
+def get_cpu_pool():
+    """The shared pool, started on first use; None when CPU_WORKERS is 0."""
+    global _pool, _unavailable
+    if CPU_WORKERS <= 0 or _unavailable:
+        return None
+    with _lock:
+        if _pool is None:
+            # forkserver/spawn, never fork: this process already runs threads
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            try:
+                _pool = ProcessPoolExecutor(
+                    max_workers=CPU_WORKERS,
+                    mp_context=multiprocessing.get_context(method),
+                    initializer=_init_worker,
+                )
+            except OSError as e:
+                logger.warning("cpu pool unavailable, parsing inline: %s", e)
+                _unavailable = True
+                return None
+            logger.info("cpu pool started with %d %s workers", CPU_WORKERS, method)
+        return _pool
+
+
+def shutdown_cpu_pool(wait=True):
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _recycle(pool):
+    """Terminate a pool with a stuck worker; the next task starts a fresh one."""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+        _recycled.add(pool)
+    terminate = getattr(pool, "terminate_workers", None)  # Python 3.14+
+    if terminate is not None:
+        terminate()
+        return
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _failed(fn, reason):
+    metrics.inc("autoscout_cpu_tasks_total", task=fn.__name__, where="failed", reason=reason)
+    return TaskFailed(fn.__name__, reason)
+
+
+def _inline(fn, data, args, reason):
+    metrics.inc("autoscout_cpu_tasks_total", task=fn.__name__, where="inline", reason=reason)
+    return fn(data, *args)
+
+
+def run(fn, data, *args, min_bytes=None):
+    """
+    fn(data, *args) in the CPU pool when `data` (str or bytes) is big enough,
+    else inline. `fn` must be a module-level function; in the pool it gets a
+    str for str data and, for bytes over SHARED_MEMORY_MIN_BYTES, a read-only
+    memoryview it must not keep a reference to. Exceptions raised by `fn`
+    propagate; TaskFailed when the task timed out or killed its worker. When
+    the pool can't take the task at all it runs inline.
+    """
+    if not data:
+        return fn(data, *args)
+    limit = CPU_OFFLOAD_MIN_BYTES if min_bytes is None else min_bytes
+    if len(data) < limit:
+        return _inline(fn, data, args, "small")
+    pool = get_cpu_pool()
+    if pool is None:
+        return _inline(fn, data, args, "disabled")
+    start = time.perf_counter()
+    shm = None
+    try:
+        try:
+            if len(data) < SHARED_MEMORY_MIN_BYTES:
+                future = pool.submit(fn, data, *args)
+            else:
+                text = isinstance(data, str)
+                payload = data.encode("utf-8") if text else data
+                size = len(payload)
+                shm = shared_memory.SharedMemory(create=True, size=size)
+                shm.buf[:size] = payload
+                payload = None
+                future = pool.submit(_run_shared, fn, shm.name, size, text, args)
+        except (OSError, RuntimeError) as e:
+            # no /dev/shm, the pool can't start processes here, or an earlier
+            # task broke it; this input hasn't run, so inline is safe
+            logger.warning("cpu pool unusable, running %s inline: %s", fn.__name__, e)
+            if isinstance(e, BrokenProcessPool) and pool is _pool:
+                shutdown_cpu_pool(wait=False)
+            return _inline(fn, data, args, "os_error")
+        try:
+            result = future.result(timeout=CPU_TASK_TIMEOUT)
+        except CancelledError:
+            # the pool was shut down or recycled before this task started
+            return _inline(fn, data, args, "cancelled")
+        except BrokenProcessPool:
+            if pool in _recycled:
+                # another task's timeout terminated the worker running this one
+                return _inline(fn, data, args, "recycled")
+            # a worker died, perhaps on this very input
+            logger.warning("cpu worker died running %s; restarting the pool", fn.__name__)
+            if pool is _pool:
+                shutdown_cpu_pool(wait=False)
+            raise _failed(fn, "worker_died") from None
+        except TimeoutError:
+            if future.done():
+                raise  # the task's own timeout, not ours
+            # a worker stuck on one page: it can't be interrupted, so the pool goes
+            logger.warning("%s timed out in the cpu pool; recycling the pool", fn.__name__)
+            _recycle(pool)
+            raise _failed(fn, "timeout") from None
+        except WorkerSetupError as e:
+            logger.warning("cpu worker could not attach shared memory, running %s inline: %s", fn.__name__, e)
+            return _inline(fn, data, args, "os_error")
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+    metrics.inc("autoscout_cpu_tasks_total", task=fn.__name__, where="pool", reason="")
+    metrics.observe("autoscout_cpu_task_seconds", time.perf_counter() - start, task=fn.__name__)
+    return result
+
+
+metrics.describe("autoscout_cpu_tasks_total", "counter", "Parsing/image tasks by where they ran.")
+metrics.describe("autoscout_cpu_task_seconds", "histogram", "Round trip of tasks sent to the CPU pool.")
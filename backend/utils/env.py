@@ -10,3 +10,79 @@ STEP_FUNCTION_ARN = os.getenv("STEP_FUNCTION_ARN", "")
 SNS_TOPIC_ARN = os.getenv("SNS_TOPIC_ARN", "")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 DEFAULT_INTERVAL = int(os.getenv("DEFAULT_INTERVAL", "7200"))  # 2 hours
+JSON_LOGS = os.getenv("JSON_LOGS", "").lower() in ("1", "true", "yes")
+# scraper HTTP client: "auto" uses httpx (HTTP/2) when h2 is installed, else requests
+HTTP_CLIENT = os.getenv("HTTP_CLIENT", "auto").lower()
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))  # keep-alive sockets per host
+HTTP_MAX_RESPONSE_BYTES = int(os.getenv("HTTP_MAX_RESPONSE_BYTES", str(5 * 1024 * 1024)))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))  # cap on a record's own TTL, seconds; 0 disables
+HTTP_DNS_CACHE_SIZE = int(os.getenv("HTTP_DNS_CACHE_SIZE", "1024"))  # hosts kept
+# headless render profile ("full", "default", "viewport", "lean"); per-domain overrides as JSON, e.g. {"nike.com": "full"}
+RENDER_PROFILE_DEFAULT = os.getenv("RENDER_PROFILE_DEFAULT", "default")
+RENDER_PROFILE_DOMAINS = os.getenv("RENDER_PROFILE_DOMAINS", "")
+# screenshot-tier visual diff gate: reuse the last Gemini answer when the captured region is unchanged
+VISUAL_DIFF_MAX_HASH_DISTANCE = int(os.getenv("VISUAL_DIFF_MAX_HASH_DISTANCE", "4"))  # pHash bits, of 64
+VISUAL_DIFF_PIXEL_TOLERANCE = int(os.getenv("VISUAL_DIFF_PIXEL_TOLERANCE", "32"))  # grey levels, 0-255
+VISUAL_DIFF_MAX_CHANGED_PIXELS = int(os.getenv("VISUAL_DIFF_MAX_CHANGED_PIXELS", "24"))
+VISUAL_DIFF_MAX_REUSE = int(os.getenv("VISUAL_DIFF_MAX_REUSE", "24"))  # re-read after N reuses, 0 disables the gate
+VISUAL_DIFF_CACHE_MB = int(os.getenv("VISUAL_DIFF_CACHE_MB", "64"))
+# "any change" monitors: block hashes kept per page, and memory for the block texts shown in alerts
+DOM_DIFF_MAX_BLOCKS = int(os.getenv("DOM_DIFF_MAX_BLOCKS", "5000"))
+DOM_DIFF_CACHE_MB = int(os.getenv("DOM_DIFF_CACHE_MB", "32"))
+# check event streams (/stream, /ws): per-client buffered frames, events kept for reconnects, keepalive
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+STREAM_REPLAY = int(os.getenv("STREAM_REPLAY", "1000"))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+# share pubsub topics across processes through Redis, e.g. redis://localhost:6379/0 (in-process when unset)
+PUBSUB_BROKER_URL = os.getenv("PUBSUB_BROKER_URL", "")
+PUBSUB_BROKER_TOPICS = tuple(t for t in os.getenv("PUBSUB_BROKER_TOPICS", "checks").split(",") if t)
+# CPU pool for parsing/image work: worker processes (default: one per core beyond the first, 0 = inline),
+# smallest page/image sent to it, and how long to wait before answering inline
+CPU_WORKERS = int(os.getenv("CPU_WORKERS") or max(0, (os.cpu_count() or 1) - 1))
+CPU_OFFLOAD_MIN_BYTES = int(os.getenv("CPU_OFFLOAD_MIN_BYTES", str(64 * 1024)))
+CPU_TASK_TIMEOUT = float(os.getenv("CPU_TASK_TIMEOUT", "30"))
+# check queue: worker threads, overload thresholds (queued checks) and per-tier fair-share weights
+CHECK_WORKERS = int(os.getenv("CHECK_WORKERS", "8"))
+CHECK_QUEUE_SOFT_LIMIT = int(os.getenv("CHECK_QUEUE_SOFT_LIMIT", "2000"))  # bulk checks are deferred past this
+CHECK_QUEUE_MAX_DEPTH = int(os.getenv("CHECK_QUEUE_MAX_DEPTH", "10000"))  # bulk checks are shed past this
+CHECK_QUEUE_HARD_LIMIT = int(os.getenv("CHECK_QUEUE_HARD_LIMIT", "50000"))  # every class is shed past this
+CHECK_SLA_FRACTION = float(os.getenv("CHECK_SLA_FRACTION", "0.25"))  # allowed lateness, as a share of the interval
+CHECK_SLA_MIN_SECONDS = int(os.getenv("CHECK_SLA_MIN_SECONDS", "15"))
+USER_TIER_WEIGHTS = os.getenv("USER_TIER_WEIGHTS", '{"free": 1, "pro": 4, "enterprise": 8}')
+# circuit breakers for failing targets; state lives in SQLite so every worker process on the host shares it
+BREAKER_DB = os.getenv("BREAKER_DB", os.path.join(os.getenv("TMPDIR", "/tmp"), "autoscout_breakers.sqlite3"))
+BREAKER_URL_FAILURES = int(os.getenv("BREAKER_URL_FAILURES", "2"))  # consecutive failures before a URL opens
+BREAKER_DOMAIN_FAILURES = int(os.getenv("BREAKER_DOMAIN_FAILURES", "5"))
+BREAKER_BASE_BACKOFF = int(os.getenv("BREAKER_BASE_BACKOFF", "60"))  # seconds, doubles each time it re-opens
+BREAKER_MAX_BACKOFF = int(os.getenv("BREAKER_MAX_BACKOFF", str(6 * 3600)))
+# read-through monitor cache, invalidated from the in-process bus and (optionally) DynamoDB Streams
+MONITOR_CACHE_SIZE = int(os.getenv("MONITOR_CACHE_SIZE", "10000"))  # monitors kept per process
+MONITOR_CACHE_TTL = int(os.getenv("MONITOR_CACHE_TTL", "300"))  # seconds; bounds staleness if an event is missed
+MONITOR_STREAM_ARN = os.getenv("MONITOR_STREAM_ARN", "")  # stream on the monitors table; empty = local events only
+MONITOR_STREAM_POLL_SECONDS = float(os.getenv("MONITOR_STREAM_POLL_SECONDS", "1"))
+# status-index partitions per status; changing it needs a backfill (python -m backend.db.backfill)
+MONITOR_STATUS_SHARDS = int(os.getenv("MONITOR_STATUS_SHARDS", "8"))
+# Gemini budget governor: usage is kept in SQLite so every process on the host counts against the same limits.
+# Limits are soft (0 disables one); past LLM_ECONOMY_AT of any of them checks stop using vision and stretch
+# intervals, past LLM_MINIMAL_AT they stop calling Gemini at all
+LLM_BUDGET_DB = os.getenv("LLM_BUDGET_DB", os.path.join(os.getenv("TMPDIR", "/tmp"), "autoscout_llm_budget.sqlite3"))
+LLM_GLOBAL_RPM = int(os.getenv("LLM_GLOBAL_RPM", "1000"))  # requests per minute, all users
+LLM_GLOBAL_TPM = int(os.getenv("LLM_GLOBAL_TPM", "1000000"))  # tokens per minute, all users
+LLM_DAILY_BUDGET_USD = float(os.getenv("LLM_DAILY_BUDGET_USD", "25"))  # spend over the last 24 hours, all users
+LLM_USER_DAILY_REQUESTS = int(os.getenv("LLM_USER_DAILY_REQUESTS", "5000"))
+LLM_USER_DAILY_TOKENS = int(os.getenv("LLM_USER_DAILY_TOKENS", "5000000"))
+LLM_ECONOMY_AT = float(os.getenv("LLM_ECONOMY_AT", "0.8"))  # share of a limit used
+LLM_MINIMAL_AT = float(os.getenv("LLM_MINIMAL_AT", "0.95"))
+LLM_PRICE_INPUT_PER_M = float(os.getenv("LLM_PRICE_INPUT_PER_M", "0.30"))  # USD per million tokens
+LLM_PRICE_OUTPUT_PER_M = float(os.getenv("LLM_PRICE_OUTPUT_PER_M", "2.50"))
+LLM_QUOTA_BACKOFF = int(os.getenv("LLM_QUOTA_BACKOFF", "60"))  # seconds without Gemini after a quota error, doubling
+LLM_QUOTA_MAX_BACKOFF = int(os.getenv("LLM_QUOTA_MAX_BACKOFF", "3600"))
+LLM_BUDGET_REFRESH_SECONDS = float(os.getenv("LLM_BUDGET_REFRESH_SECONDS", "5"))  # how stale a process's view may be
+LLM_TEXT_FALLBACK_CHARS = int(os.getenv("LLM_TEXT_FALLBACK_CHARS", "6000"))  # page text sent instead of a screenshot
+# local OCR for screenshots (pytesseract and the tesseract binary): "auto" uses it when installed, "off" never.
+# It gets a head start of its recent p90 latency (at most LOCAL_OCR_HEDGE_MAX_MS) before Gemini is asked too
+LOCAL_OCR = os.getenv("LOCAL_OCR", "auto").lower()
+LOCAL_OCR_LANG = os.getenv("LOCAL_OCR_LANG", "eng")
+LOCAL_OCR_MIN_CONFIDENCE = float(os.getenv("LOCAL_OCR_MIN_CONFIDENCE", "0.75"))  # an OCR answer this sure skips Gemini
+LOCAL_OCR_HEDGE_MAX_MS = int(os.getenv("LOCAL_OCR_HEDGE_MAX_MS", "2000"))
+LOCAL_OCR_TIMEOUT = float(os.getenv("LOCAL_OCR_TIMEOUT", "30"))  # seconds to wait for Gemini once it is asked
@@ -1,13 +1,10 @@
 # backend/utils/extract_fields.py
 import json
-from google import genai
 
-from backend.utils.env import GEMINI_API_KEY
+from backend.utils import llm_budget
 
-genai_client = genai.Client(api_key=GEMINI_API_KEY)
 
-
-def extract_fields(original_description: str):
+def extract_fields(original_description: str, user_id=None):
     """
     Uses Gemini to parse user description into structured fields:
     - description
@@ -26,10 +23,7 @@ Analyze the following request and return ONLY a valid JSON object with these key
 Request: """
 
     try:
-        resp = genai_client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt + original_description
-        )
+        resp = llm_budget.generate("parse_request", prompt + original_description, user_id=user_id)
 
         # try to pull clean text from Gemini response
         text = getattr(resp, "text", "").strip()
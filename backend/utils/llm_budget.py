@@ -0,0 +1,453 @@
+# backend/utils/llm_budget.py
+import logging
+import sqlite3
+import threading
+import time
+
+try:
+    from backend.utils import metrics
+    from backend.utils.clients import get_genai_client
+    from backend.utils.env import (
+        LLM_BUDGET_DB,
+        LLM_BUDGET_REFRESH_SECONDS,
+        LLM_DAILY_BUDGET_USD,
+        LLM_ECONOMY_AT,
+        LLM_GLOBAL_RPM,
+        LLM_GLOBAL_TPM,
+        LLM_MINIMAL_AT,
+        LLM_PRICE_INPUT_PER_M,
+        LLM_PRICE_OUTPUT_PER_M,
+        LLM_QUOTA_BACKOFF,
+        LLM_QUOTA_MAX_BACKOFF,
+        LLM_USER_DAILY_REQUESTS,
+        LLM_USER_DAILY_TOKENS,
+    )
+except ImportError:
+    from utils import metrics
+    from utils.clients import get_genai_client
+    from utils.env import (
+        LLM_BUDGET_DB,
+        LLM_BUDGET_REFRESH_SECONDS,
+        LLM_DAILY_BUDGET_USD,
+        LLM_ECONOMY_AT,
+        LLM_GLOBAL_RPM,
+        LLM_GLOBAL_TPM,
+        LLM_MINIMAL_AT,
+        LLM_PRICE_INPUT_PER_M,
+        LLM_PRICE_OUTPUT_PER_M,
+        LLM_QUOTA_BACKOFF,
+        LLM_QUOTA_MAX_BACKOFF,
+        LLM_USER_DAILY_REQUESTS,
+        LLM_USER_DAILY_TOKENS,
+    )
+
+logger = logging.getLogger(__name__)
+
+# Budget governor for Gemini. Every generate_content call in the repo goes
+# through generate(), which refuses the call when the budget says so and
+# records its tokens and cost afterwards.
+#
+# Usage is counted per minute bucket, globally and per user, in a SQLite table
+# (WAL mode, like the circuit breakers) so every scheduler thread and worker
+# process on the host draws on the same budget. Windows slide: requests and
+# tokens per minute (the API's own quotas), and requests, tokens and dollars
+# over the last 24 hours. The worst share of any limit picks the mode:
+#
+#   normal   everything as usual
+#   economy  (LLM_ECONOMY_AT) no vision: the screenshot tier reads page text
+#            instead; conditions a regex can evaluate skip Gemini; checks
+#            run at twice their interval
+#   minimal  (LLM_MINIMAL_AT, or a quota error from the API) no Gemini at all:
+#            structured data and regex extractors only; checks run at four
+#            times their interval
+#
+# A 429/RESOURCE_EXHAUSTED from the API puts every process in minimal mode for
+# LLM_QUOTA_BACKOFF seconds, doubling while it repeats, instead of letting
+# the whole fleet keep hitting the quota. Each process re-reads the ledger at
+# most every LLM_BUDGET_REFRESH_SECONDS, so limits are soft by that much.
+# The governor fails open: if the ledger is unusable, calls go ahead.
+
+MODEL = "gemini-2.5-flash"
+
+NORMAL = "normal"
+ECONOMY = "economy"
+MINIMAL = "minimal"
+MODES = (NORMAL, ECONOMY, MINIMAL)
+INTERVAL_STRETCH = {NORMAL: 1, ECONOMY: 2, MINIMAL: 4}
+
+# purposes, as passed to generate(); vision is the first thing to go
+VISION_PURPOSES = frozenset(("extract_image",))
+
+BUCKET_SECONDS = 60
+DAY_BUCKETS = 24 * 60
+PRUNE_EVERY = 600  # seconds between deletes of buckets that left the day window
+IMAGE_TOKENS = 1290  # a 1366x1024 screenshot is about five 258-token tiles
+USER_VIEWS_MAX = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_usage (
+    scope         TEXT NOT NULL,
+    bucket        INTEGER NOT NULL,
+    purpose       TEXT NOT NULL,
+    requests      INTEGER NOT NULL DEFAULT 0,
+    input_tokens  INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cost          REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, bucket, purpose)
+);
+CREATE TABLE IF NOT EXISTS llm_cooldown (
+    key    TEXT PRIMARY KEY,
+    opens  INTEGER NOT NULL,
+    until  REAL NOT NULL,
+    reason TEXT
+);
+"""
+
+
+class BudgetExceeded(Exception):
+    """Raised by generate() when the budget doesn't allow a call for this purpose."""
+
+    def __init__(self, purpose, mode):
+        super().__init__(f"no Gemini budget for {purpose} ({mode} mode)")
+        self.purpose = purpose
+        self.mode = mode
+
+
+_local = threading.local()
+_lock = threading.Lock()
+_global_view = None    # (expires, view)
+_user_views = {}       # user_id -> (expires, pressure)
+_pruned_at = 0.0
+
+
+def _db():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(LLM_BUDGET_DB, timeout=5, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _scope(user_id):
+    return f"user:{user_id}"
+
+
+def _share(used, limit):
+    return used / limit if limit > 0 else 0.0
+
+
+def _day(conn, scope, bucket):
+    row = conn.execute(
+        "SELECT COALESCE(SUM(requests), 0) AS requests, COALESCE(SUM(input_tokens + output_tokens), 0) AS tokens,"
+        " COALESCE(SUM(cost), 0) AS cost FROM llm_usage WHERE scope = ? AND bucket > ?",
+        (scope, bucket - DAY_BUCKETS),
+    ).fetchone()
+    return dict(row)
+
+
+def _minute(conn, now):
+    # sliding minute: this bucket plus the part of the last one still inside the window
+    bucket = int(now // BUCKET_SECONDS)
+    weight = 1.0 - (now % BUCKET_SECONDS) / BUCKET_SECONDS
+    out = {"requests": 0.0, "tokens": 0.0}
+    for row in conn.execute(
+        "SELECT bucket, SUM(requests) AS requests, SUM(input_tokens + output_tokens) AS tokens"
+        " FROM llm_usage WHERE scope = 'global' AND bucket >= ? GROUP BY bucket",
+        (bucket - 1,),
+    ):
+        w = 1.0 if row["bucket"] == bucket else weight
+        out["requests"] += row["requests"] * w
+        out["tokens"] += row["tokens"] * w
+    return out
+
+
+def _mode(pressure, cooling):
+    worst = max(pressure.values(), default=0.0)
+    if cooling or worst >= LLM_MINIMAL_AT:
+        return MINIMAL
+    if worst >= LLM_ECONOMY_AT:
+        return ECONOMY
+    return NORMAL
+
+
+def _read_global(now):
+    conn = _db()
+    bucket = int(now // BUCKET_SECONDS)
+    minute = _minute(conn, now)
+    day = _day(conn, "global", bucket)
+    cooldown = conn.execute("SELECT opens, until, reason FROM llm_cooldown WHERE key = 'quota'").fetchone()
+    pressure = {
+        "requests_per_minute": _share(minute["requests"], LLM_GLOBAL_RPM),
+        "tokens_per_minute": _share(minute["tokens"], LLM_GLOBAL_TPM),
+        "daily_spend": _share(day["cost"], LLM_DAILY_BUDGET_USD),
+    }
+    return {
+        "minute": minute,
+        "day": day,
+        "pressure": pressure,
+        "cooldown_until": cooldown["until"] if cooldown and cooldown["until"] > now else None,
+        "cooldown_opens": cooldown["opens"] if cooldown else 0,
+    }
+
+
+def _global():
+    global _global_view
+    now = time.time()
+    cached = _global_view
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    try:
+        view = _read_global(now)
+    except sqlite3.Error as e:
+        logger.warning("llm budget ledger unavailable, not limiting: %s", e)
+        view = {"pressure": {}, "cooldown_until": None, "cooldown_opens": 0}
+    current = _mode(view["pressure"], view["cooldown_until"])
+    metrics.set_gauge("autoscout_llm_budget_pressure", max(view["pressure"].values(), default=0.0))
+    metrics.set_gauge("autoscout_llm_budget_mode", MODES.index(current))
+    _global_view = (now + LLM_BUDGET_REFRESH_SECONDS, view)
+    return view
+
+
+def _user(user_id):
+    now = time.time()
+    cached = _user_views.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    try:
+        day = _day(_db(), _scope(user_id), int(now // BUCKET_SECONDS))
+    except sqlite3.Error as e:
+        logger.warning("llm budget ledger unavailable, not limiting: %s", e)
+        day = {"requests": 0, "tokens": 0}
+    pressure = {
+        "user_daily_requests": _share(day["requests"], LLM_USER_DAILY_REQUESTS),
+        "user_daily_tokens": _share(day["tokens"], LLM_USER_DAILY_TOKENS),
+    }
+    with _lock:
+        if len(_user_views) >= USER_VIEWS_MAX:
+            _user_views.clear()
+        _user_views[user_id] = (now + LLM_BUDGET_REFRESH_SECONDS, pressure)
+    return pressure
+
+
+def mode(user_id=None):
+    """normal, economy or minimal for a call made on behalf of `user_id` (global budget only if None)."""
+    view = _global()
+    pressure = dict(view["pressure"])
+    if user_id:
+        pressure.update(_user(user_id))
+    return _mode(pressure, view["cooldown_until"])
+
+
+def allows(purpose, user_id=None, current=None):
+    current = current or mode(user_id)
+    if current == MINIMAL:
+        return False
+    return current == NORMAL or purpose not in VISION_PURPOSES
+
+
+def interval_multiplier(user_id=None):
+    """How many times its interval a check should wait under the current budget."""
+    return INTERVAL_STRETCH[mode(user_id)]
+
+
+def degraded(step, current):
+    """Count one thing done differently because of the budget."""
+    metrics.inc("autoscout_llm_degraded_total", step=step, mode=current)
+
+
+def _estimate(contents):
+    # ~4 characters a token when the response carries no usage metadata
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    return sum(len(p) // 4 + 1 if isinstance(p, str) else IMAGE_TOKENS for p in parts)
+
+
+def _tokens(resp, contents):
+    usage = getattr(resp, "usage_metadata", None)
+    input_tokens = getattr(usage, "prompt_token_count", None)
+    if input_tokens is None:
+        text = getattr(resp, "text", None)
+        return _estimate(contents), len(text) // 4 + 1 if isinstance(text, str) else 1
+    # thinking tokens are billed as output
+    output_tokens = (getattr(usage, "candidates_token_count", None) or 0) + (getattr(usage, "thoughts_token_count", None) or 0)
+    return input_tokens, output_tokens
+
+
+def cost(input_tokens, output_tokens):
+    return (input_tokens * LLM_PRICE_INPUT_PER_M + output_tokens * LLM_PRICE_OUTPUT_PER_M) / 1e6
+
+
+def record(purpose, user_id, input_tokens, output_tokens, requests=1):
+    """Add one call's usage to the ledger."""
+    global _pruned_at
+    now = time.time()
+    bucket = int(now // BUCKET_SECONDS)
+    spent = cost(input_tokens, output_tokens)
+    metrics.inc("autoscout_llm_tokens_total", value=input_tokens, purpose=purpose, kind="input")
+    metrics.inc("autoscout_llm_tokens_total", value=output_tokens, purpose=purpose, kind="output")
+    metrics.inc("autoscout_llm_cost_usd_total", value=spent, purpose=purpose)
+    scopes = ["global"] + ([_scope(user_id)] if user_id else [])
+    try:
+        conn = _db()
+        for scope in scopes:
+            conn.execute(
+                "INSERT INTO llm_usage (scope, bucket, purpose, requests, input_tokens, output_tokens, cost)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (scope, bucket, purpose) DO UPDATE SET"
+                " requests = requests + excluded.requests, input_tokens = input_tokens + excluded.input_tokens,"
+                " output_tokens = output_tokens + excluded.output_tokens, cost = cost + excluded.cost",
+                (scope, bucket, purpose, requests, input_tokens, output_tokens, spent),
+            )
+        if now - _pruned_at > PRUNE_EVERY:
+            _pruned_at = now
+            conn.execute("DELETE FROM llm_usage WHERE bucket <= ?", (bucket - DAY_BUCKETS,))
+    except sqlite3.Error as e:
+        logger.warning("llm budget ledger unavailable: %s", e)
+
+
+def is_quota_error(exc):
+    code = getattr(exc, "code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return code == 429 or "RESOURCE_EXHAUSTED" in str(exc)
+
+
+def _cool_down(exc):
+    global _global_view
+    now = time.time()
+    try:
+        conn = _db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT opens, until FROM llm_cooldown WHERE key = 'quota'").fetchone()
+            if row and row["until"] > now:
+                # another call already backed the fleet off
+                conn.execute("COMMIT")
+                return
+            opens = (row["opens"] if row else 0) + 1
+            until = now + min(LLM_QUOTA_MAX_BACKOFF, LLM_QUOTA_BACKOFF * 2 ** (opens - 1))
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cooldown (key, opens, until, reason) VALUES ('quota', ?, ?, ?)",
+                (opens, until, str(exc)[:200]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    except sqlite3.Error as e:
+        logger.warning("llm budget ledger unavailable: %s", e)
+        return
+    _global_view = None
+    logger.warning("Gemini quota exhausted; no LLM calls for %.0fs: %s", until - now, exc)
+
+
+def _recovered():
+    global _global_view
+    # the first call to succeed after a cooldown resets the backoff
+    try:
+        _db().execute("DELETE FROM llm_cooldown WHERE key = 'quota' AND until <= ?", (time.time(),))
+    except sqlite3.Error as e:
+        logger.warning("llm budget ledger unavailable: %s", e)
+    _global_view = None
+
+
+def generate(purpose, contents, user_id=None, model=MODEL):
+    """
+    models.generate_content on the shared client, if the budget allows a
+    `purpose` call for `user_id`. Raises BudgetExceeded when it doesn't, and
+    re-raises API errors after accounting for them.
+    """
+    view = _global()
+    current = mode(user_id)
+    if not allows(purpose, current=current):
+        metrics.inc("autoscout_llm_requests_total", purpose=purpose, outcome="refused")
+        raise BudgetExceeded(purpose, current)
+    try:
+        resp = get_genai_client().models.generate_content(model=model, contents=contents)
+    except Exception as e:
+        quota = is_quota_error(e)
+        metrics.inc("autoscout_llm_requests_total", purpose=purpose, outcome="quota" if quota else "error")
+        if quota:
+            _cool_down(e)
+        # counts against the request rate; the API doesn't bill failed calls
+        record(purpose, user_id, 0, 0)
+        raise
+    metrics.inc("autoscout_llm_requests_total", purpose=purpose, outcome="ok")
+    record(purpose, user_id, *_tokens(resp, contents))
+    if view["cooldown_opens"]:
+        _recovered()
+    return resp
+
+
+def snapshot(user_id=None, top=10):
+    """Usage, limits, mode and projected spend, for the API."""
+    now = time.time()
+    bucket = int(now // BUCKET_SECONDS)
+    conn = _db()
+    view = _read_global(now)
+    hour = conn.execute(
+        "SELECT COALESCE(SUM(cost), 0) FROM llm_usage WHERE scope = 'global' AND bucket > ?", (bucket - 60,)
+    ).fetchone()[0]
+    by_purpose = [dict(row) for row in conn.execute(
+        "SELECT purpose, SUM(requests) AS requests, SUM(input_tokens) AS input_tokens,"
+        " SUM(output_tokens) AS output_tokens, SUM(cost) AS cost FROM llm_usage"
+        " WHERE scope = 'global' AND bucket > ? GROUP BY purpose ORDER BY cost DESC",
+        (bucket - DAY_BUCKETS,),
+    )]
+    users = [dict(row) for row in conn.execute(
+        "SELECT substr(scope, 6) AS user_id, SUM(requests) AS requests,"
+        " SUM(input_tokens + output_tokens) AS tokens, SUM(cost) AS cost FROM llm_usage"
+        " WHERE scope LIKE 'user:%' AND bucket > ? GROUP BY scope ORDER BY tokens DESC LIMIT ?",
+        (bucket - DAY_BUCKETS, top),
+    )]
+    # last hour's rate carried forward
+    daily = hour * 24
+    remaining = LLM_DAILY_BUDGET_USD - view["day"]["cost"]
+    metrics.set_gauge("autoscout_llm_projected_daily_usd", daily)
+    out = {
+        "mode": _mode(view["pressure"], view["cooldown_until"]),
+        "pressure": {k: round(v, 4) for k, v in view["pressure"].items()},
+        "cooldown_until": view["cooldown_until"],
+        "minute": {k: round(v, 1) for k, v in view["minute"].items()},
+        "day": view["day"],
+        "by_purpose": by_purpose,
+        "top_users": users,
+        "projected": {
+            "last_hour_usd": round(hour, 6),
+            "daily_usd": round(daily, 2),
+            "monthly_usd": round(daily * 30, 2),
+            "hours_to_daily_budget": round(remaining / hour, 1) if hour > 0 and LLM_DAILY_BUDGET_USD > 0 else None,
+        },
+        "limits": {
+            "requests_per_minute": LLM_GLOBAL_RPM,
+            "tokens_per_minute": LLM_GLOBAL_TPM,
+            "daily_budget_usd": LLM_DAILY_BUDGET_USD,
+            "user_daily_requests": LLM_USER_DAILY_REQUESTS,
+            "user_daily_tokens": LLM_USER_DAILY_TOKENS,
+        },
+    }
+    if user_id:
+        day = _day(conn, _scope(user_id), bucket)
+        out["user"] = {"user_id": user_id, "day": day, "mode": mode(user_id)}
+    return out
+
+
+def reset(usage=False):
+    """End any quota cooldown now; with `usage`, forget all recorded usage too."""
+    global _global_view
+    conn = _db()
+    cleared = conn.execute("DELETE FROM llm_cooldown").rowcount
+    if usage:
+        conn.execute("DELETE FROM llm_usage")
+    _global_view = None
+    _user_views.clear()
+    return cleared
+
+
+metrics.describe("autoscout_llm_requests_total", "counter", "Gemini calls by purpose and outcome (ok, error, quota, refused).")
+metrics.describe("autoscout_llm_tokens_total", "counter", "Gemini tokens by purpose, input and output.")
+metrics.describe("autoscout_llm_cost_usd_total", "counter", "Estimated Gemini spend in USD by purpose.")
+metrics.describe("autoscout_llm_degraded_total", "counter", "Check steps done without (or with less) Gemini because of the budget.")
+metrics.describe("autoscout_llm_budget_pressure", "gauge", "Largest share of any global LLM limit in use.")
+metrics.describe("autoscout_llm_budget_mode", "gauge", "LLM budget mode: 0 normal, 1 economy, 2 minimal.")
+metrics.describe("autoscout_llm_projected_daily_usd", "gauge", "Gemini spend over 24 hours at the last hour's rate.")
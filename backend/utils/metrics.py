@@ -0,0 +1,244 @@
+# backend/utils/metrics.py
+import json
+import logging
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    from backend.utils.env import JSON_LOGS
+except ImportError:
+    from utils.env import JSON_LOGS
+
+logger = logging.getLogger(__name__)
+
+# seconds; covers a fast DynamoDB read up to a slow headless render
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_trace = ContextVar("autoscout_trace", default=None)
+_lock = threading.Lock()
+_counters = {}     # name -> {label_tuple: value}
+_gauges = {}       # name -> {label_tuple: value}
+_histograms = {}   # name -> {label_tuple: [bucket_counts, sum, count]}
+_help = {}         # name -> (type, help)
+_buckets = {}      # name -> bucket bounds
+
+
+def describe(name, metric_type, help_text, buckets=None):
+    """
+    Register HELP/TYPE metadata for a metric. Optional: undescribed
+    metrics are still exported, just without a HELP line.
+    """
+    _help[name] = (metric_type, help_text)
+    if buckets:
+        _buckets[name] = tuple(buckets)
+
+
+def _key(labels):
+    if not labels:
+        return ()
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    key = _key(labels)
+    with _lock:
+        _gauges.setdefault(name, {})[key] = value
+
+
+def observe(name, value, **labels):
+    key = _key(labels)
+    bounds = _buckets.get(name, DEFAULT_BUCKETS)
+    idx = bisect_left(bounds, value)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        h = series.get(key)
+        if h is None:
+            h = series[key] = [[0] * (len(bounds) + 1), 0.0, 0]
+        h[0][idx] += 1
+        h[1] += value
+        h[2] += 1
+
+
+@contextmanager
+def trace(name, **fields):
+    """
+    Start an end-to-end trace (one check, one request). Spans opened inside
+    it share the trace id, so JSON log lines can be stitched back together.
+    """
+    trace_id = fields.pop("trace_id", None) or uuid.uuid4().hex[:16]
+    token = _current_trace.set(trace_id)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield trace_id
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_trace.reset(token)
+        observe("autoscout_trace_seconds", elapsed, trace=name, status=status)
+        if JSON_LOGS:
+            _emit(trace_id, name, elapsed, status, fields)
+
+
+@contextmanager
+def span(stage, **fields):
+    """
+    Time one pipeline stage into autoscout_check_stage_seconds{stage=...}.
+    Extra fields only go to the JSON log line, never into metric labels.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        observe("autoscout_check_stage_seconds", elapsed, stage=stage, status=status)
+        if JSON_LOGS:
+            _emit(_current_trace.get(), stage, elapsed, status, fields)
+
+
+def current_trace_id():
+    return _current_trace.get()
+
+
+def _emit(trace_id, name, elapsed, status, fields):
+    record = {
+        "ts": round(time.time(), 3),
+        "trace_id": trace_id,
+        "span": name,
+        "duration_ms": round(elapsed * 1000, 3),
+        "status": status,
+    }
+    if fields:
+        record.update(fields)
+    logger.info(json.dumps(record, default=str))
+
+
+def _fmt_labels(key, extra=None):
+    items = list(key)
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    parts = []
+    for k, v in items:
+        v = v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _fmt_bound(b):
+    return "+Inf" if b == float("inf") else repr(float(b))
+
+
+def render_prometheus():
+    """
+    Render every metric in the Prometheus text exposition format (0.0.4).
+    """
+    lines = []
+    with _lock:
+        counters = {n: dict(s) for n, s in _counters.items()}
+        gauges = {n: dict(s) for n, s in _gauges.items()}
+        histograms = {n: {k: (list(h[0]), h[1], h[2]) for k, h in s.items()} for n, s in _histograms.items()}
+
+    def header(name, default_type):
+        metric_type, help_text = _help.get(name, (default_type, None))
+        if help_text:
+            lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+    for name in sorted(counters):
+        header(name, "counter")
+        for key, value in counters[name].items():
+            lines.append(f"{name}{_fmt_labels(key)} {value}")
+
+    for name in sorted(gauges):
+        header(name, "gauge")
+        for key, value in gauges[name].items():
+            lines.append(f"{name}{_fmt_labels(key)} {value}")
+
+    for name in sorted(histograms):
+        header(name, "histogram")
+        bounds = _buckets.get(name, DEFAULT_BUCKETS) + (float("inf"),)
+        for key, (counts, total, count) in histograms[name].items():
+            cumulative = 0
+            for bound, c in zip(bounds, counts):
+                cumulative += c
+                lines.append(f"{name}_bucket{_fmt_labels(key, ('le', _fmt_bound(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_fmt_labels(key)} {total}")
+            lines.append(f"{name}_count{_fmt_labels(key)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def histogram_totals(name):
+    """Return {labels: (count, sum)} for one histogram, e.g. for bench reports."""
+    with _lock:
+        series = _histograms.get(name, {})
+        return {k: (h[2], h[1]) for k, h in series.items()}
+
+
+def reset():
+    """Drop all recorded samples (metadata is kept). Used by benchmarks."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        msg = record.getMessage()
+        if msg.startswith("{"):
+            return msg
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": msg,
+        }
+        trace_id = _current_trace.get()
+        if trace_id:
+            payload["trace_id"] = trace_id
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging():
+    """
+    Install the JSON formatter on the root logger when JSON_LOGS is set;
+    otherwise leave logging configuration alone.
+    """
+    if not JSON_LOGS:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+
+
+describe("autoscout_check_stage_seconds", "histogram", "Latency of each check pipeline stage.")
+describe("autoscout_trace_seconds", "histogram", "End-to-end latency of a traced operation.")
+describe("autoscout_checks_total", "counter", "Completed checks by outcome.")
+describe("autoscout_cache_hits_total", "counter", "Cache lookups that avoided a network call.")
+describe("autoscout_cache_misses_total", "counter", "Cache lookups that fell through to the backing store.")
+describe("autoscout_fallbacks_total", "counter", "Times a cheaper path failed and a fallback was used.")
+describe("autoscout_http_request_seconds", "histogram", "FastAPI request latency by route.")
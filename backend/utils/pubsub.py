@@ -0,0 +1,73 @@
+# backend/utils/pubsub.py
+import logging
+import threading
+
+try:
+    from backend.utils import metrics
+except ImportError:
+    from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# In-process publish/subscribe. Writers announce changes here (and the
+# DynamoDB Streams poller in db/change_feed.py replays changes made by other
+# processes), readers such as the monitor cache subscribe.
+#
+# Callbacks run synchronously on the publisher's thread, so they must be
+# quick; anything slow should hand the event to its own queue. A failing
+# callback is logged and never affects the publisher or other subscribers.
+#
+# With a broker set (utils/broker.py), publishes on its topics go out through
+# the broker instead, and the broker delivers what it receives, ours included,
+# to local subscribers; everything else stays in-process.
+
+MONITORS = "monitors"  # {"type": "put" | "update" | "delete" | "invalidate", "monitor_id", ...}
+CHECKS = "checks"      # check lifecycle, see utils/streams.py
+
+_lock = threading.Lock()
+_subscribers = {}  # topic -> tuple of callbacks
+_broker = None
+
+
+def subscribe(topic, callback):
+    with _lock:
+        _subscribers[topic] = _subscribers.get(topic, ()) + (callback,)
+    return callback
+
+
+def unsubscribe(topic, callback):
+    with _lock:
+        # ==, not `is`: bound methods are new objects on every attribute access
+        _subscribers[topic] = tuple(cb for cb in _subscribers.get(topic, ()) if cb != callback)
+
+
+def set_broker(broker):
+    """Route publishes on `broker.topics` through `broker` (None for in-process only)."""
+    global _broker
+    _broker = broker
+
+
+def publish(topic, event):
+    broker = _broker
+    if broker is not None and topic in broker.topics:
+        try:
+            broker.publish(topic, event)
+            return
+        except Exception:
+            logger.exception("broker publish on %s failed; delivering locally", topic)
+    deliver(topic, event)
+
+
+def deliver(topic, event):
+    """Hand `event` to this process's subscribers."""
+    # the tuple is replaced, never mutated, so it can be iterated without the lock
+    callbacks = _subscribers.get(topic, ())
+    metrics.inc("autoscout_pubsub_events_total", topic=topic)
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception:
+            logger.exception("subscriber %r failed on %s event", callback, topic)
+
+
+metrics.describe("autoscout_pubsub_events_total", "counter", "Events published on the in-process bus.")
@@ -0,0 +1,88 @@
+# backend/utils/scheduler.py
+import logging
+import threading
+
+try:
+    from backend.utils import pubsub
+except ImportError:
+    from utils import pubsub
+
+logger = logging.getLogger(__name__)
+
+# Single process-wide scheduler. It is created on first use and only started
+# from an explicit lifecycle hook (FastAPI startup, or the first schedule
+# request in a long-lived worker), never as an import side effect.
+_lock = threading.Lock()
+_scheduler = None
+
+CHECK_JOB = "backend.lambda_fns.check_price:lambda_handler"
+# scheduled runs go through the priority queue rather than straight to CHECK_JOB
+SUBMIT_JOB = "backend.utils.check_queue:submit"
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _lock:
+            if _scheduler is None:
+                from apscheduler.schedulers.background import BackgroundScheduler
+                _scheduler = BackgroundScheduler()
+    return _scheduler
+
+
+def start_scheduler():
+    scheduler = get_scheduler()
+    with _lock:
+        if not scheduler.running:
+            scheduler.start()
+            logger.info("scheduler started")
+    return scheduler
+
+
+def shutdown_scheduler(wait=False):
+    global _scheduler
+    with _lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None and scheduler.running:
+        scheduler.shutdown(wait=wait)
+        logger.info("scheduler stopped")
+
+
+def schedule_check(input_payload, interval_seconds):
+    """
+    Schedule the recurring check for one monitor. Each run only queues the
+    check (see check_queue.py); jobs reference their targets by import path so
+    the scheduler module stays cheap to import.
+    """
+    payload = dict(input_payload, interval_seconds=interval_seconds)
+    return get_scheduler().add_job(
+        SUBMIT_JOB,
+        "interval",
+        seconds=interval_seconds,
+        args=[payload],
+        id=input_payload["monitor_id"],
+        replace_existing=True,
+    )
+
+
+def remove_check(monitor_id):
+    """Drop a monitor's recurring job from this process's scheduler, if it has one."""
+    scheduler = _scheduler
+    if scheduler is None:
+        return False
+    if scheduler.get_job(monitor_id) is None:
+        return False
+    scheduler.remove_job(monitor_id)
+    return True
+
+
+def _on_monitor_change(event):
+    # jobs live in the process that created the monitor; a pause or delete
+    # made through another worker reaches this one as an event
+    item = event.get("item") or event.get("fields") or {}
+    if event.get("type") == "delete" or item.get("status") == "paused":
+        if remove_check(event.get("monitor_id")):
+            logger.info("unscheduled %s (%s)", event.get("monitor_id"), event.get("type"))
+
+
+pubsub.subscribe(pubsub.MONITORS, _on_monitor_change)
@@ -0,0 +1,195 @@
+# backend/utils/streams.py
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from decimal import Decimal
+
+try:
+    from backend.utils import metrics, pubsub
+    from backend.utils.env import STREAM_QUEUE_SIZE, STREAM_REPLAY
+except ImportError:
+    from utils import metrics, pubsub
+    from utils.env import STREAM_QUEUE_SIZE, STREAM_REPLAY
+
+logger = logging.getLogger(__name__)
+
+# Check lifecycle events for dashboards, pushed over SSE (/stream) and
+# WebSocket (/ws) instead of polled.
+#
+# The check pipeline calls emit() on pubsub.CHECKS from whatever thread it runs
+# on; with a broker configured (see utils/broker.py) that topic is shared by
+# every process. The Hub is the one subscriber per process: it hops each event
+# onto the event loop once, encodes it once, and hands the same frame to every
+# connection watching that monitor or user, found by dict lookup. A slow client
+# only fills its own bounded queue; past STREAM_QUEUE_SIZE its oldest frames
+# are dropped and it gets a "lagged" event instead of stalling anyone else.
+#
+# The last STREAM_REPLAY events are kept so an SSE client reconnecting with
+# Last-Event-ID picks up where it left off. Through a broker every event
+# carries a "seq" the broker assigned, the same in every process, so the
+# reconnect may land on any worker. Without one, ids are counted per process
+# and replay only works against the process that sent them.
+
+# queued -> started -> fetched -> extracted -> [triggered] -> checked
+EVENTS = ("queued", "started", "fetched", "extracted", "triggered", "checked")
+
+
+def emit(kind, monitor_id, user_id=None, **fields):
+    """Publish one check lifecycle event for `monitor_id`."""
+    event = {"type": kind, "monitor_id": monitor_id, "user_id": user_id, "ts": round(time.time(), 3)}
+    event.update(fields)
+    pubsub.publish(pubsub.CHECKS, event)
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+
+def to_json(event):
+    return json.dumps(event, default=_json_default, separators=(",", ":"))
+
+
+def encode(seq, event):
+    """
+    (seq, type, JSON text, SSE frame bytes) for one event. Frames that are not
+    in the replay buffer (snapshots, "lagged") pass seq=None and go out
+    without an id: line, so the browser's Last-Event-ID stays on the last
+    real event.
+    """
+    data = to_json(event)
+    kind = event.get("type", "message")
+    head = f"id: {seq}\n" if seq is not None else ""
+    return seq, kind, data, f"{head}event: {kind}\ndata: {data}\n\n".encode("utf-8")
+
+
+class Subscription:
+    """One connected client: what it watches and its bounded frame queue."""
+
+    __slots__ = ("monitors", "users", "queue", "dropped")
+
+    def __init__(self, monitors, users, size):
+        self.monitors = frozenset(monitors)
+        self.users = frozenset(users)
+        self.queue = asyncio.Queue(maxsize=size)
+        self.dropped = 0
+
+    def matches(self, event):
+        return event.get("monitor_id") in self.monitors or event.get("user_id") in self.users
+
+    def offer(self, frame):
+        if self.queue.full():
+            # drop the oldest; the client is told once it catches up
+            self.queue.get_nowait()
+            self.dropped += 1
+            metrics.inc("autoscout_stream_dropped_total")
+        self.queue.put_nowait(frame)
+
+    async def next(self, timeout):
+        """Next frame, a "lagged" frame after drops, or None on timeout."""
+        if self.dropped and self.queue.empty():
+            dropped, self.dropped = self.dropped, 0
+            return encode(None, {"type": "lagged", "dropped": dropped})
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Hub:
+    """Per-process fan-out from pubsub.CHECKS to connected stream clients."""
+
+    def __init__(self, queue_size=STREAM_QUEUE_SIZE, replay=STREAM_REPLAY):
+        self.queue_size = queue_size
+        self._loop = None
+        self._by_monitor = {}  # monitor_id -> set of Subscription
+        self._by_user = {}     # user_id -> set of Subscription
+        self._recent = deque(maxlen=replay)  # (event, frame)
+        self._seq = 0  # last id sent; broker ids when there are any
+        self._count = 0
+
+    def start(self, loop=None):
+        if self._loop is None:
+            pubsub.subscribe(pubsub.CHECKS, self._on_event)
+        self._loop = loop or asyncio.get_running_loop()
+        return self
+
+    def stop(self):
+        pubsub.unsubscribe(pubsub.CHECKS, self._on_event)
+        self._loop = None
+
+    def _on_event(self, event):
+        # publisher's thread: one hop onto the loop per event, not per client
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event):
+        seq = event.get("seq")
+        if isinstance(seq, int):
+            event = {k: v for k, v in event.items() if k != "seq"}
+            # max(): an event delivered locally while the broker was down
+            # took a local id; ids stay increasing either way
+            self._seq = max(self._seq, seq)
+        else:
+            self._seq += 1
+            seq = self._seq
+        frame = encode(seq, event)
+        self._recent.append((event, frame))
+        targets = self._by_monitor.get(event.get("monitor_id"), set())
+        users = self._by_user.get(event.get("user_id"))
+        if users:
+            targets = targets | users
+        for sub in targets:
+            sub.offer(frame)
+        metrics.inc("autoscout_stream_events_total", type=frame[1])
+        if targets:
+            metrics.inc("autoscout_stream_frames_total", value=len(targets))
+
+    def open(self, monitors=(), users=(), last_event_id=None):
+        """Register a client. Must be called on the loop the hub was started on."""
+        sub = Subscription(monitors, users, self.queue_size)
+        for monitor_id in sub.monitors:
+            self._by_monitor.setdefault(monitor_id, set()).add(sub)
+        for user_id in sub.users:
+            self._by_user.setdefault(user_id, set()).add(sub)
+        if last_event_id is not None:
+            for event, frame in self._recent:
+                if frame[0] > last_event_id and sub.matches(event):
+                    sub.offer(frame)
+        self._count += 1
+        metrics.set_gauge("autoscout_stream_clients", self._count)
+        return sub
+
+    def close(self, sub):
+        for index, keys in ((self._by_monitor, sub.monitors), (self._by_user, sub.users)):
+            for key in keys:
+                subs = index.get(key)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del index[key]
+        self._count -= 1
+        metrics.set_gauge("autoscout_stream_clients", self._count)
+
+    def __len__(self):
+        return self._count
+
+
+_hub = None
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        _hub = Hub()
+    return _hub
+
+
+metrics.describe("autoscout_stream_clients", "gauge", "Connected SSE/WebSocket clients.")
+metrics.describe("autoscout_stream_events_total", "counter", "Check events fanned out to stream clients.")
+metrics.describe("autoscout_stream_frames_total", "counter", "Frames queued for stream clients.")
+metrics.describe("autoscout_stream_dropped_total", "counter", "Frames dropped for clients that fell behind.")